@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    Building, Unit, Tenant, Lease, Payment, MaintenanceRequest, Document, Expense, Notification, Company, ContractTemplate, Invoice, InvoiceItem,
+    Building, Unit, Tenant, Lease, Payment, MaintenanceRequest, Document, DocumentJob, Expense, Notification, Company, ContractTemplate, Invoice, InvoiceItem, SMSMessage, TranslationCache,
     RealEstateOffice, BuildingOwner, CommissionAgreement, RentCollection, CommissionDistribution
 )
 
@@ -65,6 +65,30 @@ class ExpenseAdmin(admin.ModelAdmin):
 # تسجيل نموذج المستندات (عرض افتراضي)
 admin.site.register(Document)
 
+# مهام إنشاء المستندات في الخلفية
+@admin.register(DocumentJob)
+class DocumentJobAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'kind', 'lease', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('idempotency_key', 'lease__contract_number')
+    readonly_fields = ('last_error',)
+
+# صندوق الرسائل النصية الصادرة
+@admin.register(SMSMessage)
+class SMSMessageAdmin(admin.ModelAdmin):
+    list_display = ('phone_number', 'purpose', 'status', 'attempts', 'run_after', 'sent_at')
+    list_filter = ('status', 'purpose', 'provider')
+    search_fields = ('phone_number', 'provider_message_id')
+    readonly_fields = ('last_error',)
+
+# ذاكرة الترجمة التلقائية (يمكن تصحيح الترجمات من هنا)
+@admin.register(TranslationCache)
+class TranslationCacheAdmin(admin.ModelAdmin):
+    list_display = ('source_text', 'translated_text', 'backend', 'created_at')
+    list_filter = ('backend',)
+    search_fields = ('source_text', 'translated_text')
+    readonly_fields = ('source_hash', 'source_language', 'target_language', 'source_text', 'backend')
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('user', 'message', 'read', 'timestamp')
@@ -8,3 +8,4 @@ class DashboardConfig(AppConfig):
 
     def ready(self):
         import dashboard.signals
+        import dashboard.otp_store  # system checks
@@ -0,0 +1,350 @@
+"""
+Backup Service for incremental, deduplicated backups of the database and media files
+"""
+from datetime import datetime
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackupService:
+    """
+    Service class for creating and pruning backups
+
+    A backup is ``<BACKUP_DIR>/backup_<timestamp>.zip`` holding ``db.json``
+    (``dumpdata`` streamed straight into the compressed archive member) and
+    ``manifest.json``, which maps every media file to the SHA-256 of its
+    content. The media files themselves are stored once, by content, under
+    ``<BACKUP_DIR>/objects/``: a file that did not change since the last
+    backup is neither copied nor re-hashed (hashes are cached by size and
+    modification time). ``portable=True`` also embeds the media files in the
+    archive under ``media/`` so it can be restored on another server.
+    """
+
+    ARCHIVE_PREFIX = 'backup_'
+    MANIFEST_NAME = 'manifest.json'
+    DB_NAME = 'db.json'
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    _thread = None
+    _thread_lock = threading.Lock()
+
+    @classmethod
+    def backup_dir(cls):
+        return str(getattr(settings, 'BACKUP_DIR', os.path.join(str(settings.BASE_DIR), 'backups')))
+
+    @classmethod
+    def objects_dir(cls):
+        return os.path.join(cls.backup_dir(), 'objects')
+
+    @classmethod
+    def object_path(cls, digest):
+        return os.path.join(cls.objects_dir(), digest[:2], digest)
+
+    @classmethod
+    def list_backups(cls):
+        """
+        Get the backup archives, newest first
+
+        Returns:
+            list: Absolute paths
+        """
+        directory = cls.backup_dir()
+        if not os.path.isdir(directory):
+            return []
+        names = [
+            name for name in os.listdir(directory)
+            if name.startswith(cls.ARCHIVE_PREFIX) and name.endswith('.zip')
+        ]
+        return [os.path.join(directory, name) for name in sorted(names, reverse=True)]
+
+    @classmethod
+    def hash_file(cls, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _load_hash_index(cls):
+        try:
+            with open(os.path.join(cls.objects_dir(), 'index.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @classmethod
+    def _save_hash_index(cls, index):
+        os.makedirs(cls.objects_dir(), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cls.objects_dir(), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(cls.objects_dir(), 'index.json'))
+
+    @classmethod
+    def store_media(cls):
+        """
+        Store new and changed media files in the object store
+
+        Returns:
+            tuple: (manifest dict of relative path -> digest, number of newly stored objects)
+        """
+        media_root = getattr(settings, 'MEDIA_ROOT', None)
+        if not media_root or not os.path.isdir(media_root):
+            return {}, 0
+
+        old_index = cls._load_hash_index()
+        index = {}
+        manifest = {}
+        stored = 0
+        for root, _dirs, files in os.walk(media_root):
+            for name in files:
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, media_root).replace(os.sep, '/')
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                cached = old_index.get(rel_path)
+                if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                    digest = cached[2]
+                else:
+                    digest = cls.hash_file(path)
+                object_path = cls.object_path(digest)
+                if not os.path.exists(object_path):
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    tmp_path = f"{object_path}.{os.getpid()}.tmp"
+                    shutil.copyfile(path, tmp_path)
+                    os.replace(tmp_path, object_path)
+                    stored += 1
+                index[rel_path] = [stat.st_size, stat.st_mtime_ns, digest]
+                manifest[rel_path] = digest
+        cls._save_hash_index(index)
+        return manifest, stored
+
+    @classmethod
+    def _write_database(cls, archive):
+        """Stream ``dumpdata`` into the ``db.json`` member of the archive"""
+        with archive.open(cls.DB_NAME, 'w', force_zip64=True) as member:
+            stream = io.TextIOWrapper(member, encoding='utf-8')
+            call_command('dumpdata', '--natural-foreign', '--natural-primary', stdout=stream)
+            stream.flush()
+            stream.detach()
+
+    @classmethod
+    def create_backup(cls, portable=False):
+        """
+        Create a backup archive
+
+        Args:
+            portable: Also embed the media files in the archive
+
+        Returns:
+            str: Absolute path of the archive
+        """
+        started = time.monotonic()
+        directory = cls.backup_dir()
+        os.makedirs(directory, exist_ok=True)
+        manifest, stored = cls.store_media()
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(directory, f"{cls.ARCHIVE_PREFIX}{timestamp}.zip")
+        if os.path.exists(path):
+            path = os.path.join(directory, f"{cls.ARCHIVE_PREFIX}{timestamp}_{os.getpid()}.zip")
+        part_path = f"{path}.part"
+        try:
+            with zipfile.ZipFile(part_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                cls._write_database(archive)
+                if portable:
+                    for rel_path, digest in manifest.items():
+                        archive.write(cls.object_path(digest), arcname=f"media/{rel_path}")
+                archive.writestr(cls.MANIFEST_NAME, json.dumps({
+                    'version': 2,
+                    'created_at': datetime.now().isoformat(),
+                    'portable': portable,
+                    'media': manifest,
+                }))
+            os.replace(part_path, path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        logger.info(
+            f"Backup {os.path.basename(path)} created in {time.monotonic() - started:.1f}s "
+            f"({len(manifest)} media files, {stored} new)"
+        )
+        return path
+
+    @classmethod
+    def read_manifest(cls, path):
+        """
+        Read the manifest of an archive
+
+        Returns:
+            dict: The manifest, or None for archives made before manifests existed
+        """
+        with zipfile.ZipFile(path) as archive:
+            try:
+                return json.loads(archive.read(cls.MANIFEST_NAME))
+            except KeyError:
+                return None
+
+    @classmethod
+    def prune(cls, keep_last=None, keep_daily=None):
+        """
+        Apply the retention policy and delete unreferenced media objects
+
+        The ``keep_last`` newest archives are kept, plus the newest archive of
+        each of the last ``keep_daily`` days that have a backup.
+
+        Returns:
+            tuple: (number of deleted archives, number of deleted objects)
+        """
+        keep_last = keep_last if keep_last is not None else getattr(settings, 'BACKUP_KEEP_LAST', 10)
+        keep_daily = keep_daily if keep_daily is not None else getattr(settings, 'BACKUP_KEEP_DAILY', 14)
+
+        backups = cls.list_backups()
+        keep = set(backups[:keep_last])
+        days = set()
+        for path in backups:
+            day = os.path.basename(path)[len(cls.ARCHIVE_PREFIX):][:8]
+            if day not in days and len(days) < keep_daily:
+                days.add(day)
+                keep.add(path)
+
+        # Archives left unfinished by a killed backup (callers hold the backup lock)
+        directory = cls.backup_dir()
+        for name in os.listdir(directory) if os.path.isdir(directory) else []:
+            if name.endswith('.zip.part'):
+                os.remove(os.path.join(directory, name))
+
+        deleted = 0
+        for path in backups:
+            if path not in keep:
+                os.remove(path)
+                deleted += 1
+
+        referenced = set()
+        for path in keep:
+            try:
+                manifest = cls.read_manifest(path)
+            except (OSError, zipfile.BadZipFile):
+                logger.warning(f"Could not read the manifest of {path}")
+                return deleted, 0  # do not sweep objects that may still be referenced
+            if manifest:
+                referenced.update(manifest['media'].values())
+
+        removed_objects = 0
+        objects_dir = cls.objects_dir()
+        for root, _dirs, files in os.walk(objects_dir):
+            if root == objects_dir:
+                continue
+            for name in files:
+                if name not in referenced:
+                    os.remove(os.path.join(root, name))
+                    removed_objects += 1
+        if deleted or removed_objects:
+            logger.info(f"Pruned {deleted} backups and {removed_objects} media objects")
+        return deleted, removed_objects
+
+    @classmethod
+    def _acquire_lock(cls):
+        """Take the cross-process backup lock; False if another backup is running"""
+        os.makedirs(cls.backup_dir(), exist_ok=True)
+        lock_path = os.path.join(cls.backup_dir(), '.lock')
+        try:
+            if time.time() - os.path.getmtime(lock_path) > getattr(settings, 'BACKUP_LOCK_TIMEOUT', 3600):
+                os.remove(lock_path)  # left behind by a killed process
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    @classmethod
+    def _release_lock(cls):
+        try:
+            os.remove(os.path.join(cls.backup_dir(), '.lock'))
+        except OSError:
+            pass
+
+    @classmethod
+    def run(cls, portable=False):
+        """
+        Create a backup and apply the retention policy, unless a backup is already running
+
+        Returns:
+            str: Path of the new archive, or None if skipped
+        """
+        if not cls._acquire_lock():
+            logger.info("Backup skipped: another backup is running")
+            return None
+        try:
+            path = cls.create_backup(portable=portable)
+            cls.prune()
+            return path
+        finally:
+            cls._release_lock()
+
+    @classmethod
+    def run_prune(cls):
+        """
+        Apply the retention policy, unless a backup is running
+
+        Returns:
+            tuple: (number of deleted archives, number of deleted objects), or None if skipped
+        """
+        if not cls._acquire_lock():
+            logger.info("Prune skipped: a backup is running")
+            return None
+        try:
+            return cls.prune()
+        finally:
+            cls._release_lock()
+
+    @classmethod
+    def _run_in_background(cls):
+        try:
+            cls.run()
+        except Exception:
+            logger.exception("Background backup failed")
+        finally:
+            connections.close_all()
+
+    @classmethod
+    def schedule(cls):
+        """
+        Start a backup in a background thread
+
+        Nothing is started if a backup is already running in this process or
+        the newest backup is younger than BACKUP_MIN_INTERVAL seconds.
+
+        Returns:
+            bool: Whether a backup was started
+        """
+        with cls._thread_lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return False
+            backups = cls.list_backups()
+            min_interval = getattr(settings, 'BACKUP_MIN_INTERVAL', 300)
+            if backups and time.time() - os.path.getmtime(backups[0]) < min_interval:
+                return False
+            cls._thread = threading.Thread(target=cls._run_in_background, name='backup', daemon=True)
+            cls._thread.start()
+            return True
@@ -0,0 +1,190 @@
+"""
+Batch Export Service for rendering many receipts, statements or notices into one ZIP
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import zipfile
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .company_service import CompanyService
+from .ledger_service import LedgerService
+from .models import Lease, Payment
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    """Process pool initializer: each worker opens its own database connections"""
+    import django
+    django.setup()
+
+
+def _render_item(kind, pk, extra):
+    """
+    Render one PDF of a batch (runs in a worker process)
+
+    Returns:
+        tuple: (file name in the archive, PDF bytes or None, error message or None)
+    """
+    from .utils import generate_pdf_bytes
+
+    arcname = f"{kind}_{pk}.pdf"
+    try:
+        company = CompanyService.get()
+        today = timezone.now().date()
+        if kind == 'receipts':
+            payment = Payment.objects.select_related('lease__tenant', 'lease__unit__building').get(pk=pk)
+            arcname = f"receipt_{payment.lease.contract_number}_{payment.pk}.pdf"
+            context = {'payment': payment, 'lease': payment.lease, 'company': company, 'today': today}
+            template = 'dashboard/reports/payment_receipt.html'
+        else:
+            lease = Lease.objects.select_related('tenant', 'unit__building').get(pk=pk)
+            if kind == 'statements':
+                arcname = f"statement_{lease.contract_number}.pdf"
+                context = {'lease': lease, 'payments': lease.payments.all(), 'today': timezone.now(), 'company': company}
+                template = 'dashboard/reports/tenant_statement.html'
+            else:
+                arcname = f"overdue_notice_{lease.contract_number}.pdf"
+                context = {'lease': lease, 'today': today, 'company': company, 'type': 'payment', 'months': extra}
+                template = 'dashboard/reports/lease_overdue_notice.html'
+        return arcname, generate_pdf_bytes(template, context), None
+    except Exception as e:
+        logger.exception(f"Batch export failed for {kind} {pk}")
+        return arcname, None, str(e)
+
+
+class _StreamWriter:
+    """Write-only, non-seekable file object collecting what ZipFile writes"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class BatchPDFExportService:
+    """Service class for batch PDF exports"""
+
+    KINDS = ('receipts', 'statements', 'overdue_notices')
+
+    @classmethod
+    def get_items(cls, kind, building_id=None, month=None, status=None):
+        """
+        Select the objects to render
+
+        Args:
+            kind: 'receipts', 'statements' or 'overdue_notices'
+            building_id: Only objects of this building
+            month: 'YYYY-MM'; payments made in that month, or leases running during it
+            status: Lease status
+
+        Returns:
+            list: (kind, pk, extra) tuples
+        """
+        if kind not in cls.KINDS:
+            raise ValueError(f"Unknown batch export kind: {kind}")
+        month_start = datetime.datetime.strptime(month, '%Y-%m').date() if month else None
+
+        if kind == 'receipts':
+            payments = Payment.objects.order_by('payment_date', 'pk')
+            if building_id:
+                payments = payments.filter(lease__unit__building_id=building_id)
+            if month_start:
+                payments = payments.filter(payment_date__year=month_start.year, payment_date__month=month_start.month)
+            if status:
+                payments = payments.filter(lease__status=status)
+            return [(kind, pk, None) for pk in payments.values_list('pk', flat=True)]
+
+        leases = Lease.objects.order_by('contract_number')
+        if building_id:
+            leases = leases.filter(unit__building_id=building_id)
+        if month_start:
+            month_end = month_start + relativedelta(months=1, days=-1)
+            leases = leases.filter(start_date__lte=month_end, end_date__gte=month_start)
+        if status:
+            leases = leases.filter(status=status)
+        if kind == 'statements':
+            return [(kind, pk, None) for pk in leases.values_list('pk', flat=True)]
+
+        arrears = LedgerService.get_portfolio_arrears(leases)
+        return [
+            (kind, lease_id, len(lease_arrears['overdue_months']))
+            for lease_id, lease_arrears in arrears.items()
+            if lease_arrears['overdue_months']
+        ]
+
+    @classmethod
+    def render(cls, items, processes=None):
+        """
+        Render the items across worker processes, yielding results in order
+
+        At most ``2 * processes`` renders are in flight, so memory does not
+        grow with the batch size. The pool closes the caller's database
+        connections, so web requests render with ``processes=1``.
+
+        Yields:
+            tuple: (file name in the archive, PDF bytes or None, error message or None)
+        """
+        processes = processes if processes is not None else getattr(settings, 'BATCH_EXPORT_PROCESSES', 2)
+        if processes <= 1:
+            for item in items:
+                yield _render_item(*item)
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+            pending = deque()
+            items = iter(items)
+            for item in items:
+                pending.append(pool.submit(_render_item, *item))
+                if len(pending) >= processes * 2:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                next_item = next(items, None)
+                if next_item is not None:
+                    pending.append(pool.submit(_render_item, *next_item))
+                yield result
+
+    @classmethod
+    def stream_zip(cls, items, processes=None):
+        """
+        Stream a ZIP archive of the rendered PDFs
+
+        The archive is written with ``zipfile`` to a non-seekable writer, so each
+        member is sent as soon as it is rendered. Failed renders are listed in
+        ``errors.txt`` at the end of the archive.
+
+        Yields:
+            bytes: Chunks of the ZIP file
+        """
+        writer = _StreamWriter()
+        errors = []
+        date_time = timezone.localtime().timetuple()[:6]
+        with zipfile.ZipFile(writer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+            for arcname, pdf_bytes, error in cls.render(items, processes):
+                if pdf_bytes is None:
+                    errors.append(f"{arcname}: {error}")
+                    continue
+                archive.writestr(zipfile.ZipInfo(arcname, date_time), pdf_bytes)
+                yield writer.drain()
+            if errors:
+                archive.writestr(zipfile.ZipInfo('errors.txt', date_time), '\n'.join(errors))
+        yield writer.drain()
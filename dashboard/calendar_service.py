@@ -0,0 +1,96 @@
+"""
+Calendar Service for the lease renewal events of the dashboard calendar
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import get_language, gettext as _
+
+from .models import Lease
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CalendarService:
+    """
+    Service class for the calendar feed
+
+    Events are read for the visible window only, with one joined query over
+    ``Lease.end_date``, and serialized once per window, day and language.
+    The serialized feed and its ETag are kept in the cache for
+    CALENDAR_FEED_CACHE_TIMEOUT seconds; saving or deleting a lease bumps a
+    version number that is part of the cache key, so changes show up at once.
+    """
+
+    VERSION_KEY = 'calendar_feed:version'
+
+    @classmethod
+    def _version(cls):
+        return cache.get_or_set(cls.VERSION_KEY, 1, None)
+
+    @classmethod
+    def invalidate(cls):
+        """Make the cached feeds stale (called when a lease changes)"""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, None)
+
+    @classmethod
+    def get_events(cls, start, end, today=None):
+        """
+        Get the renewal events of the leases ending in [start, end)
+
+        Only leases ending today or later are shown, as on the dashboard.
+
+        Args:
+            start: First date of the window
+            end: Date after the last date of the window
+
+        Returns:
+            list: FullCalendar event dicts
+        """
+        today = today or timezone.now().date()
+        rows = (
+            Lease.objects.filter(end_date__gte=max(start, today), end_date__lt=end)
+            .order_by('end_date', 'pk')
+            .values_list('pk', 'contract_number', 'end_date', 'status', 'tenant__name', 'unit__unit_number')
+        )
+        renewal, unit_label = _('تجديد'), _('وحدة')
+        events = []
+        for pk, contract_number, end_date, status, tenant_name, unit_number in rows:
+            events.append({
+                'title': f"{renewal}: {tenant_name} - {unit_label} {unit_number}",
+                'start': end_date.isoformat(),
+                'allDay': True,
+                'url': reverse('lease_detail', kwargs={'pk': pk}),
+                'extendedProps': {
+                    'contract_number': contract_number,
+                    'days_until_expiry': None if status == 'cancelled' else (end_date - today).days,
+                },
+            })
+        return events
+
+    @classmethod
+    def get_feed(cls, start, end):
+        """
+        Get the serialized events of a window, from the cache when possible
+
+        Returns:
+            tuple: (JSON bytes, ETag)
+        """
+        today = timezone.now().date()
+        key = f"calendar_feed:{cls._version()}:{get_language()}:{today}:{start}:{end}"
+        feed = cache.get(key)
+        if feed is None:
+            body = json.dumps(
+                cls.get_events(start, end, today), ensure_ascii=False, separators=(',', ':'),
+            ).encode('utf-8')
+            feed = (body, f'"{hashlib.sha256(body).hexdigest()}"')
+            cache.set(key, feed, getattr(settings, 'CALENDAR_FEED_CACHE_TIMEOUT', 60))
+        return feed
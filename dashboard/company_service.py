@@ -0,0 +1,158 @@
+"""
+Company Service for cached access to the company profile and logo
+"""
+import base64
+import mimetypes
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Company
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CompanyService:
+    """
+    Service class for the company profile used in page headers and PDFs
+
+    The profile is loaded once per process and reused until a Company is
+    saved or deleted, or for at most COMPANY_PROFILE_TTL seconds. Saving
+    moves a version token in the default cache; when that cache is shared
+    (Redis, Memcached) every process reloads at once, while with the
+    per-process LocMemCache other processes (web workers, document and SMS
+    workers) pick the change up when the TTL runs out. ``get`` also
+    remembers the profile on the request so a page render checks it once.
+    The logo file is read once per load and exposed as a path and as a
+    ``data:`` URI that both PDF engines can embed.
+    """
+
+    VERSION_KEY = 'company_profile:version'
+    REQUEST_ATTR = '_company_profile'
+
+    _entry = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _version(cls):
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(cls.VERSION_KEY)
+        return version
+
+    @classmethod
+    def invalidate(cls):
+        """Drop the cached profile in every process (called when a Company changes)"""
+        cls._entry = None
+        cache.set(cls.VERSION_KEY, uuid.uuid4().hex, None)
+
+    @classmethod
+    def _is_current(cls, entry, version):
+        return entry is not None and entry['version'] == version and time.monotonic() < entry['expires_at']
+
+    @classmethod
+    def _get_entry(cls):
+        version = cls._version()
+        entry = cls._entry
+        if not cls._is_current(entry, version):
+            with cls._lock:
+                entry = cls._entry
+                if not cls._is_current(entry, version):
+                    entry = {
+                        'version': version, 'company': Company.objects.first(),
+                        'expires_at': time.monotonic() + getattr(settings, 'COMPANY_PROFILE_TTL', 30),
+                    }
+                    cls._entry = entry
+        return entry
+
+    @classmethod
+    def get(cls, request=None):
+        """
+        Get the company profile
+
+        Args:
+            request: Current request, to reuse the profile within it
+
+        Returns:
+            Company: The profile, or None when none was created yet
+        """
+        if request is not None and hasattr(request, cls.REQUEST_ATTR):
+            return getattr(request, cls.REQUEST_ATTR)
+        company = cls._get_entry()['company']
+        if request is not None:
+            setattr(request, cls.REQUEST_ATTR, company)
+        return company
+
+    @classmethod
+    def get_name(cls, request=None, default='Rent Management'):
+        company = cls.get(request)
+        return company.name if company else default
+
+    @classmethod
+    def get_logo_url(cls, request=None):
+        company = cls.get(request)
+        return company.logo.url if company and company.logo else None
+
+    @classmethod
+    def get_logo_path(cls):
+        """
+        Get the file system path of the logo
+
+        Returns:
+            str: Absolute path, or None without a logo file
+        """
+        company = cls.get()
+        if not company or not company.logo:
+            return None
+        try:
+            path = company.logo.path
+        except NotImplementedError:  # storage without local files
+            return None
+        return path if os.path.exists(path) else None
+
+    @classmethod
+    def _load_logo(cls):
+        path = cls.get_logo_path()
+        if path is None:
+            return None, None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            logger.warning(f"Could not read company logo {path}")
+            return None, None
+        content_type = mimetypes.guess_type(path)[0] or 'image/png'
+        return data, f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+    @classmethod
+    def _get_logo(cls):
+        entry = cls._get_entry()
+        if 'logo' not in entry:
+            entry['logo'] = cls._load_logo()
+        return entry['logo']
+
+    @classmethod
+    def get_logo_bytes(cls):
+        """
+        Get the content of the logo file (read once per profile version)
+
+        Returns:
+            bytes: File content, or None without a logo file
+        """
+        return cls._get_logo()[0]
+
+    @classmethod
+    def get_logo_data_uri(cls):
+        """
+        Get the logo as a ``data:`` URI for embedding in PDF templates
+
+        Returns:
+            str: URI, or None without a logo file
+        """
+        return cls._get_logo()[1]
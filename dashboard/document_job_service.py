@@ -0,0 +1,201 @@
+"""
+Document Job Service for generating lease PDFs in background worker processes
+"""
+import datetime
+import os
+import socket
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .company_service import CompanyService
+from .models import Company, Document, DocumentJob, Lease
+from .utils import generate_pdf_bytes
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentJobService:
+    """Service class for the lease document generation queue"""
+
+    # kind -> (template, title prefix, file name prefix)
+    DOCUMENT_TYPES = {
+        'initial_invoice': (
+            'dashboard/reports/lease_initial_invoice.html', 'فاتورة رسوم تسجيل عقد', 'lease_initial_invoice',
+        ),
+        'cancellation_notice': (
+            'dashboard/reports/lease_cancellation_notice.html', 'استمارة إلغاء عقد', 'lease_cancellation',
+        ),
+        'renewal_notice': (
+            'dashboard/reports/lease_renewal_notice.html', 'استمارة تجديد عقد', 'lease_renewal',
+        ),
+    }
+
+    MAX_ATTEMPTS = getattr(settings, 'DOCUMENT_JOB_MAX_ATTEMPTS', 3)
+    RETRY_DELAY = getattr(settings, 'DOCUMENT_JOB_RETRY_DELAY', 30)  # seconds, doubled on each retry
+    LOCK_TIMEOUT = getattr(settings, 'DOCUMENT_JOB_LOCK_TIMEOUT', 600)  # seconds
+
+    @classmethod
+    def idempotency_key(cls, lease, kind):
+        return f"{kind}:{lease.pk}"
+
+    @classmethod
+    def enqueue(cls, lease, kind, params=None, key=None):
+        """
+        Queue the generation of a lease document once the current transaction commits
+
+        Enqueuing the same key twice (e.g. from ``Lease.save`` and from the
+        cancel view) creates a single job and a single document.
+
+        Args:
+            lease: Lease instance (must be saved)
+            kind: One of DocumentJob.KIND_CHOICES
+            params: Extra JSON parameters for the template context
+            key: Idempotency key, defaults to "<kind>:<lease id>"
+        """
+        key = key or cls.idempotency_key(lease, kind)
+        lease_id = lease.pk
+        transaction.on_commit(lambda: cls._create_job(lease_id, kind, params or {}, key))
+
+    @classmethod
+    def _create_job(cls, lease_id, kind, params, key):
+        if DocumentJob.objects.filter(idempotency_key=key).exists():
+            return None
+        _template, title, _prefix = cls.DOCUMENT_TYPES[kind]
+        contract_number = Lease.objects.filter(pk=lease_id).values_list('contract_number', flat=True).first()
+        with transaction.atomic():
+            document = Document.objects.create(
+                lease_id=lease_id, title=_(title) + f" - {contract_number or lease_id}", status='pending',
+            )
+            job, created = DocumentJob.objects.get_or_create(
+                idempotency_key=key,
+                defaults={'kind': kind, 'lease_id': lease_id, 'params': params, 'document': document},
+            )
+            if not created:
+                # Lost the race against another enqueue of the same key
+                transaction.set_rollback(True)
+                return job
+        logger.info(f"Queued document job {key}")
+        if getattr(settings, 'DOCUMENT_QUEUE_EAGER', False):
+            cls.process(job)
+        return job
+
+    @classmethod
+    def worker_id(cls):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def claim(cls, worker_id=None):
+        """
+        Claim the next runnable job
+
+        A job is claimed with a conditional UPDATE on its status, so several
+        worker processes can poll the same table without taking the same job.
+
+        Returns:
+            DocumentJob or None: The claimed job
+        """
+        worker_id = worker_id or cls.worker_id()
+        now = timezone.now()
+        cls.release_stale_jobs(now)
+        candidates = DocumentJob.objects.filter(status='queued', run_after__lte=now).order_by('run_after')
+        for job_id in candidates.values_list('pk', flat=True)[:10]:
+            claimed = DocumentJob.objects.filter(pk=job_id, status='queued').update(
+                status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+            )
+            if claimed:
+                return DocumentJob.objects.select_related('lease', 'document').get(pk=job_id)
+        return None
+
+    @classmethod
+    def release_stale_jobs(cls, now=None):
+        """Put back in the queue the jobs of workers that died while running them"""
+        now = now or timezone.now()
+        stale_before = now - datetime.timedelta(seconds=cls.LOCK_TIMEOUT)
+        return DocumentJob.objects.filter(status='running', locked_at__lt=stale_before).update(
+            status='queued', locked_by='', locked_at=None, updated_at=now,
+        )
+
+    @classmethod
+    def process(cls, job):
+        """
+        Render the job's PDF and attach it to its document, scheduling a retry on failure
+
+        Returns:
+            bool: True if the document was generated
+        """
+        document = job.document
+        if document is None:
+            # Placeholder deleted by a user before the job ran
+            DocumentJob.objects.filter(pk=job.pk).update(status='done', locked_by='', locked_at=None)
+            return False
+        try:
+            template, _title, prefix = cls.DOCUMENT_TYPES[job.kind]
+            pdf_bytes = generate_pdf_bytes(template, cls.build_context(job))
+            document.file.save(f"{prefix}_{job.lease.contract_number or job.lease_id}.pdf", ContentFile(pdf_bytes), save=False)
+            document.status = 'ready'
+            document.save(update_fields=['file', 'status'])
+        except Exception as e:
+            logger.exception(f"Document job {job.idempotency_key} failed (attempt {job.attempts})")
+            cls._fail(job, e)
+            return False
+        DocumentJob.objects.filter(pk=job.pk).update(
+            status='done', locked_by='', locked_at=None, last_error='', updated_at=timezone.now(),
+        )
+        logger.info(f"Document job {job.idempotency_key} done")
+        return True
+
+    @classmethod
+    def _fail(cls, job, error):
+        now = timezone.now()
+        attempts = DocumentJob.objects.filter(pk=job.pk).values_list('attempts', flat=True).first() or job.attempts
+        changes = {'locked_by': '', 'locked_at': None, 'last_error': str(error)[:2000], 'updated_at': now}
+        if attempts >= cls.MAX_ATTEMPTS:
+            DocumentJob.objects.filter(pk=job.pk).update(status='failed', **changes)
+            Document.objects.filter(pk=job.document_id).update(status='failed')
+        else:
+            delay = cls.RETRY_DELAY * 2 ** max(attempts - 1, 0)
+            DocumentJob.objects.filter(pk=job.pk).update(
+                status='queued', run_after=now + datetime.timedelta(seconds=delay), **changes
+            )
+
+    @classmethod
+    def build_context(cls, job):
+        """Build the template context of a job"""
+        lease = job.lease
+        company = CompanyService.get()
+        context = {'lease': lease, 'today': timezone.now().date(), 'company': company}
+        if job.kind == 'initial_invoice':
+            if not company:
+                context['company'] = Company.objects.create(
+                    name="شركة افتراضية",
+                    contact_email="default@company.com",
+                    contact_phone="1234567890"
+                )
+            context['total_fees'] = float(lease.office_fee or 0) + float(lease.admin_fee or 0) + float(lease.registration_fee or 0)
+        old_lease_id = job.params.get('old_lease_id')
+        if old_lease_id:
+            context['old_lease'] = Lease.objects.filter(pk=old_lease_id).first()
+        return context
+
+    @classmethod
+    def run_pending(cls, limit=None, worker_id=None):
+        """
+        Process runnable jobs in the current process until the queue is empty
+
+        Returns:
+            int: Number of jobs processed
+        """
+        processed = 0
+        while limit is None or processed < limit:
+            job = cls.claim(worker_id)
+            if job is None:
+                break
+            cls.process(job)
+            processed += 1
+        return processed
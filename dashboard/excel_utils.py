@@ -1,7 +1,10 @@
+import tempfile
+
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse
 from datetime import datetime
 from decimal import Decimal
 
@@ -288,3 +291,163 @@ class ExcelExporter:
         
         self.wb.save(response)
         return response
+
+
+class StreamingExcelExporter:
+    """مصدّر Excel للملفات الكبيرة بذاكرة ثابتة
+
+    Same interface as ExcelExporter, built on a write-only workbook: each row
+    is written to a temporary file as soon as it is added, and every cell
+    points to a named style registered once per workbook instead of carrying
+    its own Font, PatternFill and Border objects. Rows can only be added in
+    order, and set_column_widths must be called before the first row.
+    """
+
+    COLORS = ExcelExporter.COLORS
+
+    NUMBER_FORMATS = {
+        'currency': '#,##0.00 "ر.ع"',
+        'percentage': '0.00"%"',
+        'number': '#,##0',
+    }
+
+    # نمط الخلية: (حجم الخط، عريض، لون النص، لون الخلفية)
+    STYLES = {
+        'title': (18, True, 'header_text', 'header_bg'),
+        'header': (13, True, 'header_text', 'header_bg'),
+        'normal': (10, False, None, None),
+        'total': (11, True, 'total_text', 'total_bg'),
+        'percentage': (11, False, 'percentage_text', 'percentage_bg'),
+        'warning': (11, False, 'warning_text', 'warning_bg'),
+        'success': (11, False, 'success_text', 'success_bg'),
+        'total_summary': (12, True, 'total_text', 'total_bg'),
+        'percentage_summary': (11, True, 'percentage_text', 'percentage_bg'),
+    }
+
+    def __init__(self, title="تقرير"):
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet()
+        self.title = title
+        self.current_row = 1
+        self._styles = set()
+
+    def _style(self, style, num_format=None):
+        """اسم النمط المسجل في الملف لنوع الصف والتنسيق الرقمي"""
+        name = f"{style}_{num_format or 'general'}"
+        if name not in self._styles:
+            size, bold, text_color, bg_color = self.STYLES[style]
+            thin_border = Side(style='thin', color='000000')
+            named_style = NamedStyle(
+                name=name,
+                font=Font(name='Arial', size=size, bold=bold, color=self.COLORS[text_color] if text_color else None),
+                alignment=Alignment(horizontal='center', vertical='center', wrap_text=True, readingOrder=2),
+                border=Border(left=thin_border, right=thin_border, top=thin_border, bottom=thin_border),
+                number_format=self.NUMBER_FORMATS.get(num_format, 'General'),
+            )
+            if bg_color:
+                named_style.fill = PatternFill(
+                    start_color=self.COLORS[bg_color], end_color=self.COLORS[bg_color], fill_type='solid'
+                )
+            self.wb.add_named_style(named_style)
+            self._styles.add(name)
+        return name
+
+    def _cell(self, value, style, num_format=None):
+        cell = WriteOnlyCell(self.ws, value=float(value) if isinstance(value, Decimal) else value)
+        cell.style = self._style(style, num_format)
+        return cell
+
+    def _append(self, cells, height=None):
+        if height:
+            self.ws.row_dimensions[self.current_row].height = height
+        self.ws.append(cells)
+        self.current_row += 1
+
+    def _merge(self, end_column):
+        if end_column > 1:
+            self.ws.merged_cells.add(
+                f"A{self.current_row}:{get_column_letter(end_column)}{self.current_row}"
+            )
+
+    def add_title(self, title=None, num_columns=7):
+        """إضافة عنوان كبير في الصف الأول (قبل أي صف آخر)"""
+        if title:
+            self.title = title
+        self._merge(num_columns)
+        cells = [self._cell(self.title, 'title')]
+        cells += [self._cell(None, 'title') for _ in range(num_columns - 1)]
+        self._append(cells, height=40)
+        return self
+
+    def create_header(self, headers):
+        """إنشاء صف العناوين"""
+        self._append([self._cell(header, 'header') for header in headers], height=30)
+        return self
+
+    def add_row(self, values, style='normal', number_formats=None):
+        """إضافة صف بيانات (نفس معاملات ExcelExporter.add_row)"""
+        if number_formats is None:
+            number_formats = [None] * len(values)
+        self._append([
+            self._cell(value, style, num_format) for value, num_format in zip(values, number_formats)
+        ])
+        return self
+
+    def add_rows(self, rows, style='normal', number_formats=None):
+        """إضافة صفوف من أي iterable (مثل queryset.values_list().iterator())"""
+        for values in rows:
+            self.add_row(values, style, number_formats)
+        return self
+
+    def add_total_row(self, label, value, col_span=None, value_type='number'):
+        """إضافة صف المجموع"""
+        if col_span:
+            self._merge(col_span - 1)
+            cells = [self._cell(label, 'total_summary')]
+            cells += [self._cell(None, 'total_summary') for _ in range(col_span - 2)]
+            cells.append(self._cell(value, 'total_summary', value_type))
+            self._append(cells, height=25)
+        else:
+            self.add_empty_row()
+        return self
+
+    def add_percentage_row(self, label, percentage, col_span=None):
+        """إضافة صف النسبة المئوية"""
+        if col_span:
+            self._merge(col_span - 1)
+            cells = [self._cell(label, 'percentage_summary')]
+            cells += [self._cell(None, 'percentage_summary') for _ in range(col_span - 2)]
+            cells.append(self._cell(percentage, 'percentage_summary', 'percentage'))
+            self._append(cells, height=22)
+        else:
+            self.add_empty_row()
+        return self
+
+    def add_empty_row(self):
+        """إضافة صف فارغ للمسافة"""
+        self._append([])
+        return self
+
+    def set_column_widths(self, widths):
+        """تعيين عرض الأعمدة (قبل إضافة أي صف)"""
+        for col_num, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(col_num)].width = width
+        return self
+
+    def save(self, file):
+        """حفظ الملف (مرة واحدة فقط في الوضع write-only)"""
+        self.wb.save(file)
+        return file
+
+    def get_response(self, filename=None):
+        """الحصول على FileResponse يرسل الملف من القرص على دفعات"""
+        if not filename:
+            filename = f"{self.title}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        # Deleted when the response closes the file
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx')
+        self.save(tmp)
+        tmp.seek(0)
+        return FileResponse(
+            tmp, as_attachment=True, filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
@@ -1,9 +1,14 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.conf import settings
 from django.utils.translation import gettext as _
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Q
 from decimal import Decimal
-from .models import Tenant, Lease, Payment, Expense, Building, Unit, MaintenanceRequest
-from .excel_utils import ExcelExporter
+from .models import Tenant, Lease, Payment, Expense, MaintenanceRequest
+from .excel_utils import ExcelExporter, StreamingExcelExporter
+from .batch_export_service import BatchPDFExportService
+from .occupancy_service import OccupancyService
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
 
 
 def staff_required(user):
@@ -119,42 +124,74 @@ def export_leases_excel(request):
     return exporter.get_response("قائمة_العقود.xlsx")
 
 
+PAYMENT_METHOD_DISPLAY = {
+    'cash': 'نقدي',
+    'check': 'شيك',
+    'bank_transfer': 'تحويل بنكي'
+}
+
+CHECK_STATUS_DISPLAY = {
+    'pending': 'معلق',
+    'cashed': 'تم الصرف',
+    'returned': 'مرتجع'
+}
+
+PAYMENT_HEADERS = ["#", "رقم العقد", "المستأجر", "المبلغ", "تاريخ الدفع", "الشهر", "طريقة الدفع", "حالة الشيك"]
+PAYMENT_COLUMN_WIDTHS = [8, 15, 25, 15, 15, 12, 18, 18]
+PAYMENT_NUMBER_FORMATS = [None, None, None, 'currency', None, None, None, None]
+
+
+def add_payment_statistics(exporter, total_payments, total_amount, cash_amount, check_amount):
+    """إضافة صفوف الإحصائيات في نهاية قائمة المدفوعات"""
+    col_span = len(PAYMENT_HEADERS)
+    exporter.add_empty_row()
+    exporter.add_total_row("إجمالي المدفوعات", total_payments, col_span=col_span, value_type='number')
+    exporter.add_total_row("إجمالي المبالغ", total_amount, col_span=col_span, value_type='currency')
+    exporter.add_total_row("المدفوعات النقدية", cash_amount, col_span=col_span, value_type='currency')
+    exporter.add_total_row("مدفوعات الشيكات", check_amount, col_span=col_span, value_type='currency')
+    
+    # النسب المئوية
+    if total_amount > 0:
+        cash_percentage = round((cash_amount / total_amount) * 100, 2)
+        check_percentage = round((check_amount / total_amount) * 100, 2)
+        exporter.add_percentage_row("نسبة المدفوعات النقدية", cash_percentage, col_span=col_span)
+        exporter.add_percentage_row("نسبة مدفوعات الشيكات", check_percentage, col_span=col_span)
+
+
 @login_required
 @user_passes_test(staff_required)
 def export_payments_excel(request):
-    """تصدير قائمة المدفوعات إلى Excel"""
+    """تصدير قائمة المدفوعات إلى Excel
+
+    Large exports (more than EXCEL_STREAMING_THRESHOLD payments, or
+    ``?stream=1``) use the streaming exporter; ``?stream=0`` forces the
+    in-memory one.
+    """
+    payments = Payment.objects.all().select_related('lease', 'lease__tenant').order_by('-payment_date')
+    total_payments = payments.count()
+    stream = request.GET.get('stream')
+    if stream == '1' or (stream is None and total_payments > getattr(settings, 'EXCEL_STREAMING_THRESHOLD', 5000)):
+        return export_payments_excel_streaming()
+
     exporter = ExcelExporter("قائمة المدفوعات")
     
-    # العناوين
-    headers = ["#", "رقم العقد", "المستأجر", "المبلغ", "تاريخ الدفع", "الشهر", "طريقة الدفع", "حالة الشيك"]
-    
     # العنوان
-    exporter.add_title("قائمة المدفوعات", num_columns=len(headers))
+    exporter.add_title("قائمة المدفوعات", num_columns=len(PAYMENT_HEADERS))
     exporter.add_empty_row()
     
-    exporter.create_header(headers)
+    exporter.create_header(PAYMENT_HEADERS)
     
     # البيانات
-    payments = Payment.objects.all().select_related('lease', 'lease__tenant').order_by('-payment_date')
-    total_payments = payments.count()
     total_amount = Decimal('0')
     cash_amount = Decimal('0')
     check_amount = Decimal('0')
     
     for idx, payment in enumerate(payments, 1):
-        payment_method_display = {
-            'cash': 'نقدي',
-            'check': 'شيك',
-            'bank_transfer': 'تحويل بنكي'
-        }.get(payment.payment_method, payment.payment_method)
+        payment_method_display = PAYMENT_METHOD_DISPLAY.get(payment.payment_method, payment.payment_method)
         
         check_status_display = "-"
         if payment.payment_method == 'check':
-            check_status_display = {
-                'pending': 'معلق',
-                'cashed': 'تم الصرف',
-                'returned': 'مرتجع'
-            }.get(payment.check_status, payment.check_status or '-')
+            check_status_display = CHECK_STATUS_DISPLAY.get(payment.check_status, payment.check_status or '-')
         
         total_amount += payment.amount
         if payment.payment_method == 'cash':
@@ -171,28 +208,66 @@ def export_payments_excel(request):
             f"{payment.payment_for_month}/{payment.payment_for_year}",
             payment_method_display,
             check_status_display
-        ], number_formats=[None, None, None, 'currency', None, None, None, None])
+        ], number_formats=PAYMENT_NUMBER_FORMATS)
     
     # الإحصائيات
-    exporter.add_empty_row()
-    exporter.add_total_row("إجمالي المدفوعات", total_payments, col_span=len(headers), value_type='number')
-    exporter.add_total_row("إجمالي المبالغ", total_amount, col_span=len(headers), value_type='currency')
-    exporter.add_total_row("المدفوعات النقدية", cash_amount, col_span=len(headers), value_type='currency')
-    exporter.add_total_row("مدفوعات الشيكات", check_amount, col_span=len(headers), value_type='currency')
-    
-    # النسب المئوية
-    if total_amount > 0:
-        cash_percentage = round((cash_amount / total_amount) * 100, 2)
-        check_percentage = round((check_amount / total_amount) * 100, 2)
-        exporter.add_percentage_row("نسبة المدفوعات النقدية", cash_percentage, col_span=len(headers))
-        exporter.add_percentage_row("نسبة مدفوعات الشيكات", check_percentage, col_span=len(headers))
+    add_payment_statistics(exporter, total_payments, total_amount, cash_amount, check_amount)
     
     # عرض الأعمدة
-    exporter.set_column_widths([8, 15, 25, 15, 15, 12, 18, 18])
+    exporter.set_column_widths(PAYMENT_COLUMN_WIDTHS)
     
     return exporter.get_response("قائمة_المدفوعات.xlsx")
 
 
+def export_payments_excel_streaming():
+    """تصدير قائمة المدفوعات بذاكرة ثابتة
+
+    Rows are read with ``values_list().iterator()`` in chunks of
+    EXCEL_EXPORT_CHUNK_SIZE and written straight to a write-only workbook on
+    disk; the totals come from one aggregate query.
+
+    Returns:
+        FileResponse: The workbook, sent from a temporary file
+    """
+    exporter = StreamingExcelExporter("قائمة المدفوعات")
+    exporter.set_column_widths(PAYMENT_COLUMN_WIDTHS)
+    exporter.add_title("قائمة المدفوعات", num_columns=len(PAYMENT_HEADERS))
+    exporter.add_empty_row()
+    exporter.create_header(PAYMENT_HEADERS)
+
+    totals = Payment.objects.aggregate(
+        count=Count('id'),
+        total=Sum('amount'),
+        cash=Sum('amount', filter=Q(payment_method='cash')),
+        check=Sum('amount', filter=Q(payment_method='check')),
+    )
+    rows = Payment.objects.order_by('-payment_date').values_list(
+        'lease__contract_number', 'lease__tenant__name', 'amount', 'payment_date',
+        'payment_for_month', 'payment_for_year', 'payment_method', 'check_status',
+    ).iterator(chunk_size=getattr(settings, 'EXCEL_EXPORT_CHUNK_SIZE', 2000))
+
+    for idx, (contract_number, tenant_name, amount, payment_date, month, year, method, check_status) in enumerate(rows, 1):
+        check_status_display = "-"
+        if method == 'check':
+            check_status_display = CHECK_STATUS_DISPLAY.get(check_status, check_status or '-')
+        exporter.add_row([
+            idx,
+            contract_number,
+            tenant_name,
+            amount,
+            payment_date.strftime('%Y-%m-%d'),
+            f"{month}/{year}",
+            PAYMENT_METHOD_DISPLAY.get(method, method),
+            check_status_display
+        ], number_formats=PAYMENT_NUMBER_FORMATS)
+
+    add_payment_statistics(
+        exporter, totals['count'], totals['total'] or Decimal('0'),
+        totals['cash'] or Decimal('0'), totals['check'] or Decimal('0'),
+    )
+    return exporter.get_response("قائمة_المدفوعات.xlsx")
+
+
 @login_required
 @user_passes_test(staff_required)
 def export_expenses_excel(request):
@@ -277,18 +352,17 @@ def export_buildings_excel(request):
     exporter.create_header(headers)
     
     # البيانات
-    buildings = Building.objects.all().order_by('name')
-    total_buildings = buildings.count()
+    buildings = OccupancyService.get_building_index()
+    total_buildings = len(buildings)
     total_units = 0
     total_occupied = 0
     total_available = 0
     
     for idx, building in enumerate(buildings, 1):
-        units = Unit.objects.filter(building=building)
-        units_count = units.count()
-        occupied = units.filter(is_available=False).count()
-        available = units.filter(is_available=True).count()
-        occupancy_rate = round((occupied / units_count * 100), 2) if units_count > 0 else 0
+        units_count = building.total_units
+        occupied = building.occupied_units
+        available = building.available_units
+        occupancy_rate = round(building.occupancy_rate, 2)
         
         total_units += units_count
         total_occupied += occupied
@@ -346,8 +420,8 @@ def export_units_excel(request):
     exporter.create_header(headers)
     
     # البيانات
-    units = Unit.objects.all().select_related('building').order_by('building', 'unit_number')
-    total_units = units.count()
+    units = OccupancyService.get_unit_index()
+    total_units = len(units)
     available_units = 0
     occupied_units = 0
     total_rent = Decimal('0')
@@ -361,11 +435,8 @@ def export_units_excel(request):
         
         status_display = "متاحة" if unit.is_available else "مشغولة"
         
-        # البحث عن المستأجر الحالي
-        current_lease = Lease.objects.filter(
-            unit=unit, 
-            status__in=['active', 'expiring_soon']
-        ).first()
+        # المستأجر الحالي (محسوب مسبقاً لكل الوحدات)
+        current_lease = unit.current_lease
         
         tenant_name = "-"
         monthly_rent = None
@@ -481,3 +552,31 @@ def export_maintenance_excel(request):
     exporter.set_column_widths([8, 30, 25, 30, 15, 18, 18])
     
     return exporter.get_response("طلبات_الصيانة.xlsx")
+
+
+@login_required
+@user_passes_test(staff_required)
+def export_pdf_batch(request):
+    """تصدير مجموعة إيصالات أو كشوف حساب أو إنذارات تأخير في ملف ZIP واحد"""
+    kind = request.GET.get('kind', 'receipts')
+    try:
+        items = BatchPDFExportService.get_items(
+            kind,
+            building_id=request.GET.get('building') or None,
+            month=request.GET.get('month') or None,
+            status=request.GET.get('status') or None,
+        )
+    except ValueError:
+        return HttpResponseBadRequest(_("معايير التصدير غير صحيحة"))
+    max_items = getattr(settings, 'BATCH_EXPORT_REQUEST_MAX_ITEMS', 200)
+    if len(items) > max_items:
+        return HttpResponseBadRequest(
+            _("عدد المستندات (%(count)d) أكبر من الحد المسموح (%(max)d). يرجى تضييق معايير التصدير.") % {
+                'count': len(items), 'max': max_items,
+            }
+        )
+
+    # Rendered in this process: no worker pool is started from a web request
+    response = StreamingHttpResponse(BatchPDFExportService.stream_zip(items, processes=1), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{kind}_{timezone.now():%Y%m%d_%H%M}.zip"'
+    return response
@@ -0,0 +1,107 @@
+"""
+Lease Lifecycle Service for tracking lease changes and dispatching their side effects
+"""
+from functools import partial
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Lease, Unit
+from .occupancy_service import OccupancyService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sent once the transaction that saved a lease commits, with ``lease`` and
+# ``event`` ('created', 'cancelled', 'renewed' or 'expiring_soon')
+lease_event = Signal()
+
+
+class LeaseLifecycleService:
+    """
+    Service class for the side effects of saving a lease
+
+    The tracked fields are snapshotted when a lease is loaded
+    (``Lease.from_db``), so a save knows what changed without querying the
+    old row. The unit is written only when the lease's occupancy actually
+    changes, and documents and notifications are dispatched as
+    ``lease_event`` signals after the transaction commits (handlers live in
+    ``signals.py``).
+    """
+
+    TRACKED_FIELDS = ('status', 'unit_id')
+    OCCUPYING_STATUSES = ('active', 'expiring_soon')
+
+    @classmethod
+    def take_snapshot(cls, lease):
+        """Remember the tracked field values that are loaded on ``lease``"""
+        lease._lifecycle_snapshot = {
+            field: lease.__dict__[field] for field in cls.TRACKED_FIELDS if field in lease.__dict__
+        }
+
+    @classmethod
+    def previous_state(cls, lease):
+        """
+        Get the tracked values of a lease as stored in the database
+
+        Returns:
+            dict: Tracked field values, or None for a new lease
+        """
+        if lease._state.adding:
+            return None
+        snapshot = lease.__dict__.get('_lifecycle_snapshot') or {}
+        if len(snapshot) == len(cls.TRACKED_FIELDS):
+            return snapshot
+        # Instance not loaded through the ORM, or loaded with deferred fields
+        return Lease.objects.filter(pk=lease.pk).values(*cls.TRACKED_FIELDS).first()
+
+    @classmethod
+    def set_unit_availability(cls, unit_id, available, lease=None):
+        """Update a unit's availability and its building's counters if it differs (no write otherwise)"""
+        unit = Unit.objects.filter(pk=unit_id).exclude(is_available=available)
+        building_id = lease.unit.building_id if lease is not None and Lease.unit.is_cached(lease) else None
+        if building_id is None:
+            building_id = unit.values_list('building_id', flat=True).first()
+            if building_id is None:
+                return False
+        changed = unit.update(is_available=available)
+        if changed:
+            OccupancyService.apply_availability([building_id], available)
+        if lease is not None and Lease.unit.is_cached(lease):
+            lease.unit.is_available = available
+        return bool(changed)
+
+    @classmethod
+    def dispatch(cls, lease, event):
+        """Send ``lease_event`` for ``lease`` once the current transaction commits"""
+        transaction.on_commit(partial(lease_event.send, sender=Lease, lease=lease, event=event))
+
+    @classmethod
+    def after_save(cls, lease, previous):
+        """
+        Apply the side effects of a save
+
+        Args:
+            lease: The saved lease
+            previous: ``previous_state`` taken before the save
+        """
+        old_status = previous['status'] if previous else None
+        old_unit_id = previous['unit_id'] if previous else None
+        occupied = lease.status in cls.OCCUPYING_STATUSES
+
+        if previous is None or old_unit_id != lease.unit_id or \
+                (old_status in cls.OCCUPYING_STATUSES) != occupied:
+            if old_unit_id and old_unit_id != lease.unit_id:
+                cls.set_unit_availability(old_unit_id, True)
+            cls.set_unit_availability(lease.unit_id, not occupied, lease)
+
+        if previous is None:
+            cls.dispatch(lease, 'created')
+        elif old_status != 'cancelled' and lease.status == 'cancelled':
+            cls.dispatch(lease, 'cancelled')
+        elif old_status not in ('renewed', 'cancelled') and lease.status == 'renewed':
+            cls.dispatch(lease, 'renewed')
+        if old_status != 'expiring_soon' and lease.status == 'expiring_soon':
+            cls.dispatch(lease, 'expiring_soon')
+
+        cls.take_snapshot(lease)
@@ -0,0 +1,147 @@
+"""
+Lease Status Service for set-based lease status transitions
+"""
+import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .models import Lease, Unit
+from .notification_service import NotificationService
+from .occupancy_service import OccupancyService
+from .snapshot_service import DashboardSnapshotService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseStatusService:
+    """
+    Service class for the date-driven lease status transitions
+
+    Applies the rules of ``Lease.update_status`` to all leases at once with
+    one UPDATE per transition instead of loading and saving every lease.
+    Only 'active' and 'expiring_soon' leases move ('expired', 'renewed' and
+    'cancelled' are left alone, as in the nightly command).
+    """
+
+    OCCUPYING_STATUSES = ('active', 'expiring_soon')
+
+    @classmethod
+    def expiring_soon_threshold(cls, today):
+        """
+        Latest end date for which a lease is 'expiring_soon' on ``today``
+
+        Equivalent to ``end_date - relativedelta(months=1) <= today``: on the
+        last day of a month every end date of the next month qualifies.
+        """
+        threshold = today + relativedelta(months=1)
+        if (today + datetime.timedelta(days=1)).month != today.month:
+            threshold += relativedelta(day=31)
+        return threshold
+
+    @classmethod
+    def expiring_soon_message(cls, lease):
+        return _("'عقد الإيجار الخاص بك رقم {} سينتهي قريب في تاريخ {}'").format(
+            lease.contract_number, lease.end_date.strftime('%Y-%m-%d')
+        )
+
+    @classmethod
+    def _transition(cls, queryset, status):
+        """
+        Move the leases of a queryset to ``status``
+
+        Returns:
+            list: (lease id, unit id) of the moved leases
+        """
+        rows = list(queryset.values_list('pk', 'unit_id'))
+        if rows:
+            queryset.update(status=status)
+        return rows
+
+    @classmethod
+    def apply_transitions(cls, today=None):
+        """
+        Update the status of every lease whose end date crossed a threshold
+
+        Returns:
+            dict: Changeset with the lease ids moved to 'expired',
+                'expiring_soon' and 'active', and the ids of the units that
+                became available
+        """
+        today = today or timezone.now().date()
+        threshold = cls.expiring_soon_threshold(today)
+        leases = Lease.objects.order_by()
+        with transaction.atomic():
+            expired = cls._transition(
+                leases.filter(status__in=cls.OCCUPYING_STATUSES, end_date__lt=today), 'expired'
+            )
+            expiring_soon = cls._transition(
+                leases.filter(status='active', end_date__gte=today, end_date__lte=threshold), 'expiring_soon'
+            )
+            active = cls._transition(leases.filter(status='expiring_soon', end_date__gt=threshold), 'active')
+            units_freed = []
+            if expired:
+                # Units of the expired leases that no other lease occupies
+                occupied = Lease.objects.filter(unit=OuterRef('pk'), status__in=cls.OCCUPYING_STATUSES)
+                units = Unit.objects.filter(
+                    pk__in={unit_id for _lease_id, unit_id in expired}, is_available=False,
+                ).exclude(Exists(occupied))
+                freed = list(units.values_list('pk', 'building_id'))
+                if freed:
+                    units.update(is_available=True)
+                    OccupancyService.apply_availability([building_id for _pk, building_id in freed], True)
+                units_freed = [pk for pk, _building_id in freed]
+        if expired or expiring_soon or active:
+            DashboardSnapshotService.invalidate()  # the bulk updates send no signals
+        changeset = {
+            'expired': [lease_id for lease_id, _unit_id in expired],
+            'expiring_soon': [lease_id for lease_id, _unit_id in expiring_soon],
+            'active': [lease_id for lease_id, _unit_id in active],
+            'units_freed': units_freed,
+        }
+        logger.info(
+            "Lease status transitions: "
+            + ', '.join(f"{key}={len(ids)}" for key, ids in changeset.items())
+        )
+        return changeset
+
+    @classmethod
+    def notify(cls, changeset):
+        """
+        Create the notifications of a changeset (the bulk updates send no signals)
+
+        Tenants of leases that became 'expiring_soon' are notified once per
+        lease, like the ``lease_status_notification`` signal does.
+
+        Returns:
+            int: Number of notifications created
+        """
+        leases = list(
+            Lease.objects.filter(pk__in=changeset['expiring_soon'], tenant__user__isnull=False)
+            .select_related('tenant')
+        )
+        if not leases:
+            return 0
+        return NotificationService.create_many([
+            NotificationService.build(
+                lease.tenant.user_id, cls.expiring_soon_message(lease),
+                kind='lease_expiring', related_object=lease, period=lease.end_date.isoformat(),
+            )
+            for lease in leases
+        ])
+
+    @classmethod
+    def run(cls, today=None):
+        """
+        Apply the status transitions and their notifications
+
+        Returns:
+            dict: The changeset, plus the number of 'notifications' created
+        """
+        changeset = cls.apply_transitions(today)
+        changeset['notifications'] = cls.notify(changeset)
+        return changeset
@@ -0,0 +1,172 @@
+"""
+Ledger Service for building month-by-month lease payment summaries
+"""
+from collections import defaultdict
+from decimal import Decimal
+import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import QuerySet, Sum
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class LedgerService:
+    """Service class for lease ledger operations"""
+
+    @classmethod
+    def lease_months(cls, lease):
+        """
+        Iterate over the (year, month) pairs covered by a lease
+
+        Args:
+            lease: Lease instance
+
+        Yields:
+            tuple: (year, month)
+        """
+        current_date = lease.start_date
+        while current_date <= lease.end_date:
+            yield current_date.year, current_date.month
+            current_date += relativedelta(months=1)
+
+    @classmethod
+    def get_payment_summary(cls, lease):
+        """
+        Build the month-by-month payment summary of a lease
+
+        All payments of the lease are loaded in a single query (or taken from
+        a ``prefetch_related('payments')`` cache when available) and grouped
+        in memory, instead of querying the database once per month.
+
+        Args:
+            lease: Lease instance
+
+        Returns:
+            list: One dict per month of the lease
+        """
+        prefetched = getattr(lease, '_prefetched_objects_cache', {}).get('payments')
+        if prefetched is not None:
+            payments = sorted(prefetched, key=lambda p: p.pk)
+        else:
+            payments = lease.payments.order_by('pk').only(
+                'id', 'lease_id', 'amount', 'payment_for_year', 'payment_for_month',
+                'payment_method', 'payment_date',
+            )
+
+        totals = defaultdict(Decimal)
+        first_payments = {}
+        for payment in payments:
+            key = (payment.payment_for_year, payment.payment_for_month)
+            totals[key] += payment.amount
+            first_payments.setdefault(key, payment)
+
+        return cls.build_rows(lease, totals, first_payments)
+
+    @classmethod
+    def get_portfolio_arrears(cls, leases):
+        """
+        Compute paid, partial and due months for many leases at once
+
+        Payments are grouped on (lease_id, payment_for_year, payment_for_month)
+        in a single aggregate query, so the number of queries does not depend
+        on the number of leases. The month rows carry the same keys as
+        ``get_payment_summary`` except ``payment_method`` and
+        ``payment_date``, which are always None.
+
+        Args:
+            leases: QuerySet or iterable of Lease instances
+
+        Returns:
+            dict: Maps each lease id to a dict with the lease, its month rows,
+                the paid, partial and due rows, and the rows overdue before
+                the current month together with their outstanding balance
+        """
+        from .models import Payment
+
+        if isinstance(leases, QuerySet):
+            payments = Payment.objects.filter(lease__in=leases.values('pk'))
+            leases = list(leases)
+        else:
+            leases = list(leases)
+            payments = Payment.objects.filter(lease_id__in=[lease.pk for lease in leases])
+
+        totals = defaultdict(dict)
+        grouped = (
+            payments.order_by()
+            .values('lease_id', 'payment_for_year', 'payment_for_month')
+            .annotate(total=Sum('amount'))
+        )
+        for row in grouped:
+            totals[row['lease_id']][(row['payment_for_year'], row['payment_for_month'])] = row['total']
+
+        first_day_of_current_month = timezone.now().date().replace(day=1)
+        arrears = {}
+        for lease in leases:
+            months = cls.build_rows(lease, totals.get(lease.pk, {}))
+            overdue_months = [
+                m for m in months
+                if datetime.date(m['year'], m['month'], 1) < first_day_of_current_month and m['balance'] > 0
+            ]
+            arrears[lease.pk] = {
+                'lease': lease,
+                'months': months,
+                'paid_months': [m for m in months if m['amount_paid'] >= m['rent_due']],
+                'partial_months': [m for m in months if 0 < m['amount_paid'] < m['rent_due']],
+                'due_months': [m for m in months if not m['amount_paid']],
+                'overdue_months': overdue_months,
+                'overdue_balance': sum((m['balance'] for m in overdue_months), Decimal('0')),
+            }
+        return arrears
+
+    @classmethod
+    def build_rows(cls, lease, totals, first_payments=None):
+        """
+        Build the summary rows of a lease from pre-grouped payment totals
+
+        Args:
+            lease: Lease instance
+            totals: dict mapping (year, month) to the amount paid for that month
+            first_payments: optional dict mapping (year, month) to the Payment
+                whose method and date are displayed for that month
+
+        Returns:
+            list: One dict per month of the lease
+        """
+        first_payments = first_payments or {}
+        today = timezone.now().date()
+        summary = []
+        for year, month in cls.lease_months(lease):
+            paid_for_month = totals.get((year, month)) or 0
+            balance = lease.monthly_rent - paid_for_month
+            status = 'due'
+            payment_method = None
+            payment_date = None
+
+            latest_payment = first_payments.get((year, month))
+            if latest_payment is not None:
+                payment_method = latest_payment.get_payment_method_display()
+                payment_date = latest_payment.payment_date
+
+            if paid_for_month >= lease.monthly_rent:
+                status = 'paid'
+            elif paid_for_month > 0:
+                status = 'partial'
+
+            due_date = datetime.date(year, month, 1)
+            if due_date < today and status != 'due':
+                status = 'upcoming'
+
+            summary.append({
+                'month': month,
+                'year': year,
+                'month_name': _(due_date.strftime('%B')),
+                'rent_due': lease.monthly_rent,
+                'amount_paid': paid_for_month,
+                'balance': balance,
+                'status': status,
+                'payment_method': payment_method,
+                'payment_date': payment_date,
+                'next_payment_date': due_date + relativedelta(months=1),
+            })
+        return summary
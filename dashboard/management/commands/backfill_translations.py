@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext as _
+from dashboard.translation_service import TranslationService
+
+
+class Command(BaseCommand):
+    help = ('Fills empty English fields (buildings, tenants, expenses) from their Arabic text, '
+            'translating each distinct text once, in batches, through the phrase cache.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=[model.__name__ for model in TranslationService.FIELDS],
+                            help='Only this model (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Texts per translation backend call.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the texts to translate.')
+
+    def handle(self, *args, **options):
+        models = [apps.get_model('dashboard', name) for name in options['model'] or []] or None
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError(_('--batch-size must be positive'))
+        self.stdout.write(self.style.SUCCESS(
+            _('Translating with the "%(backend)s" backend...') % {'backend': TranslationService.get_backend()}
+        ))
+        result = TranslationService.backfill(models, options['batch_size'], options['dry_run'])
+        self.stdout.write(self.style.SUCCESS(
+            _('Process finished. %(texts)d distinct texts, %(translated)d translated, %(rows)d fields updated.') % result
+        ))
@@ -0,0 +1,91 @@
+import datetime
+import time
+import tracemalloc
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils.translation import gettext as _
+
+from dashboard.export_views import export_payments_excel
+from dashboard.models import Building, Lease, Payment, Tenant, Unit
+
+
+class Command(BaseCommand):
+    help = ('Compares time and peak memory of the in-memory and streaming payments Excel export '
+            'on generated payments (rolled back afterwards).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=20000, help='Number of payments to generate.')
+        parser.add_argument('--leases', type=int, default=200, help='Number of leases the payments belong to.')
+        parser.add_argument('--skip-legacy', action='store_true', help='Only run the streaming export.')
+
+    def seed(self, payments, leases):
+        building = Building.objects.bulk_create([Building(name='Benchmark', address='Benchmark')])[0]
+        units = Unit.objects.bulk_create([
+            Unit(building=building, unit_number=f'B{i}', unit_type='office', floor=1) for i in range(leases)
+        ])
+        tenants = Tenant.objects.bulk_create([
+            Tenant(name=f'Tenant {i}', tenant_type='individual', phone=f'9{i:07d}') for i in range(leases)
+        ])
+        start_date = datetime.date(2020, 1, 1)
+        lease_objects = Lease.objects.bulk_create([
+            Lease(
+                unit=unit, tenant=tenant, contract_number=f'BENCH-{i}', monthly_rent=Decimal('250.00'),
+                start_date=start_date, end_date=start_date + relativedelta(years=5, days=-1),
+                registration_fee=Decimal('0'), status='active',
+            )
+            for i, (unit, tenant) in enumerate(zip(units, tenants))
+        ])
+        methods = ['cash', 'check', 'bank_transfer']
+        batch = []
+        for i in range(payments):
+            month = start_date + relativedelta(months=i % 60)
+            batch.append(Payment(
+                lease=lease_objects[i % len(lease_objects)], amount=Decimal('250.00'),
+                payment_for_year=month.year, payment_for_month=month.month, payment_date=month,
+                payment_method=methods[i % 3], check_status='pending' if i % 3 == 1 else None,
+            ))
+            if len(batch) == 5000:
+                Payment.objects.bulk_create(batch)
+                batch = []
+        Payment.objects.bulk_create(batch)
+
+    def measure(self, request):
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = export_payments_excel(request)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+            # Not response.close(): its request_finished signal would close the
+            # database connection inside the seeding transaction
+            response.file_to_stream.close()
+        else:
+            size = len(response.content)
+        elapsed = time.perf_counter() - start
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak, size
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        modes = [('streaming', '1')] if options['skip_legacy'] else [('in-memory', '0'), ('streaming', '1')]
+
+        with transaction.atomic():
+            self.stdout.write(_('Generating %(count)d payments...') % {'count': options['payments']})
+            self.seed(options['payments'], max(options['leases'], 1))
+            user = User.objects.create(username='excel-benchmark', is_staff=True)
+
+            self.stdout.write(f"{'mode':<12} {'seconds':>10} {'peak MB':>10} {'file KB':>10}")
+            for label, stream in modes:
+                request = factory.get('/export/payments/', {'stream': stream})
+                request.user = user
+                elapsed, peak, size = self.measure(request)
+                self.stdout.write(f"{label:<12} {elapsed:>10.2f} {peak / 1024 / 1024:>10.1f} {size / 1024:>10.1f}")
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(_('Benchmark finished; generated data rolled back.')))
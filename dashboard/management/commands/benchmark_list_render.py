@@ -0,0 +1,85 @@
+import datetime
+import statistics
+import time
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext as _
+
+from dashboard.models import Building, Lease, Tenant, Unit
+from dashboard.occupancy_service import OccupancyService
+
+
+class Command(BaseCommand):
+    help = ('Measures render time and queries of the unit list, lease list and building delete pages '
+            'on generated units (rolled back afterwards).')
+
+    PAGES = ['unit_list', 'lease_list', 'building_list', 'building_delete']
+    # Private cache, cleared before every request without touching the site's cache (OTP codes, snapshots)
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-list-render',
+    }}
+
+    def add_arguments(self, parser):
+        parser.add_argument('--units', type=int, default=10000, help='Number of units (each with a lease) to generate.')
+        parser.add_argument('--buildings', type=int, default=20, help='Number of buildings the units belong to.')
+        parser.add_argument('--repeat', type=int, default=5, help='Requests per page (the median is reported).')
+
+    def seed(self, units, buildings):
+        building_objects = Building.objects.bulk_create([
+            Building(name=f'Benchmark {i}', address='Benchmark') for i in range(buildings)
+        ])
+        unit_objects = Unit.objects.bulk_create([
+            Unit(building=building_objects[i % buildings], unit_number=f'B{i}', unit_type='office', floor=1,
+                 is_available=False)
+            for i in range(units)
+        ], batch_size=2000)
+        tenants = Tenant.objects.bulk_create([
+            Tenant(name=f'Tenant {i}', tenant_type='individual', phone=f'9{i:07d}') for i in range(units)
+        ], batch_size=2000)
+        today = datetime.date.today()
+        Lease.objects.bulk_create([
+            Lease(
+                unit=unit, tenant=tenant, contract_number=f'BENCH-{i}', monthly_rent=Decimal('250.00'),
+                start_date=today - relativedelta(months=6), end_date=today + relativedelta(months=6),
+                registration_fee=Decimal('0'), status='active',
+            )
+            for i, (unit, tenant) in enumerate(zip(unit_objects, tenants))
+        ], batch_size=2000)
+        OccupancyService.reconcile()  # bulk inserts send no signals
+        return building_objects[0]
+
+    def measure(self, client, url, repeat):
+        timings = []
+        for _i in range(repeat):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings), len(queries), len(response.content), response.status_code
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES=self.CACHES), transaction.atomic():
+            self.stdout.write(_('Generating %(count)d units...') % {'count': options['units']})
+            building = self.seed(options['units'], max(options['buildings'], 1))
+            client = Client()
+            client.force_login(User.objects.create(username='render-benchmark', is_staff=True))
+
+            self.stdout.write(f"{'page':<18} {'ms':>10} {'queries':>8} {'HTML KB':>10}")
+            for page in self.PAGES:
+                url = reverse(page, kwargs={'pk': building.pk} if page == 'building_delete' else None)
+                elapsed, queries, size, status = self.measure(client, url, max(options['repeat'], 1))
+                line = f"{page:<18} {elapsed * 1000:>10.1f} {queries:>8} {size / 1024:>10.1f}"
+                self.stdout.write(line if status == 200 else self.style.ERROR(f"{line}  HTTP {status}"))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(_('Benchmark finished; generated data rolled back.')))
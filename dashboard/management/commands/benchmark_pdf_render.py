@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from dashboard.company_service import CompanyService
+from dashboard.models import Lease, Payment
+from dashboard.pdf_renderer import PDFRenderer
+
+REPORT_TEMPLATES = [
+    'dashboard/reports/payment_receipt.html',
+    'dashboard/reports/tenant_statement.html',
+    'dashboard/reports/lease_initial_invoice.html',
+    'dashboard/reports/lease_cancellation_notice.html',
+    'dashboard/reports/lease_renewal_notice.html',
+    'dashboard/reports/lease_overdue_notice.html',
+    'dashboard/reports/monthly_pl_report.html',
+    'dashboard/reports/annual_pl_report.html',
+    'dashboard/reports/occupancy_report.html',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compares cold (new WeasyPrint HTML per render) and warm (PDFRenderer) render times of the report templates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5, help='Renders per template and mode.')
+        parser.add_argument('--template', action='append', dest='templates', help='Only benchmark this template.')
+
+    def build_context(self):
+        payment = Payment.objects.select_related('lease__tenant', 'lease__unit__building').first()
+        lease = payment.lease if payment else Lease.objects.select_related('tenant', 'unit__building').first()
+        if lease is None:
+            raise CommandError(_('At least one lease is needed to render the reports.'))
+        today = timezone.now().date()
+        return {
+            'lease': lease,
+            'old_lease': lease,
+            'payment': payment,
+            'payments': list(lease.payments.all()),
+            'company': CompanyService.get(),
+            'today': today,
+            'total_fees': float(lease.office_fee or 0) + float(lease.admin_fee or 0) + float(lease.registration_fee or 0),
+            'type': 'payment',
+            'months': 3,
+            'year': today.year,
+            'month': today.month,
+            'income_list': [],
+            'expenses_list': [],
+            'total_income': 0,
+            'total_expenses': 0,
+            'net_profit': 0,
+        }
+
+    def handle(self, *args, **options):
+        try:
+            from weasyprint import HTML
+        except Exception as e:
+            raise CommandError(_('WeasyPrint is not available: %(error)s') % {'error': e})
+
+        iterations = max(options['iterations'], 1)
+        context = self.build_context()
+        renderer = PDFRenderer()
+        renderer.warm_up()
+
+        self.stdout.write(f"{'template':<50} {'cold ms':>10} {'warm ms':>10} {'speedup':>8}")
+        for template_path in options['templates'] or REPORT_TEMPLATES:
+            html = get_template(template_path).render(context)
+
+            cold = []
+            for _i in range(iterations):
+                start = time.perf_counter()
+                HTML(string=html, base_url=settings.BASE_DIR).write_pdf()
+                cold.append(time.perf_counter() - start)
+
+            # The first render fetches the template's own resources (fonts, images)
+            renderer.render_html(html, label=f'{template_path} (first render)')
+            for _i in range(iterations):
+                renderer.render_html(html, label=template_path)
+            warm = renderer.metrics()['templates'][template_path]
+
+            cold_ms = sum(cold) / len(cold) * 1000
+            warm_ms = warm['avg_ms']
+            self.stdout.write(
+                f"{template_path:<50} {cold_ms:>10.1f} {warm_ms:>10.1f} {cold_ms / warm_ms if warm_ms else 0:>7.1f}x"
+            )
+
+        metrics = renderer.metrics()
+        self.stdout.write(self.style.SUCCESS(
+            _('Warm renderer: %(renders)d renders, %(rate).1f renders/s, %(resources)d cached resources') % {
+                'renders': metrics['renders'], 'rate': metrics['renders_per_second'],
+                'resources': metrics['cached_resources'],
+            }
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils.translation import gettext as _
+
+from dashboard.models import SMSMessage
+from dashboard.sms_outbox_service import SMSOutboxService
+
+
+class Command(BaseCommand):
+    help = ('Measures SMS outbox throughput offline with the fake provider, per batch size '
+            '(generated messages rolled back afterwards).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Number of messages to queue.')
+        parser.add_argument('--batch-sizes', default='1,10,50', help='Comma separated batch sizes to compare.')
+        parser.add_argument('--latency', type=float, default=0.02, help='Seconds each fake provider call takes.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of fake provider calls that fail.')
+
+    def handle(self, *args, **options):
+        count = max(options['messages'], 1)
+        self.stdout.write(f"{'batch':>6} {'sent':>8} {'seconds':>9} {'msg/s':>9}")
+        for batch_size in [int(size) for size in options['batch_sizes'].split(',') if size.strip()]:
+            with override_settings(SMS_PROVIDER='fake', SMS_FAKE_LATENCY=options['latency'],
+                                   SMS_FAKE_FAILURE_RATE=options['failure_rate']), transaction.atomic():
+                SMSMessage.objects.bulk_create([
+                    SMSMessage(phone_number=f'+9689{i:07d}', body=f'Benchmark message {i}', purpose='benchmark')
+                    for i in range(count)
+                ], batch_size=2000)
+                start = time.perf_counter()
+                # Failed sends are retried later (backoff), so one pass over the queue is measured
+                sent = SMSOutboxService.run_pending(limit=count, batch_size=max(batch_size, 1))
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{batch_size:>6} {sent:>8} {elapsed:>9.2f} {sent / elapsed:>9.0f}")
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(_('Benchmark finished; generated messages rolled back.')))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+
+from dashboard.backup_service import BackupService
+
+
+class Command(BaseCommand):
+    help = 'Creates an incremental backup of the database and media files and applies the retention policy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--portable', action='store_true', help='Embed the media files in the archive.')
+        parser.add_argument('--prune-only', action='store_true', help='Only apply the retention policy.')
+
+    def handle(self, *args, **options):
+        if options['prune_only']:
+            result = BackupService.run_prune()
+            if result is None:
+                self.stdout.write(self.style.WARNING(_('Another backup is running.')))
+                return
+            deleted, removed_objects = result
+            self.stdout.write(self.style.SUCCESS(
+                _('Deleted %(backups)d backups and %(objects)d media objects.') % {
+                    'backups': deleted, 'objects': removed_objects,
+                }
+            ))
+            return
+
+        path = BackupService.run(portable=options['portable'])
+        if path is None:
+            self.stdout.write(self.style.WARNING(_('Another backup is running.')))
+            return
+        self.stdout.write(self.style.SUCCESS(_('Backup created: %(path)s') % {'path': path}))
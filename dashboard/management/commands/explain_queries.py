@@ -0,0 +1,105 @@
+import datetime
+import json
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from dashboard.models import DocumentJob, Expense, Lease, Notification, OTP, Payment
+
+
+def key_queries():
+    """
+    The hot query shapes of the dashboard (views, services and commands)
+
+    Returns:
+        list: (name, queryset) pairs
+    """
+    today = timezone.now().date()
+    month_start = today.replace(day=1)
+    return [
+        ('lease_status_expired', Lease.objects.order_by().filter(
+            status__in=['active', 'expiring_soon'], end_date__lt=today)),
+        ('lease_status_expiring', Lease.objects.order_by().filter(
+            status='active', end_date__gte=today, end_date__lte=today + datetime.timedelta(days=31))),
+        ('home_expiring_leases', Lease.objects.filter(
+            status='expiring_soon', end_date__gte=today).order_by('end_date')[:5]),
+        ('calendar_window', Lease.objects.filter(
+            end_date__gte=month_start, end_date__lt=month_start + datetime.timedelta(days=42),
+        ).order_by('end_date', 'pk')),
+        ('ledger_month', Payment.objects.filter(lease_id=1, payment_for_year=today.year, payment_for_month=today.month)),
+        ('payments_by_date', Payment.objects.filter(payment_date__year=today.year, payment_date__month=today.month)),
+        ('recent_payments', Payment.objects.order_by('-payment_date')[:5]),
+        ('pending_checks', Payment.objects.filter(payment_method='check', check_status='pending')),
+        ('monthly_expenses', Expense.objects.filter(expense_date__year=today.year, expense_date__month=today.month)),
+        ('unread_notifications', Notification.objects.filter(user_id=1, read=False)),
+        ('notification_inbox', Notification.objects.filter(user_id=1).order_by('-timestamp', '-pk')[:21]),
+        ('otp_lookup', OTP.objects.filter(user_id=1, purpose='login', is_used=False).order_by('-created_at')[:1]),
+        ('document_job_claim', DocumentJob.objects.filter(status='queued', run_after__lte=timezone.now())),
+    ]
+
+
+def full_scans(plan, vendor):
+    """
+    Find the tables a query plan reads in full
+
+    Args:
+        plan: Output of ``QuerySet.explain()`` (JSON for MySQL)
+        vendor: ``connection.vendor``
+
+    Returns:
+        list: Table names
+    """
+    if vendor == 'sqlite':
+        return re.findall(r'\bSCAN (\w+)(?! USING)(?!\w)', plan)
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if vendor == 'mysql':
+        tables = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL' and 'table_name' in node:
+                    tables.append(node['table_name'])
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(plan))
+        return tables
+    return []
+
+
+class Command(BaseCommand):
+    help = ('Runs EXPLAIN on the key dashboard queries and reports the ones that read a whole table. '
+            'Run it on a database of realistic size: planners may prefer full scans on tiny tables.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plans', action='store_true', help='Print every query plan.')
+        parser.add_argument('--fail', action='store_true', help='Exit with an error when a full scan is found.')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        flagged = []
+        for name, queryset in key_queries():
+            plan = queryset.explain(format='JSON') if vendor == 'mysql' else queryset.explain()
+            tables = full_scans(plan, vendor)
+            if tables:
+                flagged.append(name)
+                self.stdout.write(self.style.WARNING(f"{name:<24} FULL SCAN: {', '.join(tables)}"))
+            else:
+                self.stdout.write(f"{name:<24} OK")
+            if options['plans']:
+                self.stdout.write(plan + '\n')
+
+        if flagged and options['fail']:
+            raise CommandError(_('Full scans in %(count)d queries: %(names)s') % {
+                'count': len(flagged), 'names': ', '.join(flagged),
+            })
+        self.stdout.write(self.style.SUCCESS(
+            _('Process finished. %(count)d queries with full scans.') % {'count': len(flagged)}
+        ))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext as _
+
+from dashboard.batch_export_service import BatchPDFExportService
+
+
+class Command(BaseCommand):
+    help = 'Renders all receipts, tenant statements or overdue notices matching a filter into one ZIP file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP file to write.')
+        parser.add_argument('--kind', choices=BatchPDFExportService.KINDS, default='receipts')
+        parser.add_argument('--building', type=int, help='Building id.')
+        parser.add_argument('--month', help='Month as YYYY-MM.')
+        parser.add_argument('--status', help='Lease status.')
+        parser.add_argument(
+            '--processes', type=int, default=getattr(settings, 'BATCH_EXPORT_PROCESSES', 2),
+            help='Number of worker processes.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            items = BatchPDFExportService.get_items(
+                options['kind'], building_id=options['building'], month=options['month'], status=options['status'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(_('Rendering %(count)d documents...') % {'count': len(items)})
+        with open(options['output'], 'wb') as output:
+            for chunk in BatchPDFExportService.stream_zip(items, processes=options['processes']):
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(_('Wrote %(path)s') % {'path': options['output']}))
@@ -0,0 +1,86 @@
+import statistics
+import time
+from importlib import import_module
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext as _
+
+from dashboard.models import UserProfile
+from dashboard.otp_service import OTPService
+from dashboard.otp_store import STORES
+from dashboard.otp_views import send_otp_view, verify_otp_view
+
+
+class Command(BaseCommand):
+    help = ('Load-tests the OTP login flow (send_otp_view, then a wrong and a right code through '
+            'verify_otp_view) for generated users, per OTP store (generated data rolled back afterwards).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Number of users logging in.')
+        parser.add_argument('--store', choices=[*STORES, 'all'], default='all', help='OTP store to test.')
+
+    def seed(self, count):
+        users = User.objects.bulk_create([User(username=f'otp-loadtest-{i}') for i in range(count)])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, phone_number=f'+9689{i:07d}') for i, user in enumerate(users)
+        ])
+        return [(user, f'+9689{i:07d}') for i, user in enumerate(users)]
+
+    def run_phase(self, view, requests):
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        timings, succeeded = [], 0
+        with CaptureQueriesContext(connection) as queries:
+            for request in requests:
+                request.session = session_store()
+                start = time.perf_counter()
+                response = view(request)
+                timings.append(time.perf_counter() - start)
+                succeeded += b'"success": true' in response.content
+        return timings, len(queries), succeeded
+
+    def report(self, store, phase, timings, queries, succeeded):
+        timings = sorted(timings)
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        self.stdout.write(
+            f"{store:<10} {phase:<12} {len(timings):>8} {succeeded:>8} "
+            f"{statistics.median(timings) * 1000:>8.2f} {p95 * 1000:>8.2f} {queries / len(timings):>9.1f}"
+        )
+
+    def handle(self, *args, **options):
+        stores = list(STORES) if options['store'] == 'all' else [options['store']]
+        factory = RequestFactory()
+        codes = {}
+
+        def capture_sms(phone_number, otp_code, language='ar'):
+            codes[phone_number] = otp_code
+            return True
+
+        self.stdout.write(f"{'store':<10} {'phase':<12} {'requests':>8} {'success':>8} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'queries':>9}")
+        for store in stores:
+            with override_settings(OTP_STORE=store), \
+                    mock.patch('dashboard.sms_service.send_otp_sms', capture_sms), \
+                    transaction.atomic():
+                users = self.seed(max(options['users'], 1))
+                codes.clear()
+                # Requests are built per phase, so the last one sees the codes just sent
+                phases = [
+                    ('send', send_otp_view, lambda phone: {'phone_number': phone}),
+                    ('verify_bad', verify_otp_view, lambda phone: {'phone_number': phone, 'otp_code': 'x'}),
+                    ('verify', verify_otp_view,
+                     lambda phone: {'phone_number': phone, 'otp_code': codes.get(phone, '')}),
+                ]
+                for phase, view, data in phases:
+                    requests = [factory.post('/', data(phone)) for _user, phone in users]
+                    self.report(store, phase, *self.run_phase(view, requests))
+
+                OTPService.get_store().reset_limits([user.pk for user, _phone in users])
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(_('Load test finished; generated data rolled back.')))
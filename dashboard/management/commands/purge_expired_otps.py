@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+from dashboard.otp_service import OTPService
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired and used OTP codes in bulk (run periodically, e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(_('Purging expired OTP codes...')))
+        count = OTPService.purge_expired(batch_size=max(options['batch_size'], 1))
+        self.stdout.write(self.style.SUCCESS(
+            _('Process finished. Deleted %(count)d codes.') % {'count': count}
+        ))
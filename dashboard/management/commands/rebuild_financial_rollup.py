@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+from dashboard.rollup_service import FinancialRollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly financial rollup table from payments and expenses.'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(self.style.SUCCESS(_('Rebuilding monthly financial rollup...')))
+        count = FinancialRollupService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            _('Process finished. Wrote %(count)d rollup rows.') % {'count': count}
+        ))
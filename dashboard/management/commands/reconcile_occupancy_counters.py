@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+from dashboard.occupancy_service import OccupancyService
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the unit and occupied unit counters of every building from the units table.'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(self.style.SUCCESS(_('Reconciling building occupancy counters...')))
+        count = OccupancyService.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            _('Process finished. Corrected %(count)d buildings.') % {'count': count}
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import gettext as _
+
+from dashboard.restore_service import RestoreService
+
+
+class Command(BaseCommand):
+    help = 'Restores the database and media files from a backup archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Backup archive (.zip).')
+        parser.add_argument('--batch-size', type=int, help='Rows per bulk insert.')
+        parser.add_argument('--io-threads', type=int, help='Threads copying media files.')
+
+    def report(self, stage, done, total):
+        if total:
+            self.stdout.write(_('%(stage)s: %(done)d / %(total)d') % {'stage': stage, 'done': done, 'total': total})
+        else:
+            self.stdout.write(_('%(stage)s: %(done)d') % {'stage': stage, 'done': done})
+
+    def handle(self, *args, **options):
+        service = RestoreService(
+            progress=self.report, batch_size=options['batch_size'], io_threads=options['io_threads'],
+        )
+        try:
+            result = service.restore(options['path'])
+        except FileNotFoundError:
+            raise CommandError(_('Backup file not found: %(path)s') % {'path': options['path']})
+        self.stdout.write(self.style.SUCCESS(
+            _('Restored %(objects)d objects and %(media)d media files in %(seconds).1fs.') % {
+                'objects': result['objects'], 'media': result['media_files'], 'seconds': result['seconds'],
+            }
+        ))
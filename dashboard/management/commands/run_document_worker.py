@@ -0,0 +1,74 @@
+import multiprocessing
+import signal
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils.translation import gettext as _
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_loop(index, once, poll_interval, stop_event):
+    """Body of one worker process: claim and process jobs until stopped"""
+    django.setup()
+    from dashboard.document_job_service import DocumentJobService
+
+    worker_id = f"{DocumentJobService.worker_id()}#{index}"
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C and sets stop_event
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                processed = DocumentJobService.run_pending(worker_id=worker_id)
+            except Exception:
+                # Claimed jobs are retried once their lock times out (DOCUMENT_JOB_LOCK_TIMEOUT)
+                logger.exception("Document worker pass failed, retrying")
+                processed = 0
+            if once:
+                break
+            if not processed:
+                stop_event.wait(poll_interval)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Runs worker processes that generate queued lease documents (PDF).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=getattr(settings, 'DOCUMENT_WORKER_PROCESSES', 2),
+            help='Number of worker processes.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Process the runnable jobs and exit.')
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        self.stdout.write(self.style.SUCCESS(
+            _('Starting %(count)d document worker processes...') % {'count': processes}
+        ))
+        # Child processes must open their own database connections
+        connections.close_all()
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(
+                target=_worker_loop, args=(index, options['once'], options['poll_interval'], stop_event), daemon=True,
+            )
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write(_('Stopping document workers...'))
+            stop_event.set()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS(_('Document workers stopped.')))
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.translation import gettext as _
+
+from dashboard.sms_outbox_service import SMSOutboxService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Sends queued SMS messages from the outbox in batches, reusing the provider client.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'SMS_BATCH_SIZE', 50),
+            help='Messages claimed and sent per batch.',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Send the runnable messages and exit.')
+        parser.add_argument('--stats', action='store_true', help='Print the delivery metrics and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            metrics = SMSOutboxService.get_metrics()
+            self.stdout.write(_('Messages by status:'))
+            for status, count in metrics.pop('by_status').items():
+                self.stdout.write(f"  {status:<20} {count}")
+            self.stdout.write(_('Last hour:'))
+            for name, value in metrics.items():
+                self.stdout.write(f"  {name:<20} {'-' if value is None else value}")
+            return
+
+        worker_id = SMSOutboxService.worker_id()
+        batch_size = max(options['batch_size'], 1)
+        self.stdout.write(self.style.SUCCESS(_('Starting SMS worker %(worker)s...') % {'worker': worker_id}))
+        total = 0
+        try:
+            while True:
+                # Drop connections the database closed (e.g. MySQL wait_timeout) before using them
+                close_old_connections()
+                try:
+                    sent = SMSOutboxService.run_pending(worker_id=worker_id, batch_size=batch_size)
+                except Exception:
+                    # Claimed messages are retried once their lock times out (SMS_LOCK_TIMEOUT)
+                    logger.exception("SMS worker pass failed, retrying")
+                    sent = 0
+                total += sent
+                if options['once']:
+                    break
+                if not sent:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(_('Stopping SMS worker...'))
+        self.stdout.write(self.style.SUCCESS(_('SMS worker stopped. Sent %(count)d messages.') % {'count': total}))
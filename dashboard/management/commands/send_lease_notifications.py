@@ -5,7 +5,9 @@ from django.template.loader import get_template
 from django.conf import settings
 from io import BytesIO
 from django.core.files.base import ContentFile
-from dashboard.models import Lease, Notification, Document, Company
+from dashboard.models import Lease, Notification, Document
+from dashboard.company_service import CompanyService
+from dashboard.ledger_service import LedgerService
 from django.contrib.auth.models import User
 
 class Command(BaseCommand):
@@ -13,11 +15,14 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         today = timezone.now().date()
+        company = CompanyService.get()
         created_count = 0
         
         # Create notifications for late payments (3 months) and attach PDF notice
-        for lease in Lease.objects.filter(status__in=['active', 'expiring_soon']):
-            summary = lease.get_payment_summary()
+        active_leases = Lease.objects.filter(status__in=['active', 'expiring_soon']).select_related('tenant__user')
+        for lease_arrears in LedgerService.get_portfolio_arrears(active_leases).values():
+            lease = lease_arrears['lease']
+            summary = lease_arrears['months']
             unpaid_months = [m for m in summary if m['status'] == 'due' and m['balance'] > 0]
             if len(unpaid_months) >= 3:
                 user = lease.tenant.user if hasattr(lease.tenant, 'user') else User.objects.filter(is_staff=True).first()
@@ -35,7 +40,7 @@ class Command(BaseCommand):
                     context = {
                         'lease': lease,
                         'today': today,
-                        'company': Company.objects.first(),
+                        'company': company,
                         'type': 'payment',
                         'months': len(unpaid_months),
                     }
@@ -73,7 +78,7 @@ class Command(BaseCommand):
                     context = {
                         'lease': lease,
                         'today': today,
-                        'company': Company.objects.first(),
+                        'company': company,
                         'type': 'renewal',
                         'months': months_overdue,
                     }
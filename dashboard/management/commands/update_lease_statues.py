@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from dashboard.models import Lease
+from dashboard.lease_status_service import LeaseStatusService
 from django.utils.translation import gettext as _
 
 class Command(BaseCommand):
@@ -8,19 +8,17 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS(_('Starting lease status update process...')))
 
-        updated_count = 0
-        leases_to_check = Lease.objects.exclude(status__in=['expired', 'cancelled'])
-
-        for lease in leases_to_check:
-            original_status = lease.status
-            lease.update_status() # This function is in the model
-            if lease.status != original_status:
-                lease.save()
-                updated_count += 1
-                self.stdout.write(
-                    f"  - {_('Lease')} {lease.contract_number} {_('status updated to')} {lease.get_status_display()}"
-                )
+        changeset = LeaseStatusService.run()
+        updated_count = len(changeset['expired']) + len(changeset['expiring_soon']) + len(changeset['active'])
 
+        self.stdout.write(
+            _('Expired: %(expired)d, expiring soon: %(expiring_soon)d, active again: %(active)d, '
+              'units made available: %(units)d, notifications: %(notifications)d') % {
+                'expired': len(changeset['expired']), 'expiring_soon': len(changeset['expiring_soon']),
+                'active': len(changeset['active']), 'units': len(changeset['units_freed']),
+                'notifications': changeset['notifications'],
+            }
+        )
         self.stdout.write(self.style.SUCCESS(
             _('Process finished. Updated %(count)d leases.') % {'count': updated_count}
-        ))
\ No newline at end of file
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils.translation import gettext as _
+from dashboard.snapshot_service import DashboardSnapshotService
+
+
+class Command(BaseCommand):
+    help = 'Builds the dashboard home statistics snapshot and stores it in the cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stats', action='store_true', help='Also print the snapshot hit/miss counters.')
+        parser.add_argument('--reset-stats', action='store_true', help='Reset the hit/miss counters.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(_('Building dashboard snapshot...')))
+        snapshot = DashboardSnapshotService.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            _('Process finished. Snapshot version %(version)s stored.') % {'version': snapshot['version']}
+        ))
+        if options['stats']:
+            counters = DashboardSnapshotService.get_counters()
+            self.stdout.write(
+                _('Hits: %(hits)d, stale hits: %(stale_hits)d, misses: %(misses)d') % counters
+            )
+        if options['reset_stats']:
+            DashboardSnapshotService.reset_counters()
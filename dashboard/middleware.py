@@ -0,0 +1,48 @@
+"""
+Middleware for monitoring the SQL queries run by each request
+"""
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .query_budget import QueryRecorder, get_query_budget
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """
+    Record the query count, SQL time and repeated queries of every request
+    and log the requests exceeding their budget (``settings.QUERY_BUDGETS``).
+
+    Disabled unless ``settings.QUERY_BUDGET_ENABLED`` is True. Queries run
+    while a streaming response is consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.repeat_limit = getattr(settings, 'QUERY_BUDGET_REPEAT_LIMIT', 5)
+
+    def __call__(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        budget = get_query_budget(url_name)
+        total_ms = recorder.total_time * 1000
+
+        if recorder.count > budget:
+            logger.warning(
+                f"Query budget exceeded for {url_name or request.path}: "
+                f"{recorder.count} queries (budget {budget}), {total_ms:.1f} ms"
+            )
+        else:
+            logger.debug(f"{url_name or request.path}: {recorder.count} queries, {total_ms:.1f} ms")
+
+        for signature, count in recorder.duplicates(threshold=self.repeat_limit + 1):
+            logger.warning(f"Possible N+1 in {url_name or request.path}: {count}x {signature}")
+
+        return response
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:29
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def populate_rollup(apps, schema_editor):
+    Payment = apps.get_model('dashboard', 'Payment')
+    Expense = apps.get_model('dashboard', 'Expense')
+    MonthlyFinancialRollup = apps.get_model('dashboard', 'MonthlyFinancialRollup')
+    buckets = defaultdict(lambda: {
+        'income': Decimal('0'), 'expenses': Decimal('0'), 'payment_count': 0, 'expense_count': 0,
+    })
+    payments = (
+        Payment.objects.order_by()
+        .annotate(year=ExtractYear('payment_date'), month=ExtractMonth('payment_date'))
+        .values('year', 'month', 'lease__unit__building_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    for row in payments:
+        bucket = buckets[(row['year'], row['month'], row['lease__unit__building_id'])]
+        bucket['income'] = row['total']
+        bucket['payment_count'] = row['count']
+    expenses = (
+        Expense.objects.order_by()
+        .annotate(year=ExtractYear('expense_date'), month=ExtractMonth('expense_date'))
+        .values('year', 'month', 'building_id')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    for row in expenses:
+        bucket = buckets[(row['year'], row['month'], row['building_id'])]
+        bucket['expenses'] = row['total']
+        bucket['expense_count'] = row['count']
+    MonthlyFinancialRollup.objects.bulk_create([
+        MonthlyFinancialRollup(year=year, month=month, building_id=building_id, **values)
+        for (year, month, building_id), values in buckets.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_alter_lease_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyFinancialRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='السنة')),
+                ('month', models.IntegerField(verbose_name='الشهر')),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='الإيرادات')),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='المصاريف')),
+                ('payment_count', models.PositiveIntegerField(default=0, verbose_name='عدد الدفعات')),
+                ('expense_count', models.PositiveIntegerField(default=0, verbose_name='عدد المصاريف')),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='financial_rollups', to='dashboard.building', verbose_name='المبنى')),
+            ],
+            options={
+                'verbose_name': 'ملخص مالي شهري',
+                'verbose_name_plural': 'الملخصات المالية الشهرية',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('year', 'month', 'building')},
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_monthlyfinancialrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='status',
+            field=models.CharField(choices=[('pending', 'قيد الإنشاء'), ('ready', 'جاهز'), ('failed', 'فشل الإنشاء')], default='ready', max_length=10, verbose_name='الحالة'),
+        ),
+        migrations.CreateModel(
+            name='DocumentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=100, unique=True, verbose_name='مفتاح عدم التكرار')),
+                ('kind', models.CharField(choices=[('initial_invoice', 'فاتورة رسوم تسجيل عقد'), ('cancellation_notice', 'استمارة إلغاء عقد'), ('renewal_notice', 'استمارة تجديد عقد')], max_length=30, verbose_name='نوع المستند')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='المعاملات')),
+                ('status', models.CharField(choices=[('queued', 'في الانتظار'), ('running', 'قيد التنفيذ'), ('done', 'مكتمل'), ('failed', 'فشل')], default='queued', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='التنفيذ بعد')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='العامل')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الحجز')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job', to='dashboard.document', verbose_name='المستند')),
+                ('lease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_jobs', to='dashboard.lease', verbose_name='العقد')),
+            ],
+            options={
+                'verbose_name': 'مهمة إنشاء مستند',
+                'verbose_name_plural': 'مهام إنشاء المستندات',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='dashboard_d_status_6a5823_idx')],
+            },
+        ),
+    ]
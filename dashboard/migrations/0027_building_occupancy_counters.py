@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Building = apps.get_model('dashboard', 'Building')
+    Unit = apps.get_model('dashboard', 'Unit')
+    units = Unit.objects.filter(building=OuterRef('pk')).order_by().values('building')
+    Building.objects.update(
+        total_units=Coalesce(Subquery(units.annotate(count=Count('pk')).values('count')), 0),
+        occupied_units=Coalesce(
+            Subquery(units.annotate(count=Count('pk', filter=Q(is_available=False))).values('count')), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0026_document_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='occupied_units',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='الوحدات المشغولة'),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='total_units',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='إجمالي الوحدات'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('dashboard', '0027_building_occupancy_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['expense_date'], name='dashboard_e_expense_3c31a3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['status', 'end_date'], name='dashboard_l_status_5b8f05_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['end_date'], name='dashboard_l_end_dat_498826_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'read'], name='dashboard_n_user_id_fed4e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['user', 'purpose', 'is_used'], name='dashboard_o_user_id_f9062e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['lease', 'payment_for_year', 'payment_for_month'], name='dashboard_p_lease_i_3fdc3b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_date'], name='dashboard_p_payment_0bb2bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_method', 'check_status'], name='dashboard_p_payment_e776ed_idx'),
+        ),
+    ]
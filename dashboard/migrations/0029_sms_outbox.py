@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0028_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SMSMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_number', models.CharField(max_length=20, verbose_name='رقم الهاتف')),
+                ('body', models.TextField(verbose_name='نص الرسالة')),
+                ('purpose', models.CharField(default='notification', max_length=30, verbose_name='الغرض')),
+                ('status', models.CharField(choices=[('queued', 'في الانتظار'), ('sending', 'قيد الإرسال'), ('sent', 'مرسلة'), ('failed', 'فشل')], default='queued', max_length=10, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='الإرسال بعد')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='العامل')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الحجز')),
+                ('provider', models.CharField(blank=True, max_length=20, verbose_name='المزود')),
+                ('provider_message_id', models.CharField(blank=True, max_length=100, verbose_name='معرف الرسالة لدى المزود')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإرسال')),
+            ],
+            options={
+                'verbose_name': 'رسالة نصية',
+                'verbose_name_plural': 'الرسائل النصية',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='dashboard_s_status_026174_idx'), models.Index(fields=['phone_number', 'sent_at'], name='dashboard_s_phone_n_608d9a_idx')],
+            },
+        ),
+    ]
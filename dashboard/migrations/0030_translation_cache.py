@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0029_sms_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_hash', models.CharField(max_length=64, unique=True, verbose_name='بصمة النص')),
+                ('source_language', models.CharField(max_length=10, verbose_name='لغة المصدر')),
+                ('target_language', models.CharField(max_length=10, verbose_name='لغة الهدف')),
+                ('source_text', models.TextField(verbose_name='النص الأصلي')),
+                ('translated_text', models.TextField(verbose_name='الترجمة')),
+                ('backend', models.CharField(max_length=20, verbose_name='محرك الترجمة')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'ترجمة محفوظة',
+                'verbose_name_plural': 'الترجمات المحفوظة',
+            },
+        ),
+    ]
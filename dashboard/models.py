@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
@@ -30,6 +30,9 @@ class Company(models.Model):
 class Building(models.Model):
     name = models.CharField(_("اسم المبنى"), max_length=100)
     address = models.TextField(_("العنوان"))
+    # عدادات الإشغال (تُحدَّث تلقائياً من الوحدات والعقود، انظر OccupancyService)
+    total_units = models.PositiveIntegerField(_("إجمالي الوحدات"), default=0, editable=False)
+    occupied_units = models.PositiveIntegerField(_("الوحدات المشغولة"), default=0, editable=False)
     
     class Meta:
         verbose_name = _("مبنى")
@@ -49,6 +52,11 @@ class Unit(models.Model):
     class Meta:
         verbose_name = _("وحدة")
         verbose_name_plural = _("الوحدات")
+
+    def save(self, *args, **kwargs):
+        # The occupancy signals lock the saved row from pre_save until the building counters are updated
+        with transaction.atomic():
+            super().save(*args, **kwargs)
         
     def __str__(self):
         return f"{self.building.name} - {self.unit_number}"
@@ -108,45 +116,30 @@ class Lease(models.Model):
     class Meta:
         verbose_name = _("عقد إيجار")
         verbose_name_plural = _("عقود الإيجار")
+        indexes = [
+            models.Index(fields=['status', 'end_date']),  # status transitions, expiring leases
+            models.Index(fields=['end_date']),  # calendar feed
+        ]
         
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .lease_lifecycle_service import LeaseLifecycleService
+        instance = super().from_db(db, field_names, values)
+        LeaseLifecycleService.take_snapshot(instance)
+        return instance
+
     def save(self, *args, **kwargs):
+        from .lease_lifecycle_service import LeaseLifecycleService
         self.registration_fee = (self.monthly_rent * 12) * Decimal('0.03')
-        if self.pk:
-            old_lease = Lease.objects.get(pk=self.pk)
-            if old_lease.unit != self.unit:
-                old_lease.unit.is_available = True
-                old_lease.unit.save()
-                
-        if self.status in ['active', 'expiring_soon']:
-            self.unit.is_available = False
-        else:
-            self.unit.is_available = True
-        self.unit.save()
-
-        is_being_cancelled = 'cancellation_reson' in kwargs.get('update_fields', [])
+
+        is_being_cancelled = 'cancellation_reason' in (kwargs.get('update_fields') or [])
         if not is_being_cancelled:
             self.update_status()
-        
-        # إنشاء استمارة إلغاء تلقائياً عند إلغاء العقد
-        if not self.pk:  # عند إنشاء عقد جديد
-            print(f"Creating new lease {self.contract_number}")
-            super().save(*args, **kwargs)
-            print(f"New lease saved, calling _generate_initial_invoice")
-            # إنشاء فاتورة أولية للعقد الجديد
-            self._generate_initial_invoice()
-        else:  # عند تحديث عقد موجود
-            old_lease = Lease.objects.get(pk=self.pk)
-            old_status = old_lease.status
-            print(f"Updating lease {self.id}, old status: {old_status}, new status: {self.status}")
-            super().save(*args, **kwargs)
-            
-            # إذا تم إلغاء العقد، أنشئ استمارة الإلغاء تلقائياً
-            if old_status != 'cancelled' and self.status == 'cancelled':
-                self._generate_cancellation_notice()
-            # إذا تم تجديد العقد، أنشئ استمارة التجديد تلقائياً
-            elif old_status not in ['renewed', 'cancelled'] and self.status == 'renewed':
-                print(f"Calling _generate_renewal_notice for lease {self.id}")
-                self._generate_renewal_notice()
+
+        # تحديث حالة الوحدة وإنشاء الفواتير والاستمارات والإشعارات (بعد نجاح الحفظ)
+        previous = LeaseLifecycleService.previous_state(self)
+        super().save(*args, **kwargs)
+        LeaseLifecycleService.after_save(self, previous)
 
     def update_status(self):
         today = timezone.now().date()
@@ -238,252 +231,26 @@ class Lease(models.Model):
         return reverse('lease_detail', kwargs={'pk': self.pk})
 
     def get_payment_summary(self):
-        summary = []
-        payments = self.payments.all().order_by('payment_for_year', 'payment_for_month')
-        current_date = self.start_date
-        while current_date <= self.end_date:
-            year, month = current_date.year, current_date.month
-            month_payments = payments.filter(payment_for_year=year, payment_for_month=month)
-            paid_for_month = month_payments.aggregate(total=Sum('amount'))['total'] or 0
-            balance = self.monthly_rent - paid_for_month
-            status = 'due'
-            payment_method = None
-            payment_date = None
-            
-            if month_payments.exists():
-                latest_payment = month_payments.first()
-                payment_method = latest_payment.get_payment_method_display()
-                payment_date = latest_payment.payment_date
-            
-            if paid_for_month >= self.monthly_rent:
-                status = 'paid'
-            elif paid_for_month > 0:
-                status = 'partial'
-                
-            today = timezone.now().date()
-            due_date = datetime.date(year, month, 1)
-            if due_date < today and status != 'due':
-                status = 'upcoming'
-            
-            next_payment_date = datetime.date(year, month, 1) + relativedelta(months=1)
-
-            summary.append({
-                'month': month,
-                'year': year,
-                'month_name': _(current_date.strftime('%B')),
-                'rent_due': self.monthly_rent,
-                'amount_paid': paid_for_month,
-                'balance': balance,
-                'status': status,
-                'payment_method': payment_method,
-                'payment_date': payment_date,
-                'next_payment_date': next_payment_date
-            })
-            current_date += relativedelta(months=1)
-        return summary
-
-    def get_absolute_url(self):
-        return reverse('lease_detail', kwargs={'pk': self.pk})
-
-    def get_payment_summary(self):
-        summary = []
-        payments = self.payments.all().order_by('payment_for_year', 'payment_for_month')
-        current_date = self.start_date
-        while current_date <= self.end_date:
-            year, month = current_date.year, current_date.month
-            month_payments = payments.filter(payment_for_year=year, payment_for_month=month)
-            paid_for_month = month_payments.aggregate(total=Sum('amount'))['total'] or 0
-            balance = self.monthly_rent - paid_for_month
-            status = 'due'
-            payment_method = None
-            payment_date = None
-            
-            if month_payments.exists():
-                latest_payment = month_payments.first()
-                payment_method = latest_payment.get_payment_method_display()
-                payment_date = latest_payment.payment_date
-            
-            if paid_for_month >= self.monthly_rent:
-                status = 'paid'
-            elif paid_for_month > 0:
-                status = 'partial'
-                
-            today = timezone.now().date()
-            due_date = datetime.date(year, month, 1)
-            if due_date < today and status != 'due':
-                status = 'upcoming'
-            
-            next_payment_date = datetime.date(year, month, 1) + relativedelta(months=1)
-
-            summary.append({
-                'month': month,
-                'year': year,
-                'month_name': _(current_date.strftime('%B')),
-                'rent_due': self.monthly_rent,
-                'amount_paid': paid_for_month,
-                'balance': balance,
-                'status': status,
-                'payment_method': payment_method,
-                'payment_date': payment_date,
-                'next_payment_date': next_payment_date
-            })
-            current_date += relativedelta(months=1)
-        return summary
-
-    def get_absolute_url(self):
-        return reverse('lease_detail', kwargs={'pk': self.pk})
+        from .ledger_service import LedgerService
+        return LedgerService.get_payment_summary(self)
 
     def __str__(self):
         return f"{self.contract_number} - {self.tenant.name}"
 
     def _generate_cancellation_notice(self):
-        """إنشاء استمارة إلغاء تلقائياً وإرفاقها بالعقد"""
-        try:
-            from django.template.loader import get_template
-            from django.conf import settings
-            from io import BytesIO
-            from django.core.files.base import ContentFile
-            from django.utils.translation import gettext as _
-            import logging
-            
-            logger = logging.getLogger(__name__)
-            
-            template = get_template('dashboard/reports/lease_cancellation_notice.html')
-            context = {
-                'lease': self,
-                'today': timezone.now().date(),
-                'company': Company.objects.first(),
-            }
-            html = template.render(context)
-            
-            try:
-                from weasyprint import HTML
-                pdf_bytes = HTML(string=html, base_url=settings.BASE_DIR).write_pdf()
-            except Exception:
-                # Fallback to xhtml2pdf
-                from xhtml2pdf import pisa
-                result = BytesIO()
-                pisa.pisaDocument(BytesIO(html.encode('UTF-8')), result)
-                pdf_bytes = result.getvalue()
-
-            filename = f"lease_cancellation_{self.contract_number}.pdf"
-            doc = Document(lease=self, title=_('استمارة إلغاء عقد') + f" - {self.contract_number}")
-            doc.file.save(filename, ContentFile(pdf_bytes))
-            doc.save()
-            logger.info(f"Cancellation notice generated for lease {self.id}")
-            
-        except Exception as e:
-            logger.exception(f"Failed to generate cancellation notice for lease {self.id}: {e}")
-            # لا نحتاج إلى رسالة خطأ هنا لأنها عملية تلقائية
-    
+        """جدولة إنشاء استمارة الإلغاء وإرفاقها بالعقد (تُنشأ في الخلفية)"""
+        from .document_job_service import DocumentJobService
+        DocumentJobService.enqueue(self, 'cancellation_notice')
+
     def _generate_initial_invoice(self):
-        """إنشاء فاتورة أولية تلقائياً عند إنشاء عقد جديد"""
-        print(f"Generating initial invoice for lease {self.id}")
-        try:
-            from django.template.loader import get_template
-            from django.conf import settings
-            from io import BytesIO
-            from django.core.files.base import ContentFile
-            from django.utils.translation import gettext as _
-            import logging
-            
-            logger = logging.getLogger(__name__)
-            
-            # التحقق من وجود شركة أو إنشاء واحدة افتراضية
-            company = Company.objects.first()
-            if not company:
-                company = Company.objects.create(
-                    name="شركة افتراضية",
-                    contact_email="default@company.com",
-                    contact_phone="1234567890"
-                )
-                print(f"Created default company for lease {self.id}")
-            
-            # حساب الرسوم
-            office_fee = float(self.office_fee or 0)
-            admin_fee = float(self.admin_fee or 0)
-            registration_fee = float(self.registration_fee or 0)
-            total_fees = office_fee + admin_fee + registration_fee
-            logger.info(f"Initial fees for lease {self.id}: office={office_fee}, admin={admin_fee}, registration={registration_fee}, total={total_fees}")
-            print(f"Fees calculated for lease {self.id}: office={office_fee}, admin={admin_fee}, registration={registration_fee}, total={total_fees}")
-            
-            # إنشاء الفاتورة دائماً للاختبار
-            print(f"Creating initial invoice for lease {self.id}")
-            try:
-                from django.template.loader import get_template
-                template_invoice = get_template('dashboard/reports/lease_initial_invoice.html')
-                context_invoice = {
-                    'lease': self,
-                    'today': timezone.now().date(),
-                    'company': company,
-                    'total_fees': total_fees,
-                }
-                html_invoice = template_invoice.render(context_invoice)
-                
-                # استخدم generate_pdf_bytes للحصول على الدعم الكامل
-                from .utils import generate_pdf_bytes
-                pdf_bytes_invoice = generate_pdf_bytes('dashboard/reports/lease_initial_invoice.html', context_invoice)
-                    
-                contract_num = self.contract_number or f"lease_{self.id}"
-                filename_invoice = f"lease_initial_invoice_{contract_num}.pdf"
-                print(f"Saving document with title: فاتورة رسوم تسجيل عقد - {contract_num}")
-                print(f"Document lease: {self}")
-                print(f"Document file path: {filename_invoice}")
-                doc_invoice = Document(lease=self, title=_('فاتورة رسوم تسجيل عقد') + f" - {contract_num}")
-                doc_invoice.file.save(filename_invoice, ContentFile(pdf_bytes_invoice))
-                doc_invoice.save()
-                print(f"Document saved with ID: {doc_invoice.id}")
-                print(f"Document title: {doc_invoice.title}")
-                print(f"Document file: {doc_invoice.file}")
-                logger.info(f"Initial invoice generated for lease {self.id}")
-                print(f"Initial invoice saved for lease {self.id} - Document ID: {doc_invoice.id}")
-            except Exception as e:
-                logger.exception(f"Failed to generate initial invoice for lease {self.id}: {e}")
-                print(f"Failed to generate initial invoice for lease {self.id}: {e}")
-                # لا نحتاج إلى رسالة خطأ هنا لأنها عملية تلقائية
-        except Exception as e:
-            logger.exception(f"Failed to generate initial invoice for lease {self.id}: {e}")
-            print(f"Failed to generate initial invoice for lease {self.id}: {e}")
-            # لا نحتاج إلى رسالة خطأ هنا لأنها عملية تلقائية
+        """جدولة إنشاء فاتورة رسوم التسجيل للعقد الجديد (تُنشأ في الخلفية)"""
+        from .document_job_service import DocumentJobService
+        DocumentJobService.enqueue(self, 'initial_invoice')
+
     def _generate_renewal_notice(self):
-        """إنشاء استمارة تجديد تلقائياً وإرفاقها بالعقد"""
-        try:
-            from django.template.loader import get_template
-            from django.conf import settings
-            from io import BytesIO
-            from django.core.files.base import ContentFile
-            from django.utils.translation import gettext as _
-            import logging
-
-            logger = logging.getLogger(__name__)
-
-            template = get_template('dashboard/reports/lease_renewal_notice.html')
-            context = {
-                'lease': self,
-                'today': timezone.now().date(),
-                'company': Company.objects.first(),
-            }
-            html = template.render(context)
-
-            try:
-                from weasyprint import HTML
-                pdf_bytes = HTML(string=html, base_url=settings.BASE_DIR).write_pdf()
-            except Exception:
-                # Fallback to xhtml2pdf
-                from xhtml2pdf import pisa
-                result = BytesIO()
-                pisa.pisaDocument(BytesIO(html.encode('UTF-8')), result)
-                pdf_bytes = result.getvalue()
-
-            filename = f"lease_renewal_{self.contract_number}.pdf"
-            doc = Document(lease=self, title=_('استمارة تجديد عقد') + f" - {self.contract_number}")
-            doc.file.save(filename, ContentFile(pdf_bytes))
-            doc.save()
-            logger.info(f"Renewal notice generated for lease {self.id}")
-
-        except Exception as e:
-            logger.exception(f"Failed to generate renewal notice for lease {self.id}: {e}")
-            # لا نحتاج إلى رسالة خطأ هنا لأنها عملية تلقائية
+        """جدولة إنشاء استمارة التجديد وإرفاقها بالعقد (تُنشأ في الخلفية)"""
+        from .document_job_service import DocumentJobService
+        DocumentJobService.enqueue(self, 'renewal_notice')
 
 class Payment(models.Model):
     PAYMENT_METHOD_CHOICES = [
@@ -516,6 +283,11 @@ class Payment(models.Model):
         verbose_name = _("دفعة")
         verbose_name_plural = _("الدفعات")
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['lease', 'payment_for_year', 'payment_for_month']),  # ledger months
+            models.Index(fields=['payment_date']),  # reports, recent payments
+            models.Index(fields=['payment_method', 'check_status']),  # check management
+        ]
         
     def clean(self):
         from django.core.exceptions import ValidationError
@@ -599,9 +371,11 @@ class MaintenanceRequest(models.Model):
         return self.title
 
 class Document(models.Model):
+    STATUS_CHOICES = [('pending', _('قيد الإنشاء')), ('ready', _('جاهز')), ('failed', _('فشل الإنشاء'))]
     lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name='documents', verbose_name=_("العقد"))
     title = models.CharField(_("عنوان المستند"), max_length=200)
     file = models.FileField(_("الملف"), upload_to='lease_documents/')
+    status = models.CharField(_("الحالة"), max_length=10, choices=STATUS_CHOICES, default='ready')
     uploaded_at = models.DateTimeField(_("تاريخ الرفع"), auto_now_add=True)
     
     class Meta:
@@ -612,6 +386,37 @@ class Document(models.Model):
     def __str__(self):
         return self.title
 
+class DocumentJob(models.Model):
+    """مهمة إنشاء مستند PDF في الخلفية (تُعالج بواسطة أمر run_document_worker)"""
+    KIND_CHOICES = [
+        ('initial_invoice', _('فاتورة رسوم تسجيل عقد')),
+        ('cancellation_notice', _('استمارة إلغاء عقد')),
+        ('renewal_notice', _('استمارة تجديد عقد')),
+    ]
+    STATUS_CHOICES = [('queued', _('في الانتظار')), ('running', _('قيد التنفيذ')), ('done', _('مكتمل')), ('failed', _('فشل'))]
+    idempotency_key = models.CharField(_("مفتاح عدم التكرار"), max_length=100, unique=True)
+    kind = models.CharField(_("نوع المستند"), max_length=30, choices=KIND_CHOICES)
+    lease = models.ForeignKey(Lease, on_delete=models.CASCADE, related_name='document_jobs', verbose_name=_("العقد"))
+    document = models.OneToOneField(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='job', verbose_name=_("المستند"))
+    params = models.JSONField(_("المعاملات"), default=dict, blank=True)
+    status = models.CharField(_("الحالة"), max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(_("عدد المحاولات"), default=0)
+    run_after = models.DateTimeField(_("التنفيذ بعد"), default=timezone.now)
+    locked_by = models.CharField(_("العامل"), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_("وقت الحجز"), null=True, blank=True)
+    last_error = models.TextField(_("آخر خطأ"), blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("مهمة إنشاء مستند")
+        verbose_name_plural = _("مهام إنشاء المستندات")
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return self.idempotency_key
+
 class Expense(models.Model):
     EXPENSE_CATEGORY_CHOICES = [('maintenance', _('صيانة')), ('utilities', _('خدمات (كهرباء، ماء)')), ('salaries', _('رواتب')), ('marketing', _('تسويق')), ('admin', _('رسوم إدارية/حكومية')), ('other', _('أخرى'))]
     building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='expenses', verbose_name=_("المبنى"))
@@ -626,10 +431,47 @@ class Expense(models.Model):
         verbose_name = _("مصروف")
         verbose_name_plural = _("المصاريف")
         ordering = ['-expense_date']
+        indexes = [models.Index(fields=['expense_date'])]
         
     def __str__(self):
         return f"{self.get_category_display()} - {self.amount}"
 
+class MonthlyFinancialRollup(models.Model):
+    """ملخص شهري مجمع للإيرادات والمصاريف لكل مبنى (يُحدّث تلقائياً من الدفعات والمصاريف)"""
+    year = models.IntegerField(_("السنة"))
+    month = models.IntegerField(_("الشهر"))
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='financial_rollups', verbose_name=_("المبنى"))
+    income = models.DecimalField(_("الإيرادات"), max_digits=14, decimal_places=2, default=0)
+    expenses = models.DecimalField(_("المصاريف"), max_digits=14, decimal_places=2, default=0)
+    payment_count = models.PositiveIntegerField(_("عدد الدفعات"), default=0)
+    expense_count = models.PositiveIntegerField(_("عدد المصاريف"), default=0)
+
+    class Meta:
+        verbose_name = _("ملخص مالي شهري")
+        verbose_name_plural = _("الملخصات المالية الشهرية")
+        unique_together = ('year', 'month', 'building')
+        ordering = ['-year', '-month']
+
+    def __str__(self):
+        return f"{self.building_id} - {self.month}/{self.year}"
+
+class TranslationCache(models.Model):
+    """ذاكرة ترجمة العبارات (تُستخدم عند الترجمة التلقائية للحقول الإنجليزية)"""
+    source_hash = models.CharField(_("بصمة النص"), max_length=64, unique=True)
+    source_language = models.CharField(_("لغة المصدر"), max_length=10)
+    target_language = models.CharField(_("لغة الهدف"), max_length=10)
+    source_text = models.TextField(_("النص الأصلي"))
+    translated_text = models.TextField(_("الترجمة"))
+    backend = models.CharField(_("محرك الترجمة"), max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("ترجمة محفوظة")
+        verbose_name_plural = _("الترجمات المحفوظة")
+
+    def __str__(self):
+        return f"{self.source_text[:50]} -> {self.translated_text[:50]}"
+
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', verbose_name=_("المستخدم"))
     message = models.TextField(_("الرسالة"))
@@ -638,11 +480,18 @@ class Notification(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object = GenericForeignKey('content_type', 'object_id')
+    kind = models.CharField(_("نوع الإشعار"), max_length=30, blank=True, default='')
+    # "<kind>:<period>:<content type>:<object id>:<user>" for notifications that must be sent only once
+    dedup_key = models.CharField(max_length=191, unique=True, null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = _("إشعار")
         verbose_name_plural = _("الإشعارات")
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['user', 'read']),  # unread counts
+            models.Index(fields=['user', '-timestamp', '-id']),  # inbox pages (keyset)
+        ]
 
     def __str__(self):
         return self.message
@@ -722,6 +571,7 @@ class OTP(models.Model):
         verbose_name = _("رمز التحقق")
         verbose_name_plural = _("رموز التحقق")
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'purpose', 'is_used'])]
     
     def __str__(self):
         return f"OTP for {self.user.username} - {self.code}"
@@ -742,7 +592,35 @@ class OTP(models.Model):
     def mark_as_used(self):
         """Mark OTP as used"""
         self.is_used = True
-        self.save()
+        self.save(update_fields=['is_used'])
+
+
+class SMSMessage(models.Model):
+    """رسالة نصية في صندوق الصادر (تُرسل بواسطة أمر run_sms_worker)"""
+    STATUS_CHOICES = [('queued', _('في الانتظار')), ('sending', _('قيد الإرسال')), ('sent', _('مرسلة')), ('failed', _('فشل'))]
+    phone_number = models.CharField(_("رقم الهاتف"), max_length=20)
+    body = models.TextField(_("نص الرسالة"))
+    purpose = models.CharField(_("الغرض"), max_length=30, default='notification')
+    status = models.CharField(_("الحالة"), max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(_("عدد المحاولات"), default=0)
+    run_after = models.DateTimeField(_("الإرسال بعد"), default=timezone.now)
+    expires_at = models.DateTimeField(_("تاريخ الانتهاء"), null=True, blank=True)
+    locked_by = models.CharField(_("العامل"), max_length=100, blank=True)
+    locked_at = models.DateTimeField(_("وقت الحجز"), null=True, blank=True)
+    provider = models.CharField(_("المزود"), max_length=20, blank=True)
+    provider_message_id = models.CharField(_("معرف الرسالة لدى المزود"), max_length=100, blank=True)
+    last_error = models.TextField(_("آخر خطأ"), blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(_("تاريخ الإرسال"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("رسالة نصية")
+        verbose_name_plural = _("الرسائل النصية")
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'run_after']), models.Index(fields=['phone_number', 'sent_at'])]
+
+    def __str__(self):
+        return f"{self.phone_number} ({self.get_status_display()})"
 
 
 # === Real Estate Office Management Models ===
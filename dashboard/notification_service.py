@@ -0,0 +1,250 @@
+"""
+Notification Service for creating notifications in bulk, once per event, and reading the inbox
+"""
+import base64
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Lease, MaintenanceRequest, Notification, Payment
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationService:
+    """
+    Service class for fanning notifications out to many users
+
+    A notification with a ``kind`` gets a dedup key made of (kind, period,
+    content type, object id, user), stored in the unique
+    ``Notification.dedup_key`` column. Sending the same event again (e.g. a
+    reminder command run twice in a month) is skipped by one lookup of the
+    existing keys and, for concurrent senders, by
+    ``bulk_create(ignore_conflicts=True)``; the message text plays no part,
+    so a reworded or re-translated message is not sent twice. Notifications
+    without a kind, or built with ``dedup=False`` (events that may repeat,
+    like a status going back and forth), are never deduplicated.
+
+    Each user's unread count is cached and adjusted after the transaction
+    that creates or reads notifications commits; the cache timeout
+    (NOTIFICATION_UNREAD_CACHE_TIMEOUT) bounds any drift from concurrent
+    updates. The inbox is paged with a (timestamp, id) cursor on the
+    (user, -timestamp, -id) index, so a page costs the same however deep it
+    is, and the related objects of a page are fetched with one query per
+    content type.
+    """
+
+    BATCH_SIZE = 1000
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    UNREAD_KEY = 'notifications:unread:{}'
+
+    @classmethod
+    def dedup_key(cls, user_id, content_type_id, object_id, kind, period=''):
+        return f"{kind}:{period}:{content_type_id or ''}:{object_id or ''}:{user_id}"
+
+    @classmethod
+    def build(cls, user_id, message, kind='', related_object=None, period='', dedup=True):
+        """
+        Build an unsaved notification
+
+        Args:
+            user_id: Recipient
+            message: Text (lazy translations are rendered in the active language)
+            kind: Event type, e.g. 'rent_due'; empty for notifications sent every time
+            related_object: Model instance the notification is about
+            period: Occurrence of the event, e.g. '2025-03' for a monthly reminder
+            dedup: False to send it every time, even with a kind
+
+        Returns:
+            Notification
+        """
+        content_type_id = object_id = None
+        if related_object is not None:
+            content_type_id = ContentType.objects.get_for_model(related_object).pk  # cached after the first call
+            object_id = related_object.pk
+        return Notification(
+            user_id=user_id, message=str(message), kind=kind,
+            content_type_id=content_type_id, object_id=object_id,
+            dedup_key=cls.dedup_key(user_id, content_type_id, object_id, kind, period) if kind and dedup else None,
+        )
+
+    @classmethod
+    def create_many(cls, notifications):
+        """
+        Save notifications, skipping the ones already sent
+
+        Args:
+            notifications: Unsaved notifications from ``build``
+
+        Returns:
+            int: Number of notifications created
+        """
+        keys = list({notification.dedup_key for notification in notifications if notification.dedup_key})
+        existing = set()
+        for start in range(0, len(keys), cls.BATCH_SIZE):
+            existing.update(Notification.objects.filter(
+                dedup_key__in=keys[start:start + cls.BATCH_SIZE]
+            ).values_list('dedup_key', flat=True))
+
+        new = []
+        for notification in notifications:
+            if notification.dedup_key:
+                if notification.dedup_key in existing:
+                    continue
+                existing.add(notification.dedup_key)
+            new.append(notification)
+        Notification.objects.bulk_create(new, batch_size=cls.BATCH_SIZE, ignore_conflicts=True)
+        cls.adjust_unread_counts(Counter(notification.user_id for notification in new if not notification.read))
+        return len(new)
+
+    @classmethod
+    def fan_out(cls, user_ids, message, kind='', related_object=None, period='', dedup=True):
+        """
+        Send one notification to each of several users
+
+        Returns:
+            int: Number of notifications created
+        """
+        return cls.create_many([
+            cls.build(user_id, message, kind, related_object, period, dedup) for user_id in user_ids
+        ])
+
+    @classmethod
+    def staff_user_ids(cls):
+        return list(User.objects.filter(is_staff=True).values_list('pk', flat=True))
+
+    # ---- unread counters ------------------------------------------------
+
+    @classmethod
+    def unread_count(cls, user_id):
+        key = cls.UNREAD_KEY.format(user_id)
+        count = cache.get(key)
+        if count is None or count < 0:
+            count = Notification.objects.filter(user_id=user_id, read=False).count()
+            cache.set(key, count, getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300))
+        return count
+
+    @classmethod
+    def adjust_unread_counts(cls, deltas):
+        """
+        Add to the cached unread counts once the current transaction commits
+
+        Args:
+            deltas: user id -> change of the unread count
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        def apply():
+            for user_id, delta in deltas.items():
+                try:
+                    cache.incr(cls.UNREAD_KEY.format(user_id), delta)
+                except ValueError:
+                    pass  # not cached: counted on the next read
+        transaction.on_commit(apply)
+
+    @classmethod
+    def invalidate_unread_count(cls, user_id):
+        transaction.on_commit(lambda: cache.delete(cls.UNREAD_KEY.format(user_id)))
+
+    @classmethod
+    def mark_read(cls, user_id, notification_ids=None):
+        """
+        Mark a user's notifications as read with one UPDATE
+
+        Args:
+            user_id: Owner of the notifications
+            notification_ids: Notifications to mark (default: all of them)
+
+        Returns:
+            int: Number of notifications that were unread
+        """
+        notifications = Notification.objects.filter(user_id=user_id, read=False)
+        if notification_ids is not None:
+            notifications = notifications.filter(pk__in=notification_ids)
+        updated = notifications.update(read=True)
+        cls.adjust_unread_counts({user_id: -updated})
+        return updated
+
+    # ---- inbox ----------------------------------------------------------
+
+    @classmethod
+    def related_querysets(cls):
+        # Querysets for the related objects whose __str__ follows a foreign key
+        return [Lease.objects.select_related('tenant'), Payment.objects.select_related('lease'), MaintenanceRequest.objects.all()]
+
+    @classmethod
+    def encode_cursor(cls, notification):
+        value = f"{notification.timestamp.isoformat()}|{notification.pk}"
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    @classmethod
+    def decode_cursor(cls, cursor):
+        """
+        Returns:
+            tuple: (timestamp, id) of the last notification of the previous page
+
+        Raises:
+            ValueError: The cursor is malformed
+        """
+        try:
+            timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.datetime.fromisoformat(timestamp), int(pk)
+        except (TypeError, UnicodeError, ValueError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @classmethod
+    def inbox(cls, user_id, cursor=None, limit=None, unread_only=False):
+        """
+        Get a page of a user's notifications, newest first
+
+        Args:
+            user_id: Owner of the notifications
+            cursor: ``next_cursor`` of the previous page
+            limit: Page size (at most MAX_PAGE_SIZE)
+            unread_only: Only unread notifications
+
+        Returns:
+            tuple: (notifications with ``related_object`` loaded, next cursor or None)
+
+        Raises:
+            ValueError: The cursor is malformed
+        """
+        limit = max(1, min(limit or cls.PAGE_SIZE, cls.MAX_PAGE_SIZE))
+        notifications = Notification.objects.filter(user_id=user_id).order_by('-timestamp', '-pk')
+        if unread_only:
+            notifications = notifications.filter(read=False)
+        if cursor:
+            timestamp, pk = cls.decode_cursor(cursor)
+            notifications = notifications.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=pk))
+        page = list(notifications.prefetch_related(
+            GenericPrefetch('related_object', cls.related_querysets())
+        )[:limit + 1])
+        next_cursor = cls.encode_cursor(page[limit - 1]) if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    @classmethod
+    def serialize(cls, notification):
+        related = notification.related_object
+        return {
+            'id': notification.pk,
+            'message': notification.message,
+            'kind': notification.kind,
+            'read': notification.read,
+            'timestamp': notification.timestamp.isoformat(),
+            'related_object': {
+                'type': related._meta.label_lower,
+                'id': related.pk,
+                'label': str(related),
+            } if related is not None else None,
+        }
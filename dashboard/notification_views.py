@@ -0,0 +1,62 @@
+"""
+Views for the notification inbox (JSON)
+"""
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.utils.translation import gettext as _
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET, require_POST
+
+from .notification_service import NotificationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@never_cache
+@require_GET
+def notification_inbox(request):
+    """
+    A page of the user's notifications, newest first
+
+    Query parameters: ``cursor`` (``next_cursor`` of the previous page),
+    ``limit`` and ``unread=1``.
+    """
+    try:
+        limit = int(request.GET.get('limit') or NotificationService.PAGE_SIZE)
+        notifications, next_cursor = NotificationService.inbox(
+            request.user.pk, cursor=request.GET.get('cursor'), limit=limit,
+            unread_only=request.GET.get('unread') == '1',
+        )
+    except ValueError:
+        return HttpResponseBadRequest(_("معايير الصفحة غير صالحة."))
+    return JsonResponse({
+        'notifications': [NotificationService.serialize(notification) for notification in notifications],
+        'next_cursor': next_cursor,
+        'unread_count': NotificationService.unread_count(request.user.pk),
+    })
+
+
+@login_required
+@never_cache
+@require_GET
+def notification_unread_count(request):
+    """The user's unread count, from the cache"""
+    return JsonResponse({'unread_count': NotificationService.unread_count(request.user.pk)})
+
+
+@login_required
+@require_POST
+def notification_mark_read(request, pk):
+    """Mark one of the user's notifications as read"""
+    NotificationService.mark_read(request.user.pk, [pk])
+    return JsonResponse({'success': True, 'unread_count': NotificationService.unread_count(request.user.pk)})
+
+
+@login_required
+@require_POST
+def notification_mark_all_read(request):
+    """Mark all of the user's notifications as read with one UPDATE"""
+    updated = NotificationService.mark_read(request.user.pk)
+    return JsonResponse({'success': True, 'updated': updated, 'unread_count': NotificationService.unread_count(request.user.pk)})
@@ -0,0 +1,207 @@
+"""
+Occupancy Service for per-unit current leases and per-building occupancy totals
+"""
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Building, Lease, Unit
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OccupancyService:
+    """
+    Service class for occupancy lookups
+
+    Listing pages and reports used to query the current lease of every unit
+    and count the units of every building one by one. These helpers compute
+    the current lease of each unit with one annotated query plus one query
+    for the leases (and their tenants).
+
+    The unit totals of each building are stored on the building
+    (``total_units`` and ``occupied_units``) and kept up to date with F()
+    deltas: by the Unit signals for unit saves and deletes, and by
+    LeaseLifecycleService and LeaseStatusService for the availability
+    changes they make with queryset updates. ``reconcile`` recomputes them
+    from the Unit table (after raw imports or restores).
+    """
+
+    ACTIVE_LEASE_STATUSES = ('active', 'expiring_soon')
+
+    @classmethod
+    def annotate_units(cls, units):
+        """
+        Annotate units with the id of their current lease
+
+        Args:
+            units: Unit queryset
+
+        Returns:
+            QuerySet: Units with ``current_lease_id`` (None when vacant)
+        """
+        current_lease = Lease.objects.filter(
+            unit=OuterRef('pk'), status__in=cls.ACTIVE_LEASE_STATUSES,
+        ).order_by('pk').values('pk')[:1]
+        return units.annotate(current_lease_id=Subquery(current_lease))
+
+    @classmethod
+    def attach_current_leases(cls, units):
+        """
+        Set ``unit.current_lease`` (with its tenant) on annotated units
+
+        Args:
+            units: Iterable of units from ``annotate_units``
+
+        Returns:
+            list: The units
+        """
+        units = list(units)
+        lease_ids = {unit.current_lease_id for unit in units if unit.current_lease_id}
+        leases = Lease.objects.select_related('tenant').in_bulk(lease_ids) if lease_ids else {}
+        for unit in units:
+            unit.current_lease = leases.get(unit.current_lease_id)
+        return units
+
+    @classmethod
+    def get_unit_index(cls, units=None):
+        """
+        Get units with their current lease, tenant and rent
+
+        Args:
+            units: Unit queryset (default: all units by building and number)
+
+        Returns:
+            list: Units with ``current_lease`` set (None when vacant)
+        """
+        if units is None:
+            units = Unit.objects.select_related('building').order_by('building', 'unit_number')
+        return cls.attach_current_leases(cls.annotate_units(units))
+
+    @classmethod
+    def apply(cls, building_id, total=0, occupied=0):
+        """
+        Add a delta to the unit counters of a building
+
+        Args:
+            building_id: Building primary key
+            total: Total units delta
+            occupied: Occupied units delta
+        """
+        if building_id is None or not (total or occupied):
+            return
+        # Never below zero, even when the counters drifted (``reconcile`` fixes them)
+        Building.objects.filter(pk=building_id).update(
+            total_units=Greatest(F('total_units') + total, 0),
+            occupied_units=Greatest(F('occupied_units') + occupied, 0),
+        )
+
+    @classmethod
+    def apply_availability(cls, building_ids, available):
+        """
+        Update the counters after units changed availability with a queryset update
+
+        Args:
+            building_ids: Building id of each unit that changed (repeated
+                for several units of a building)
+            available: The new availability of these units
+        """
+        for building_id, count in Counter(building_ids).items():
+            cls.apply(building_id, occupied=-count if available else count)
+
+    @classmethod
+    def reconcile(cls):
+        """
+        Recompute the unit counters of the buildings that drifted
+
+        Returns:
+            int: Number of buildings corrected
+        """
+        units = Unit.objects.filter(building=OuterRef('pk')).order_by().values('building')
+        actual_total = Coalesce(Subquery(units.annotate(count=Count('pk')).values('count')), 0)
+        actual_occupied = Coalesce(
+            Subquery(units.annotate(count=Count('pk', filter=Q(is_available=False))).values('count')), 0
+        )
+        drifted = list(
+            Building.objects.annotate(actual_total=actual_total, actual_occupied=actual_occupied)
+            .exclude(total_units=F('actual_total'), occupied_units=F('actual_occupied'))
+            .values_list('pk', flat=True)
+        )
+        if drifted:
+            Building.objects.filter(pk__in=drifted).update(
+                total_units=actual_total, occupied_units=actual_occupied,
+            )
+            logger.info(f"Reconciled occupancy counters of {len(drifted)} buildings")
+        return len(drifted)
+
+    @classmethod
+    def get_building_lease_counters(cls, building):
+        """
+        Count the active leases, their tenants and all maintenance requests of a building
+
+        The three counters come from one aggregate over the building's leases.
+
+        Returns:
+            dict: active_leases, current_tenants, maintenance_requests
+        """
+        return Lease.objects.filter(unit__building=building).aggregate(
+            active_leases=Count('pk', filter=Q(status='active'), distinct=True),
+            current_tenants=Count('tenant', filter=Q(status='active'), distinct=True),
+            maintenance_requests=Count('maintenance_requests', distinct=True),
+        )
+
+    @classmethod
+    def set_building_rates(cls, buildings):
+        """
+        Set ``available_units`` and ``occupancy_rate`` on buildings
+
+        Args:
+            buildings: Iterable of buildings
+
+        Returns:
+            list: The buildings
+        """
+        buildings = list(buildings)
+        for building in buildings:
+            building.available_units = building.total_units - building.occupied_units
+            building.occupancy_rate = (
+                building.occupied_units / building.total_units * 100 if building.total_units > 0 else 0
+            )
+        return buildings
+
+    @classmethod
+    def get_building_index(cls, buildings=None):
+        """
+        Get buildings with their unit totals and occupancy rate
+
+        Args:
+            buildings: Building queryset (default: all buildings by name)
+
+        Returns:
+            list: Buildings with ``total_units``, ``occupied_units``,
+                ``available_units`` and ``occupancy_rate`` set
+        """
+        if buildings is None:
+            buildings = Building.objects.order_by('name')
+        return cls.set_building_rates(buildings)
+
+    @classmethod
+    def get_totals(cls, buildings=None):
+        """
+        Sum the unit totals of buildings (default: all buildings)
+
+        Returns:
+            dict: total_units, occupied_units, available_units, occupancy_rate
+        """
+        if buildings is None:
+            buildings = list(Building.objects.only('total_units', 'occupied_units'))
+        total_units = sum(building.total_units for building in buildings)
+        occupied_units = sum(building.occupied_units for building in buildings)
+        return {
+            'total_units': total_units,
+            'occupied_units': occupied_units,
+            'available_units': total_units - occupied_units,
+            'occupancy_rate': occupied_units / total_units * 100 if total_units > 0 else 0,
+        }
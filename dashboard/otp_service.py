@@ -2,19 +2,32 @@
 OTP Service for generating, validating, and managing OTP codes
 """
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
-from .models import OTP, UserProfile
+from .models import OTP
+from .otp_store import get_otp_store
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class OTPService:
-    """Service class for OTP operations"""
+    """
+    Service class for OTP operations
+
+    Codes, rate limits and single-use markers live in the store selected by
+    the OTP_STORE setting (see ``otp_store.py``); by default the cache, so a
+    login storm does not hit the OTP table. Expired rows of the database
+    store are removed in bulk by ``purge_expired_otps``.
+    """
     
     OTP_EXPIRY_MINUTES = 5  # OTP expires after 5 minutes
     MAX_OTP_ATTEMPTS = 3    # Maximum OTP attempts per hour
+    MAX_VERIFY_ATTEMPTS = 5  # Wrong codes before an OTP is burned (cache store)
+    
+    @classmethod
+    def get_store(cls):
+        return get_otp_store(cls.OTP_EXPIRY_MINUTES, cls.MAX_OTP_ATTEMPTS, cls.MAX_VERIFY_ATTEMPTS)
     
     @classmethod
     def generate_otp(cls, user, phone_number, purpose='login'):
@@ -27,30 +40,17 @@ class OTPService:
             purpose: Purpose of OTP (login, reset_password, verify_phone)
             
         Returns:
-            OTP instance or None if generation failed
+            OTP instance (unsaved with the cache store) or None if generation failed
         """
         try:
-            # Clean up expired OTPs for this user
-            cls._cleanup_expired_otps(user)
+            store = cls.get_store()
             
             # Check if user has exceeded OTP attempts
-            if not cls._check_otp_rate_limit(user):
+            if not store.allow_send(user):
                 logger.warning(f"User {user.username} exceeded OTP rate limit")
                 return None
             
-            # Generate new OTP code
-            code = OTP.generate_code()
-            expires_at = timezone.now() + timedelta(minutes=cls.OTP_EXPIRY_MINUTES)
-            
-            # Create OTP instance
-            otp = OTP.objects.create(
-                user=user,
-                code=code,
-                phone_number=phone_number,
-                expires_at=expires_at,
-                purpose=purpose
-            )
-            
+            otp = store.create(user, phone_number, purpose)
             logger.info(f"Generated OTP for user {user.username}")
             return otp
             
@@ -61,7 +61,7 @@ class OTPService:
     @classmethod
     def validate_otp(cls, user, code, phone_number=None, purpose='login'):
         """
-        Validate an OTP code
+        Validate an OTP code and mark it as used
         
         Args:
             user: Django User instance
@@ -73,30 +73,11 @@ class OTPService:
             OTP instance if valid, None otherwise
         """
         try:
-            # Find the most recent valid OTP for this user
-            otp = OTP.objects.filter(
-                user=user,
-                code=code,
-                purpose=purpose,
-                is_used=False
-            ).order_by('-created_at').first()
-            
+            otp = cls.get_store().consume(user, code, phone_number, purpose)
             if not otp:
                 logger.warning(f"No valid OTP found for user {user.username}")
                 return None
             
-            # Check if OTP has expired
-            if otp.is_expired():
-                logger.warning(f"OTP expired for user {user.username}")
-                return None
-            
-            # Additional phone number validation if provided
-            if phone_number and otp.phone_number != phone_number:
-                logger.warning(f"Phone number mismatch for user {user.username}")
-                return None
-            
-            # Mark OTP as used
-            otp.mark_as_used()
             logger.info(f"OTP validated successfully for user {user.username}")
             return otp
             
@@ -136,47 +117,29 @@ class OTPService:
             User instance or None if not found
         """
         try:
-            profile = UserProfile.objects.filter(phone_number=phone_number).first()
-            return profile.user if profile else None
+            return User.objects.filter(profile__phone_number=phone_number).first()
         except Exception as e:
             logger.error(f"Failed to get user by phone {phone_number}: {str(e)}")
             return None
     
     @classmethod
-    def _cleanup_expired_otps(cls, user):
-        """Clean up expired OTPs for a user"""
-        try:
-            OTP.objects.filter(
-                user=user,
-                expires_at__lt=timezone.now()
-            ).delete()
-        except Exception as e:
-            logger.error(f"Failed to cleanup expired OTPs for user {user.username}: {str(e)}")
-    
-    @classmethod
-    def _check_otp_rate_limit(cls, user):
+    def purge_expired(cls, batch_size=5000):
         """
-        Check if user has exceeded OTP rate limit
+        Delete expired and used OTP rows in batches
         
         Args:
-            user: Django User instance
+            batch_size: Rows deleted per statement
             
         Returns:
-            bool: True if within rate limit, False otherwise
+            int: Number of deleted rows
         """
-        try:
-            # Count OTPs generated in the last hour
-            one_hour_ago = timezone.now() - timedelta(hours=1)
-            otp_count = OTP.objects.filter(
-                user=user,
-                created_at__gte=one_hour_ago
-            ).count()
-            
-            return otp_count < cls.MAX_OTP_ATTEMPTS
-            
-        except Exception as e:
-            logger.error(f"Failed to check rate limit for user {user.username}: {str(e)}")
-            return False
+        stale = OTP.objects.filter(Q(expires_at__lt=timezone.now()) | Q(is_used=True)).order_by()
+        deleted = 0
+        while True:
+            pks = list(stale.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            deleted += OTP.objects.filter(pk__in=pks).delete()[0]
     
     @classmethod
     def get_otp_for_user(cls, user, purpose='login'):
@@ -188,15 +151,10 @@ class OTPService:
             purpose: Purpose of OTP
             
         Returns:
-            OTP instance or None if not found
+            OTP instance (without the code with the cache store) or None if not found
         """
         try:
-            return OTP.objects.filter(
-                user=user,
-                purpose=purpose,
-                is_used=False,
-                expires_at__gt=timezone.now()
-            ).order_by('-created_at').first()
+            return cls.get_store().get_pending(user, purpose)
         except Exception as e:
             logger.error(f"Failed to get OTP for user {user.username}: {str(e)}")
             return None
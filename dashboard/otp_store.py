@@ -0,0 +1,195 @@
+"""
+OTP stores: where OTP codes, rate limits and single-use markers are kept
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import OTP
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def hash_code(user_id, purpose, code):
+    """Keyed hash of an OTP code (the cache store never keeps the code itself)"""
+    return salted_hmac('dashboard.otp', f"{user_id}:{purpose}:{code}").hexdigest()
+
+
+class CacheOTPStore:
+    """
+    OTP store backed by the Django cache (OTP_STORE = 'cache')
+
+    Each user and purpose has one pending code, kept as a keyed hash with its
+    expiry as the cache timeout, so issuing and verifying a code never touch
+    the OTP table. Rate limits are cache counters (``add``/``incr`` are atomic
+    on every backend), the comparison is constant-time, and a code is
+    consumed by ``cache.add`` of a used marker, so two concurrent
+    verifications cannot both succeed. A code is burned after
+    MAX_VERIFY_ATTEMPTS wrong guesses.
+
+    OTP_CACHE_ALIAS selects the cache; it must be shared between processes
+    (Redis, Memcached) when the site runs more than one.
+    """
+
+    def __init__(self, expiry_minutes, max_sends, max_verify_attempts):
+        self.cache = caches[getattr(settings, 'OTP_CACHE_ALIAS', 'default')]
+        self.expiry = timedelta(minutes=expiry_minutes)
+        self.max_sends = max_sends
+        self.max_verify_attempts = max_verify_attempts
+
+    def _key(self, user_id, purpose):
+        return f"otp:{purpose}:{user_id}"
+
+    def _incr(self, key, timeout):
+        """Atomically increment a counter, starting it at 1 with ``timeout``"""
+        if self.cache.add(key, 1, timeout):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:  # expired between add and incr
+            self.cache.add(key, 1, timeout)
+            return 1
+
+    def allow_send(self, user):
+        return self._incr(f"otp:sends:{user.pk}", 3600) <= self.max_sends
+
+    def reset_limits(self, user_ids):
+        self.cache.delete_many([f"otp:sends:{user_id}" for user_id in user_ids])
+
+    def create(self, user, phone_number, purpose):
+        now = timezone.now()
+        code = OTP.generate_code()
+        record = {
+            'id': uuid.uuid4().hex,
+            'hash': hash_code(user.pk, purpose, code),
+            'phone_number': phone_number,
+            'created_at': now,
+            'expires_at': now + self.expiry,
+        }
+        self.cache.set(self._key(user.pk, purpose), record, self.expiry.total_seconds())
+        return OTP(user=user, code=code, phone_number=phone_number, purpose=purpose,
+                   created_at=now, expires_at=record['expires_at'])
+
+    def _pending(self, user, purpose):
+        record = self.cache.get(self._key(user.pk, purpose))
+        if record is None or record['expires_at'] <= timezone.now():
+            return None
+        return record
+
+    def consume(self, user, code, phone_number, purpose):
+        key = self._key(user.pk, purpose)
+        record = self._pending(user, purpose)
+        if record is None:
+            return None
+        if phone_number and record['phone_number'] != phone_number:
+            logger.warning(f"Phone number mismatch for user {user.username}")
+            return None
+
+        ttl = max(int((record['expires_at'] - timezone.now()).total_seconds()), 1)
+        if not constant_time_compare(record['hash'], hash_code(user.pk, purpose, code)):
+            if self._incr(f"otp:fails:{record['id']}", ttl) >= self.max_verify_attempts:
+                logger.warning(f"OTP burned after {self.max_verify_attempts} wrong codes for user {user.username}")
+                self.cache.delete(key)
+            return None
+        if not self.cache.add(f"otp:used:{record['id']}", 1, ttl):
+            return None  # already used
+        self.cache.delete(key)
+        return OTP(user=user, code=code, phone_number=record['phone_number'], purpose=purpose,
+                   created_at=record['created_at'], expires_at=record['expires_at'], is_used=True)
+
+    def get_pending(self, user, purpose):
+        record = self._pending(user, purpose)
+        if record is None or self.cache.get(f"otp:used:{record['id']}"):
+            return None
+        # The code itself is not stored
+        return OTP(user=user, code='', phone_number=record['phone_number'], purpose=purpose,
+                   created_at=record['created_at'], expires_at=record['expires_at'])
+
+
+class DatabaseOTPStore:
+    """
+    OTP store backed by the OTP table (OTP_STORE = 'database')
+
+    For deployments without a shared cache. The code is looked up through the
+    (user, purpose, is_used) index and consumed with a conditional UPDATE, so
+    it is single-use under concurrency; expired rows are removed by
+    ``purge_expired_otps`` rather than on every request.
+    """
+
+    def __init__(self, expiry_minutes, max_sends, max_verify_attempts):
+        self.expiry = timedelta(minutes=expiry_minutes)
+        self.max_sends = max_sends
+
+    def allow_send(self, user):
+        since = timezone.now() - timedelta(hours=1)
+        return OTP.objects.filter(user=user, created_at__gte=since).count() < self.max_sends
+
+    def reset_limits(self, user_ids):
+        pass  # the limit is derived from the rows
+
+    def create(self, user, phone_number, purpose):
+        return OTP.objects.create(
+            user=user,
+            code=OTP.generate_code(),
+            phone_number=phone_number,
+            expires_at=timezone.now() + self.expiry,
+            purpose=purpose,
+        )
+
+    def get_pending(self, user, purpose):
+        return OTP.objects.filter(
+            user=user, purpose=purpose, is_used=False, expires_at__gt=timezone.now(),
+        ).order_by('-created_at').first()
+
+    def consume(self, user, code, phone_number, purpose):
+        otp = self.get_pending(user, purpose)
+        if otp is None or not constant_time_compare(otp.code, code):
+            return None
+        if phone_number and otp.phone_number != phone_number:
+            logger.warning(f"Phone number mismatch for user {user.username}")
+            return None
+        if not OTP.objects.filter(pk=otp.pk, is_used=False).update(is_used=True):
+            return None  # already used
+        otp.is_used = True
+        return otp
+
+
+STORES = {
+    'cache': CacheOTPStore,
+    'database': DatabaseOTPStore,
+}
+
+
+def get_otp_store(expiry_minutes, max_sends, max_verify_attempts):
+    """
+    Get the store selected by the OTP_STORE setting
+
+    Returns:
+        CacheOTPStore or DatabaseOTPStore
+    """
+    name = getattr(settings, 'OTP_STORE', 'cache')
+    if name not in STORES:
+        raise ValueError(f"Unknown OTP store: {name}")
+    return STORES[name](expiry_minutes, max_sends, max_verify_attempts)
+
+
+@checks.register(checks.Tags.security)
+def check_otp_store(app_configs, **kwargs):
+    """Reject the cache store on a per-process cache outside DEBUG (codes would not be shared between workers)"""
+    if getattr(settings, 'OTP_STORE', 'cache') != 'cache' or settings.DEBUG:
+        return []
+    alias = getattr(settings, 'OTP_CACHE_ALIAS', 'default')
+    if not isinstance(caches[alias], LocMemCache):
+        return []
+    return [checks.Error(
+        f"OTP_STORE = 'cache' uses the '{alias}' LocMemCache, which is not shared between processes.",
+        hint="Set CACHE_BACKEND to a shared cache (Redis, Memcached) or OTP_STORE = 'database'.",
+        id='dashboard.E001',
+    )]
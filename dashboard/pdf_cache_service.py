@@ -0,0 +1,189 @@
+"""
+PDF Cache Service for serving rendered receipts and statements from disk
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.template.loader import get_template
+from django.utils import translation
+from django.utils.http import parse_etags, quote_etag
+
+from .utils import generate_pdf_bytes
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PDFCacheService:
+    """
+    Content-addressed cache of rendered PDFs
+
+    A PDF is stored under ``<PDF_CACHE_DIR>/<scope>/<key>.pdf`` where the key
+    hashes the template (path and modification time), the field values of
+    the model instances rendered in it, the company branding and the active
+    language. Any change to those produces a new key, so a stale PDF is never
+    served. The per-lease scope directories are removed by the Payment and
+    Lease signals to reclaim space, and the least recently served files are
+    evicted once the cache grows beyond ``PDF_CACHE_MAX_BYTES``.
+    """
+
+    @classmethod
+    def cache_dir(cls):
+        return getattr(settings, 'PDF_CACHE_DIR', os.path.join(str(settings.BASE_DIR), 'cache', 'pdf'))
+
+    @classmethod
+    def max_bytes(cls):
+        return getattr(settings, 'PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+
+    @classmethod
+    def lease_scope(cls, lease_id):
+        return f"lease_{lease_id}"
+
+    @classmethod
+    def fingerprint(cls, obj):
+        """
+        Serializable snapshot of everything in ``obj`` that can change a rendered PDF
+
+        Args:
+            obj: Model instance, dict, list/tuple of those, or a plain value
+        """
+        if obj is None or isinstance(obj, (str, int, float, bool)):
+            return obj
+        if isinstance(obj, dict):
+            return {str(k): cls.fingerprint(v) for k, v in sorted(obj.items(), key=lambda item: str(item[0]))}
+        if isinstance(obj, (list, tuple)):
+            return [cls.fingerprint(item) for item in obj]
+        meta = getattr(obj, '_meta', None)
+        if meta is not None:
+            return [meta.label, obj.pk] + [field.value_to_string(obj) for field in meta.concrete_fields]
+        return str(obj)
+
+    @classmethod
+    def make_key(cls, template_path, objects, company=None):
+        """
+        Build the cache key of a rendering
+
+        Args:
+            template_path: Template used to render the PDF
+            objects: Model instances (and plain values) shown in the PDF
+            company: Company instance or branding dict
+
+        Returns:
+            str: Hex digest
+        """
+        template = get_template(template_path)
+        origin = getattr(getattr(template, 'origin', None), 'name', None)
+        try:
+            template_mtime = os.stat(origin).st_mtime_ns if origin else None
+        except OSError:
+            template_mtime = None
+        payload = json.dumps([
+            getattr(settings, 'PDF_CACHE_VERSION', 1),
+            template_path,
+            template_mtime,
+            translation.get_language(),
+            cls.fingerprint(company),
+            cls.fingerprint(list(objects)),
+        ], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get_or_render(cls, scope, key, template_path, context):
+        """
+        Get the path of the cached PDF, rendering and storing it on a miss
+
+        Returns:
+            str: Absolute path of the PDF file
+        """
+        directory = os.path.join(cls.cache_dir(), scope)
+        path = os.path.join(directory, f"{key}.pdf")
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # mark as recently used for the LRU eviction
+                return path
+            except OSError:
+                pass  # evicted in the meantime
+
+        pdf_bytes = generate_pdf_bytes(template_path, context)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        cls.evict()
+        return path
+
+    @classmethod
+    def evict(cls):
+        """Delete the least recently used PDFs until the cache fits in PDF_CACHE_MAX_BYTES"""
+        entries = []
+        total = 0
+        for root, _dirs, files in os.walk(cls.cache_dir()):
+            for name in files:
+                if not name.endswith('.pdf'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        limit = cls.max_bytes()
+        if total <= limit:
+            return 0
+        removed = 0
+        for _mtime, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            if total <= limit * 0.9:
+                break
+        logger.info(f"Evicted {removed} cached PDFs")
+        return removed
+
+    @classmethod
+    def invalidate(cls, scope):
+        """Remove every cached PDF of a scope"""
+        shutil.rmtree(os.path.join(cls.cache_dir(), scope), ignore_errors=True)
+
+    @classmethod
+    def serve(cls, request, scope, template_path, context, objects, filename, company=None):
+        """
+        Serve a cached PDF, honouring If-None-Match
+
+        Args:
+            request: HttpRequest
+            scope: Cache directory of the PDF (e.g. ``lease_scope(lease.pk)``)
+            template_path: Template used to render the PDF
+            context: Template context, only used on a cache miss
+            objects: Model instances whose values are rendered in the PDF
+            filename: File name shown to the browser
+            company: Company instance or branding dict rendered in the PDF
+
+        Returns:
+            FileResponse or HttpResponseNotModified
+        """
+        key = cls.make_key(template_path, objects, company)
+        etag = quote_etag(key)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                pdf_file = open(cls.get_or_render(scope, key, template_path, context), 'rb')
+            except FileNotFoundError:
+                # Evicted or invalidated between the lookup and the open
+                pdf_file = open(cls.get_or_render(scope, key, template_path, context), 'rb')
+            response = FileResponse(pdf_file, content_type='application/pdf')
+            response['Content-Disposition'] = f'inline; filename="{filename}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,216 @@
+"""
+Long-lived WeasyPrint renderer with preloaded fonts, stylesheets and resources
+"""
+from collections import defaultdict, deque
+import mimetypes
+import os
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.template.loader import get_template
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PDFRenderer:
+    """
+    WeasyPrint renderer kept alive for the lifetime of the process
+
+    The font configuration and the shared stylesheet (``@font-face`` rules for
+    the bundled Arabic fonts) are built once. Fonts, images and stylesheets
+    referenced by the templates are fetched once and then served from memory,
+    and ``/static/`` and ``/media/`` URLs are read from disk instead of being
+    resolved against ``BASE_DIR``. Each web or document worker process keeps
+    its own warm instance (see ``get_renderer``).
+    """
+
+    SHARED_FONTS = {
+        'Amiri': 'fonts/Amiri-Regular.ttf',
+        'Tajawal': 'fonts/Tajawal-Regular.ttf',
+    }
+    MAX_RESOURCE_BYTES = 20 * 1024 * 1024
+    LATENCY_SAMPLES = 200
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._weasyprint = None
+        self._font_config = None
+        self._stylesheets = []
+        self.url_fetcher = None
+        self._resources = {}
+        self._resources_size = 0
+        self._latencies = defaultdict(lambda: deque(maxlen=self.LATENCY_SAMPLES))
+        self._render_count = 0
+        self._busy_seconds = 0.0
+        self._started = time.monotonic()
+
+    def warm_up(self):
+        """Import WeasyPrint and build the shared font configuration and stylesheet"""
+        if self._weasyprint is not None:
+            return
+        with self._lock:
+            if self._weasyprint is not None:
+                return
+            import weasyprint
+            from weasyprint.text.fonts import FontConfiguration
+
+            font_config = FontConfiguration()
+            self.url_fetcher = self._build_url_fetcher(weasyprint)
+            rules = []
+            for family, path in self.SHARED_FONTS.items():
+                font_path = self.find_static(path)
+                if font_path:
+                    rules.append(f"@font-face {{ font-family: '{family}'; src: url('file://{font_path}'); }}")
+            self._stylesheets = [
+                weasyprint.CSS(string='\n'.join(rules), font_config=font_config, url_fetcher=self.url_fetcher)
+            ] if rules else []
+            self._font_config = font_config
+            self._weasyprint = weasyprint
+            logger.info("WeasyPrint renderer warmed up")
+
+    @classmethod
+    def find_static(cls, path):
+        """Absolute path of a static file, or None"""
+        from django.contrib.staticfiles import finders
+        found = finders.find(path)
+        if found:
+            return found
+        candidate = os.path.join(str(settings.STATIC_ROOT), path)
+        return candidate if os.path.exists(candidate) else None
+
+    def _local_path(self, url):
+        parsed = urlparse(url)
+        if parsed.scheme not in ('', 'file'):
+            return None
+        path = unquote(parsed.path)
+        static_prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+        media_prefix = '/' + settings.MEDIA_URL.strip('/') + '/'
+        if path.startswith(static_prefix):
+            return self.find_static(path[len(static_prefix):])
+        if path.startswith(media_prefix):
+            return os.path.join(str(settings.MEDIA_ROOT), path[len(media_prefix):])
+        return path
+
+    def _fetch(self, url, fallback):
+        """
+        Fetch a resource once and keep it in memory
+
+        Returns:
+            tuple: (final url, body bytes, mime type)
+        """
+        cached = self._resources.get(url)
+        if cached is not None:
+            return cached
+        local_path = self._local_path(url)
+        if local_path and os.path.isfile(local_path):
+            with open(local_path, 'rb') as f:
+                resource = (url, f.read(), mimetypes.guess_type(local_path)[0])
+        else:
+            resource = fallback(url)
+        if self._resources_size + len(resource[1]) <= self.MAX_RESOURCE_BYTES:
+            self._resources[url] = resource
+            self._resources_size += len(resource[1])
+        return resource
+
+    def _build_url_fetcher(self, weasyprint):
+        """Build a caching url_fetcher for the installed WeasyPrint API"""
+        from weasyprint import urls
+
+        renderer = self
+        if hasattr(urls, 'URLFetcher'):
+            # WeasyPrint >= 66: fetchers are URLFetcher objects returning URLFetcherResponse
+            class CachingURLFetcher(urls.URLFetcher):
+                def fetch(self, url, headers=None):
+                    def fallback(url):
+                        response = super(CachingURLFetcher, self).fetch(url, headers)
+                        try:
+                            return response.url, response.read(), response.content_type
+                        finally:
+                            response.close()
+                    final_url, body, mime_type = renderer._fetch(url, fallback)
+                    return urls.URLFetcherResponse(final_url, body, {'Content-Type': mime_type} if mime_type else None)
+            return CachingURLFetcher()
+
+        def fetcher(url, *args, **kwargs):
+            def fallback(url):
+                resource = weasyprint.default_url_fetcher(url, *args, **kwargs)
+                body = resource['file_obj'].read() if 'file_obj' in resource else resource['string']
+                if isinstance(body, str):
+                    body = body.encode(resource.get('encoding') or 'utf-8')
+                return resource.get('redirected_url', url), body, resource.get('mime_type')
+            final_url, body, mime_type = renderer._fetch(url, fallback)
+            return {'string': body, 'mime_type': mime_type, 'redirected_url': final_url}
+        return fetcher
+
+    def render_html(self, html, label='html'):
+        """
+        Render an HTML string to PDF bytes
+
+        Args:
+            html: HTML document
+            label: Name under which the latency is recorded
+
+        Returns:
+            bytes: The PDF
+        """
+        self.warm_up()
+        start = time.perf_counter()
+        with self._lock:
+            document = self._weasyprint.HTML(
+                string=html, base_url=str(settings.BASE_DIR), url_fetcher=self.url_fetcher,
+            )
+            pdf_bytes = document.write_pdf(stylesheets=self._stylesheets, font_config=self._font_config)
+        elapsed = time.perf_counter() - start
+        self._latencies[label].append(elapsed)
+        self._render_count += 1
+        self._busy_seconds += elapsed
+        return pdf_bytes
+
+    def render(self, template_path, context):
+        """Render a Django template to PDF bytes"""
+        html = get_template(template_path).render(context)
+        return self.render_html(html, label=template_path)
+
+    def metrics(self):
+        """
+        Get render throughput and latency metrics
+
+        Returns:
+            dict: Totals, renders per second of rendering time, and per-template
+                count / average / p95 / max latency in milliseconds over the
+                last LATENCY_SAMPLES renders
+        """
+        templates = {}
+        for label, samples in self._latencies.items():
+            ordered = sorted(samples)
+            templates[label] = {
+                'count': len(ordered),
+                'avg_ms': sum(ordered) / len(ordered) * 1000,
+                'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                'max_ms': ordered[-1] * 1000,
+            }
+        return {
+            'renders': self._render_count,
+            'busy_seconds': self._busy_seconds,
+            'uptime_seconds': time.monotonic() - self._started,
+            'renders_per_second': self._render_count / self._busy_seconds if self._busy_seconds else 0.0,
+            'cached_resources': len(self._resources),
+            'templates': templates,
+        }
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer():
+    """Process-wide PDFRenderer instance"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PDFRenderer()
+    return _renderer
@@ -0,0 +1,155 @@
+"""
+Query budget helpers for recording the SQL executed by a block of code
+
+Used by ``QueryBudgetMiddleware`` to log per-request query counts and by the
+test suite to lock in the number of queries each dashboard view may run.
+"""
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+import re
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+# Collapse "IN (%s, %s, %s)" so queries differing only by list length share a signature
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def query_signature(sql):
+    """
+    Normalize a SQL statement so repeated executions of the same query match
+
+    Args:
+        sql: SQL string as sent to the database driver (parameters not interpolated)
+
+    Returns:
+        str: Normalized signature
+    """
+    sql = _PLACEHOLDER_LIST_RE.sub('(%s...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def get_query_budget(url_name):
+    """
+    Get the configured query budget of a URL name
+
+    Args:
+        url_name: Resolved view name (``request.resolver_match.view_name``)
+
+    Returns:
+        int: Maximum number of queries allowed for one request
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(url_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', 50))
+
+
+class QueryRecorder:
+    """
+    Context manager recording every query run on the given database aliases
+
+    Attributes:
+        queries: list of (signature, duration in seconds) tuples
+    """
+
+    def __init__(self, using=None):
+        self.using = [using] if isinstance(using, str) else using
+        self.queries = []
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        aliases = self.using or [connection.alias for connection in connections.all()]
+        for alias in aliases:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((query_signature(sql), time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        """Total SQL time in seconds"""
+        return sum(duration for _signature, duration in self.queries)
+
+    def duplicates(self, threshold=2):
+        """
+        Get the query signatures executed at least ``threshold`` times
+
+        Returns:
+            list: (signature, count) tuples, most repeated first
+        """
+        counts = Counter(signature for signature, _duration in self.queries)
+        return [(signature, count) for signature, count in counts.most_common() if count >= threshold]
+
+    def summary(self):
+        lines = [f"{self.count} queries in {self.total_time * 1000:.1f} ms"]
+        for signature, count in self.duplicates():
+            lines.append(f"  {count}x {signature}")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def assert_query_budget(max_queries, max_repeats=None, using=None):
+    """
+    Fail when the block runs more than ``max_queries`` queries, or repeats a
+    single query signature more than ``max_repeats`` times (an N+1 pattern)
+
+    Yields:
+        QueryRecorder: The recorder, for further inspection
+    """
+    with QueryRecorder(using=using) as recorder:
+        yield recorder
+    if recorder.count > max_queries:
+        raise AssertionError(f"Query budget exceeded ({max_queries} allowed): {recorder.summary()}")
+    if max_repeats is not None:
+        repeated = recorder.duplicates(threshold=max_repeats + 1)
+        if repeated:
+            raise AssertionError(
+                f"Query repeated more than {max_repeats} times: {repeated[0][1]}x {repeated[0][0]}"
+            )
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin asserting the query budget of a dashboard view"""
+
+    query_budget_max_repeats = None
+
+    def assertQueryBudget(self, url_name, max_queries=None, max_repeats=None, args=None, kwargs=None,
+                          method='get', data=None):
+        """
+        Request ``url_name`` with ``self.client`` and check its query budget
+
+        Args:
+            url_name: URL name from ``dashboard/urls.py``
+            max_queries: Budget, defaults to ``settings.QUERY_BUDGETS[url_name]``
+            max_repeats: Allowed executions of one query signature
+            args, kwargs: Passed to ``reverse``
+            method: Client method name
+            data: Request data
+
+        Returns:
+            HttpResponse: The response, for further assertions
+        """
+        if max_queries is None:
+            max_queries = get_query_budget(url_name)
+        if max_repeats is None:
+            max_repeats = self.query_budget_max_repeats
+        url = reverse(url_name, args=args, kwargs=kwargs)
+        with assert_query_budget(max_queries, max_repeats=max_repeats):
+            response = getattr(self.client, method)(url, data or {})
+        return response
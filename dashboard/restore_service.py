@@ -0,0 +1,311 @@
+"""
+Restore Service for streaming backup archives back into the database and media directory
+"""
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.color import no_style
+from django.core.serializers import base
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .backup_service import BackupService
+from .calendar_service import CalendarService
+from .company_service import CompanyService
+from .occupancy_service import OccupancyService
+from .rollup_service import FinancialRollupService
+from .snapshot_service import DashboardSnapshotService
+import logging
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(fp, chunk_size=1024 * 1024):
+    """
+    Yield the elements of a JSON array read incrementally from a binary file
+
+    Only ``chunk_size`` characters plus the element being decoded are held in
+    memory, whatever the size of the array.
+    """
+    reader = io.TextIOWrapper(fp, encoding='utf-8')
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = reader.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer):
+            break
+        if eof:
+            return  # empty file
+        fill()
+    if buffer[pos] != '[':
+        raise ValueError("Expected a JSON array")
+    pos += 1
+
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("Unterminated JSON array")
+            fill()
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            element, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()  # element continues in the next chunk
+            continue
+        yield element
+
+
+class RestoreService:
+    """
+    Service class for restoring backups made by BackupService (or the older
+    ``db.json`` + ``media/`` archives)
+
+    ``db.json`` is read straight from the archive and inserted model by model
+    in batches of RESTORE_BATCH_SIZE rows with ``bulk_create`` (upserting on
+    the primary key), inside one transaction with constraint checks deferred
+    to the end. Models serialized with natural primary keys (users, groups,
+    permissions, content types) are few and keep the regular one-by-one
+    save. Media files are copied by RESTORE_IO_THREADS threads, from the
+    archive or from the backup object store. Signals do not run for the
+    bulk-inserted rows, so derived data (financial rollup, building occupancy
+    counters) is rebuilt and the cached dashboard data is invalidated.
+    """
+
+    def __init__(self, progress=None, batch_size=None, io_threads=None, using=DEFAULT_DB_ALIAS):
+        """
+        Args:
+            progress: Callable ``(stage, done, total)``; stage is 'database'
+                (total None) or 'media'
+            batch_size: Rows per bulk insert
+            io_threads: Threads copying media files
+        """
+        self.progress = progress or (lambda stage, done, total: None)
+        self.batch_size = batch_size or getattr(settings, 'RESTORE_BATCH_SIZE', 2000)
+        self.io_threads = io_threads or getattr(settings, 'RESTORE_IO_THREADS', 8)
+        self.using = using
+        self._natural_keys = {}
+
+    # --- Database ---
+
+    def _resolve_natural_key(self, model, value):
+        key = (model, tuple(value))
+        if key not in self._natural_keys:
+            manager = model._default_manager.db_manager(self.using)
+            self._natural_keys[key] = manager.get_by_natural_key(*value).pk
+        return self._natural_keys[key]
+
+    def _resolve_foreign_keys(self, model, fields):
+        """Replace natural-key foreign keys by primary keys, looking each key up once"""
+        for name, value in fields.items():
+            if not isinstance(value, list) or not value:
+                continue
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if not field.many_to_one and not field.one_to_one:
+                continue
+            related = field.remote_field.model
+            if hasattr(related._default_manager, 'get_by_natural_key'):
+                try:
+                    fields[name] = self._resolve_natural_key(related, value)
+                except related.DoesNotExist:
+                    pass  # left for the deserializer's forward-reference handling
+
+    def _flush(self, model, records, deferred):
+        """Insert one batch of serialized records of a model"""
+        for record in records:
+            self._resolve_foreign_keys(model, record.get('fields', {}))
+        objects = list(PythonDeserializer(
+            records, using=self.using, ignorenonexistent=True, handle_forward_references=True,
+        ))
+
+        bulk = []
+        for obj in objects:
+            if obj.object.pk is None or obj.deferred_fields or model._meta.parents:
+                obj.save(using=self.using)  # natural primary key, forward reference or multi-table model
+                if obj.deferred_fields:
+                    deferred.append(obj)
+            else:
+                bulk.append(obj)
+        if not bulk:
+            return len(objects)
+
+        meta = model._meta
+        update_fields = [field.name for field in meta.concrete_fields if not field.primary_key]
+        features = connections[self.using].features
+        if update_fields and features.supports_update_conflicts:
+            options = {'update_conflicts': True, 'update_fields': update_fields}
+            if features.supports_update_conflicts_with_target:
+                options['unique_fields'] = [meta.pk.name]
+        else:
+            options = {'ignore_conflicts': True}
+        model._base_manager.using(self.using).bulk_create(
+            [obj.object for obj in bulk], batch_size=self.batch_size, **options,
+        )
+
+        for field in meta.many_to_many:
+            rows = [(obj.object.pk, pk) for obj in bulk for pk in (obj.m2m_data or {}).get(field.name, [])]
+            if not rows and not any(field.name in (obj.m2m_data or {}) for obj in bulk):
+                continue
+            through = field.remote_field.through
+            source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+            through._base_manager.using(self.using).filter(
+                **{f"{source}__in": [obj.object.pk for obj in bulk]}
+            ).delete()
+            through._base_manager.using(self.using).bulk_create(
+                [through(**{f"{source}_id": pk, f"{target}_id": related_pk}) for pk, related_pk in rows],
+                batch_size=self.batch_size, ignore_conflicts=True,
+            )
+        return len(objects)
+
+    def restore_database(self, fp):
+        """
+        Restore a ``dumpdata`` JSON stream
+
+        Args:
+            fp: Binary file object positioned at the start of the JSON array
+
+        Returns:
+            int: Number of restored objects
+        """
+        connection = connections[self.using]
+        restored = 0
+        models = set()
+        deferred = []
+        with transaction.atomic(using=self.using):
+            with connection.constraint_checks_disabled():
+                model, records = None, []
+                for record in iter_json_array(fp):
+                    try:
+                        record_model = apps.get_model(record['model'])
+                    except (LookupError, KeyError) as e:
+                        raise base.DeserializationError(f"Invalid model in backup: {record.get('model')}") from e
+                    if records and (record_model is not model or len(records) >= self.batch_size):
+                        restored += self._flush(model, records, deferred)
+                        records = []
+                        self.progress('database', restored, None)
+                    model = record_model
+                    models.add(model)
+                    records.append(record)
+                if records:
+                    restored += self._flush(model, records, deferred)
+                    self.progress('database', restored, None)
+                for obj in deferred:
+                    obj.save_deferred_fields(using=self.using)
+            connection.check_constraints(table_names=[model._meta.db_table for model in models])
+
+            sequence_sql = connection.ops.sequence_reset_sql(no_style(), list(models))
+            if sequence_sql:
+                with connection.cursor() as cursor:
+                    for sql in sequence_sql:
+                        cursor.execute(sql)
+        return restored
+
+    # --- Media ---
+
+    def _media_destination(self, media_root, rel_path):
+        destination = os.path.realpath(os.path.join(media_root, rel_path))
+        if os.path.commonpath([destination, os.path.realpath(media_root)]) != os.path.realpath(media_root):
+            raise ValueError(f"Unsafe media path in backup: {rel_path}")
+        return destination
+
+    def restore_media(self, path, manifest=None):
+        """
+        Copy the media files of a backup into MEDIA_ROOT
+
+        Args:
+            path: Backup archive
+            manifest: Its manifest (object store files), or None
+
+        Returns:
+            int: Number of copied files
+        """
+        media_root = getattr(settings, 'MEDIA_ROOT', None)
+        if not media_root:
+            return 0
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                name for name in archive.namelist()
+                if name.startswith('media/') and not name.endswith('/')
+            ]
+        tasks = [('archive', name, self._media_destination(media_root, name[len('media/'):])) for name in members]
+        if manifest and not manifest.get('portable'):
+            tasks += [
+                ('object', BackupService.object_path(digest), self._media_destination(media_root, rel_path))
+                for rel_path, digest in manifest['media'].items()
+            ]
+        if not tasks:
+            return 0
+
+        local = threading.local()
+
+        def copy(task):
+            source_type, source, destination = task
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            if source_type == 'object':
+                shutil.copyfile(source, destination)
+                return
+            if not hasattr(local, 'archive'):
+                local.archive = zipfile.ZipFile(path)  # ZipFile handles are not shared between threads
+            with local.archive.open(source) as src, open(destination, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+        copied = 0
+        with ThreadPoolExecutor(max_workers=self.io_threads) as pool:
+            for _result in pool.map(copy, tasks):
+                copied += 1
+                if copied % 100 == 0 or copied == len(tasks):
+                    self.progress('media', copied, len(tasks))
+        return copied
+
+    # --- Entry point ---
+
+    def restore(self, path):
+        """
+        Restore the database and media files of a backup archive
+
+        Returns:
+            dict: objects, media_files and seconds
+        """
+        started = time.monotonic()
+        manifest = BackupService.read_manifest(path)
+        objects = 0
+        with zipfile.ZipFile(path) as archive:
+            if BackupService.DB_NAME in archive.namelist():
+                with archive.open(BackupService.DB_NAME) as fp:
+                    objects = self.restore_database(fp)
+        if objects:
+            FinancialRollupService.rebuild()
+            OccupancyService.reconcile()
+            CalendarService.invalidate()
+            CompanyService.invalidate()
+            DashboardSnapshotService.invalidate()
+        media_files = self.restore_media(path, manifest)
+        seconds = time.monotonic() - started
+        logger.info(f"Restored {objects} objects and {media_files} media files from {path} in {seconds:.1f}s")
+        return {'objects': objects, 'media_files': media_files, 'seconds': seconds}
@@ -0,0 +1,135 @@
+"""
+Rollup Service for maintaining the monthly financial rollup table
+"""
+from collections import defaultdict
+from decimal import Decimal
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import Expense, MonthlyFinancialRollup, Payment
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FinancialRollupService:
+    """Service class for monthly income/expense rollup operations"""
+
+    @classmethod
+    def apply(cls, building_id, date, income=0, expenses=0, payment_count=0, expense_count=0, create=True):
+        """
+        Add a delta to the rollup row of (date.year, date.month, building)
+
+        Args:
+            building_id: Building primary key
+            date: Date whose year and month select the rollup row
+            income: Income delta
+            expenses: Expenses delta
+            payment_count: Payments count delta
+            expense_count: Expenses count delta
+            create: Create the row when it does not exist yet. Deletions pass
+                False so a cascading building delete never re-creates rows.
+        """
+        if building_id is None or date is None:
+            return
+        if isinstance(date, str):
+            date = datetime.date.fromisoformat(date)
+        rows = MonthlyFinancialRollup.objects.filter(year=date.year, month=date.month, building_id=building_id)
+        changes = {
+            'income': F('income') + income,
+            'expenses': F('expenses') + expenses,
+            'payment_count': F('payment_count') + payment_count,
+            'expense_count': F('expense_count') + expense_count,
+        }
+        if rows.update(**changes) or not create:
+            return
+        try:
+            with transaction.atomic():
+                MonthlyFinancialRollup.objects.create(
+                    year=date.year, month=date.month, building_id=building_id,
+                    income=income, expenses=expenses,
+                    payment_count=payment_count, expense_count=expense_count,
+                )
+        except IntegrityError:
+            # Another writer created the row in the meantime
+            rows.update(**changes)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Rebuild the whole rollup table from the Payment and Expense tables
+
+        Returns:
+            int: Number of rollup rows written
+        """
+        buckets = defaultdict(lambda: {
+            'income': Decimal('0'), 'expenses': Decimal('0'), 'payment_count': 0, 'expense_count': 0,
+        })
+        payments = (
+            Payment.objects.order_by()
+            .annotate(year=ExtractYear('payment_date'), month=ExtractMonth('payment_date'))
+            .values('year', 'month', 'lease__unit__building_id')
+            .annotate(total=Sum('amount'), count=Count('id'))
+        )
+        for row in payments:
+            bucket = buckets[(row['year'], row['month'], row['lease__unit__building_id'])]
+            bucket['income'] = row['total']
+            bucket['payment_count'] = row['count']
+        expenses = (
+            Expense.objects.order_by()
+            .annotate(year=ExtractYear('expense_date'), month=ExtractMonth('expense_date'))
+            .values('year', 'month', 'building_id')
+            .annotate(total=Sum('amount'), count=Count('id'))
+        )
+        for row in expenses:
+            bucket = buckets[(row['year'], row['month'], row['building_id'])]
+            bucket['expenses'] = row['total']
+            bucket['expense_count'] = row['count']
+
+        with transaction.atomic():
+            MonthlyFinancialRollup.objects.all().delete()
+            MonthlyFinancialRollup.objects.bulk_create([
+                MonthlyFinancialRollup(year=year, month=month, building_id=building_id, **values)
+                for (year, month, building_id), values in buckets.items()
+            ], batch_size=1000)
+        logger.info(f"Rebuilt financial rollup with {len(buckets)} rows")
+        return len(buckets)
+
+    @classmethod
+    def get_monthly_totals(cls, start, end):
+        """
+        Get income and expenses per month for all buildings
+
+        Args:
+            start: Any date in the first month of the range
+            end: Any date in the last month of the range
+
+        Returns:
+            dict: Maps (year, month) to a dict with 'income' and 'expenses'
+        """
+        rows = (
+            MonthlyFinancialRollup.objects
+            .filter(Q(year__gt=start.year) | Q(year=start.year, month__gte=start.month))
+            .filter(Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month))
+            .order_by()
+            .values('year', 'month')
+            .annotate(income=Sum('income'), expenses=Sum('expenses'))
+        )
+        return {(row['year'], row['month']): row for row in rows}
+
+    @classmethod
+    def get_totals(cls, year, month=None):
+        """
+        Get the total income and expenses of a year or of a single month
+
+        Returns:
+            tuple: (total_income, total_expenses)
+        """
+        rows = MonthlyFinancialRollup.objects.filter(year=year)
+        if month is not None:
+            rows = rows.filter(month=month)
+        totals = rows.aggregate(income=Sum('income'), expenses=Sum('expenses'))
+        return totals['income'] or 0, totals['expenses'] or 0
@@ -1,9 +1,19 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
-from .models import Tenant, MaintenanceRequest, Lease, Notification, Building, Expense
-from .utils import auto_translate_to_english
+from .models import Tenant, MaintenanceRequest, Lease, Notification, Building, Expense, Payment, Unit, Company
+from .lease_lifecycle_service import lease_event
+from .lease_status_service import LeaseStatusService
+from .notification_service import NotificationService
+from .occupancy_service import OccupancyService
+from .calendar_service import CalendarService
+from .company_service import CompanyService
+from .snapshot_service import DashboardSnapshotService
+from .rollup_service import FinancialRollupService
+from .pdf_cache_service import PDFCacheService
+from .translation_service import TranslationService
 
 @receiver(post_save, sender=Tenant)
 def create_tenant_user_account(sender, instance, created, **kwargs):
@@ -20,51 +30,218 @@ def create_tenant_user_account(sender, instance, created, **kwargs):
         instance.user = user
         instance.save()
 
+@receiver(pre_save, sender=MaintenanceRequest)
+def remember_maintenance_status(sender, instance, raw=False, **kwargs):
+    instance._previous_status = None
+    if instance.pk and not raw:
+        instance._previous_status = MaintenanceRequest.objects.filter(pk=instance.pk).values_list(
+            'status', flat=True
+        ).first()
+
+
 @receiver(post_save, sender=MaintenanceRequest)
 def maintenance_request_notification(sender, instance, created, **kwargs):
     if created:
         message = _("'تم تقديم طلب صيانة جديد بعنوان {} من قبل المستأجر {}'").format(instance.title, instance.lease.tenant.name)
-        staff_users = User.objects.filter(is_staff=True)
-        for user in staff_users:
-            Notification.objects.create(user=user, message=message, related_object=instance)
+        NotificationService.fan_out(
+            NotificationService.staff_user_ids(), message, kind='maintenance_created', related_object=instance,
+        )
     else:
-        try:
-            old_instance = MaintenanceRequest.objects.get(pk=instance.pk)
-            if old_instance.status != instance.status:
-                message = _("'تم تحديث حالة طلب الصيانة {} إلى {}'").format(instance.title, instance.get_status_display())
-                if instance.lease.tenant.user:
-                    Notification.objects.create(user=instance.lease.tenant.user, message=message, related_object=instance)
-        except MaintenanceRequest.DoesNotExist:
-            pass
+        previous_status = instance.__dict__.get('_previous_status')
+        if previous_status and previous_status != instance.status and instance.lease.tenant.user_id:
+            message = _("'تم تحديث حالة طلب الصيانة {} إلى {}'").format(instance.title, instance.get_status_display())
+            NotificationService.fan_out(
+                [instance.lease.tenant.user_id], message,
+                kind='maintenance_status', related_object=instance, dedup=False,  # every change is news
+            )
 
-@receiver(post_save, sender=Lease)
-def lease_status_notification(sender, instance, **kwargs):
-    if instance.status == 'expiring_soon' and instance.tenant.user:
-        message = _("'عقد الإيجار الخاص بك رقم {} سينتهي قريب في تاريخ {}'").format(instance.contract_number, instance.end_date.strftime('%Y-%m-%d'))
-        if not Notification.objects.filter(user=instance.tenant.user, message=message).exists():
-            Notification.objects.create(user=instance.tenant.user, message=message, related_object=instance)
+@receiver(lease_event)
+def lease_status_notification(sender, lease, event, **kwargs):
+    if event == 'expiring_soon' and lease.tenant.user_id:
+        NotificationService.fan_out(
+            [lease.tenant.user_id], LeaseStatusService.expiring_soon_message(lease),
+            kind='lease_expiring', related_object=lease, period=lease.end_date.isoformat(),
+        )
 
+@receiver(post_save, sender=Notification)
+def update_unread_count(sender, instance, created, raw=False, **kwargs):
+    # NotificationService.create_many/mark_read adjust the counts themselves (no signals)
+    if raw:
+        return
+    if created:
+        if not instance.read:
+            NotificationService.adjust_unread_counts({instance.user_id: 1})
+    else:
+        NotificationService.invalidate_unread_count(instance.user_id)
 
-@receiver(pre_save, sender=Building)
-def auto_translate_building(sender, instance, **kwargs):
-    if instance.name_ar and not instance.name_en:
-        instance.name_en = auto_translate_to_english(instance.name_ar)
-    if instance.address_ar and not instance.address_en:
-        instance.address_en = auto_translate_to_english(instance.address_ar)
+@receiver(post_delete, sender=Notification)
+def forget_unread_count(sender, instance, **kwargs):
+    NotificationService.invalidate_unread_count(instance.user_id)
 
+@receiver(lease_event)
+def queue_lease_documents(sender, lease, event, **kwargs):
+    # إنشاء فاتورة أولية للعقد الجديد واستمارات الإلغاء والتجديد (في الخلفية)
+    if event == 'created':
+        lease._generate_initial_invoice()
+    elif event == 'cancelled':
+        lease._generate_cancellation_notice()
+    elif event == 'renewed':
+        lease._generate_renewal_notice()
 
+
+@receiver(pre_save, sender=Building)
 @receiver(pre_save, sender=Tenant)
-def auto_translate_tenant(sender, instance, **kwargs):
-    if instance.name and not hasattr(instance, 'name_en'):
-        instance.name_en = auto_translate_to_english(instance.name)
-    elif hasattr(instance, 'name_ar') and instance.name_ar and not instance.name_en:
-        instance.name_en = auto_translate_to_english(instance.name_ar)
-    
-    if hasattr(instance, 'authorized_signatory_ar') and instance.authorized_signatory_ar and not instance.authorized_signatory_en:
-        instance.authorized_signatory_en = auto_translate_to_english(instance.authorized_signatory_ar)
+@receiver(pre_save, sender=Expense)
+def prepare_translations(sender, instance, raw=False, **kwargs):
+    # الترجمة التلقائية للحقول الإنجليزية دون انتظار خدمة الترجمة
+    if not raw:
+        TranslationService.prepare(instance)
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=Expense)
+def schedule_translations(sender, instance, raw=False, **kwargs):
+    if not raw:
+        TranslationService.schedule(instance)
+
+
+# ==== Monthly financial rollup maintenance ====
+def _payment_building_id(payment):
+    return Lease.objects.filter(pk=payment.lease_id).values_list('unit__building_id', flat=True).first()
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_rollup_bucket(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = Payment.objects.filter(pk=instance.pk).values_list(
+            'lease__unit__building_id', 'payment_date', 'amount'
+        ).first()
+
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        building_id, payment_date, amount = previous
+        FinancialRollupService.apply(building_id, payment_date, income=-amount, payment_count=-1, create=False)
+    FinancialRollupService.apply(_payment_building_id(instance), instance.payment_date, income=instance.amount, payment_count=1)
+
+
+@receiver(pre_delete, sender=Payment)
+def remember_deleted_payment_building(sender, instance, **kwargs):
+    instance._rollup_building_id = _payment_building_id(instance)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_rollup(sender, instance, **kwargs):
+    FinancialRollupService.apply(
+        getattr(instance, '_rollup_building_id', None), instance.payment_date,
+        income=-instance.amount, payment_count=-1, create=False,
+    )
 
 
 @receiver(pre_save, sender=Expense)
-def auto_translate_expense(sender, instance, **kwargs):
-    if instance.description_ar and not instance.description_en:
-        instance.description_en = auto_translate_to_english(instance.description_ar)
\ No newline at end of file
+def remember_expense_rollup_bucket(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = Expense.objects.filter(pk=instance.pk).values_list(
+            'building_id', 'expense_date', 'amount'
+        ).first()
+
+
+@receiver(post_save, sender=Expense)
+def update_expense_rollup(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        building_id, expense_date, amount = previous
+        FinancialRollupService.apply(building_id, expense_date, expenses=-amount, expense_count=-1, create=False)
+    FinancialRollupService.apply(instance.building_id, instance.expense_date, expenses=instance.amount, expense_count=1)
+
+
+@receiver(post_delete, sender=Expense)
+def remove_expense_from_rollup(sender, instance, **kwargs):
+    FinancialRollupService.apply(
+        instance.building_id, instance.expense_date,
+        expenses=-instance.amount, expense_count=-1, create=False,
+    )
+
+
+# ==== Building occupancy counters ====
+@receiver(pre_save, sender=Unit)
+def remember_unit_occupancy(sender, instance, raw=False, **kwargs):
+    instance._occupancy_previous = None
+    if instance.pk and not raw:
+        # Locked until Unit.save's transaction commits: a concurrent save of the same unit reads
+        # the state this one writes, so a change is counted once
+        units = Unit.objects.filter(pk=instance.pk)
+        if transaction.get_connection().in_atomic_block:
+            units = units.select_for_update()
+        instance._occupancy_previous = units.values_list('building_id', 'is_available').first()
+
+
+@receiver(post_save, sender=Unit)
+def update_building_occupancy(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_occupancy_previous', None)
+    if previous == (instance.building_id, instance.is_available):
+        return
+    if previous:
+        building_id, is_available = previous
+        OccupancyService.apply(building_id, total=-1, occupied=0 if is_available else -1)
+    OccupancyService.apply(instance.building_id, total=1, occupied=0 if instance.is_available else 1)
+
+
+@receiver(post_delete, sender=Unit)
+def remove_unit_from_occupancy(sender, instance, **kwargs):
+    OccupancyService.apply(instance.building_id, total=-1, occupied=0 if instance.is_available else -1)
+
+
+# ==== Cached receipt/statement PDFs ====
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_payment_pdf_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        PDFCacheService.invalidate(PDFCacheService.lease_scope(instance.lease_id))
+
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def invalidate_lease_pdf_cache(sender, instance, raw=False, **kwargs):
+    if not raw:
+        PDFCacheService.invalidate(PDFCacheService.lease_scope(instance.pk))
+
+
+# ==== Cached calendar feed ====
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def invalidate_calendar_feed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        CalendarService.invalidate()
+
+
+# ==== Cached dashboard snapshot ====
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def invalidate_dashboard_snapshot(sender, instance, raw=False, **kwargs):
+    if not raw:
+        DashboardSnapshotService.invalidate()
+
+
+# ==== Cached company profile ====
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_profile(sender, instance, **kwargs):
+    CompanyService.invalidate()
@@ -0,0 +1,236 @@
+"""
+SMS Outbox Service for queuing text messages and delivering them from a worker
+"""
+import datetime
+import os
+import socket
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Case, Count, DurationField, ExpressionWrapper, F, Min, Q, TextField, Value, When
+from django.utils import timezone
+
+from .models import SMSMessage
+from .sms_service import sms_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SMSOutboxService:
+    """
+    Service class for the SMS outbox
+
+    Requests only insert a row; the ``run_sms_worker`` command claims queued
+    messages in batches (a conditional UPDATE, so several workers can share
+    the table), sends them through the process-wide ``sms_service`` whose
+    provider clients are reused, and records the results with one bulk
+    update per batch. Failed sends are retried with exponential backoff, a
+    number gets at most SMS_PER_NUMBER_LIMIT messages per
+    SMS_PER_NUMBER_WINDOW seconds, and messages with an expiry (OTP codes)
+    are dropped once it passes. OTP bodies are blanked after delivery and,
+    for messages never delivered, by the expiry sweep of every claim, so a
+    code stays readable in the table for at most its validity period.
+    """
+
+    MAX_ATTEMPTS = getattr(settings, 'SMS_MAX_ATTEMPTS', 5)
+    RETRY_DELAY = getattr(settings, 'SMS_RETRY_DELAY', 5)  # seconds, doubled on each retry
+    LOCK_TIMEOUT = getattr(settings, 'SMS_LOCK_TIMEOUT', 120)  # seconds
+    BATCH_SIZE = getattr(settings, 'SMS_BATCH_SIZE', 50)
+    PER_NUMBER_LIMIT = getattr(settings, 'SMS_PER_NUMBER_LIMIT', 5)
+    PER_NUMBER_WINDOW = getattr(settings, 'SMS_PER_NUMBER_WINDOW', 300)  # seconds
+    REDACTED_PURPOSES = ('otp',)
+
+    RESULT_FIELDS = [
+        'body', 'status', 'attempts', 'run_after', 'locked_by', 'locked_at',
+        'provider', 'provider_message_id', 'last_error', 'sent_at',
+    ]
+
+    @classmethod
+    def enqueue(cls, phone_number, body, purpose='notification', expires_in=None):
+        """
+        Queue a text message
+
+        With SMS_QUEUE_EAGER the message is sent once the current transaction
+        commits instead of by a worker.
+
+        Args:
+            phone_number: Recipient's phone number
+            body: Message text
+            purpose: 'otp' bodies are blanked after delivery
+            expires_in: Seconds after which the message is no longer worth sending
+
+        Returns:
+            SMSMessage: The queued message
+        """
+        now = timezone.now()
+        message = SMSMessage.objects.create(
+            phone_number=phone_number, body=body, purpose=purpose, run_after=now,
+            expires_at=now + datetime.timedelta(seconds=expires_in) if expires_in else None,
+        )
+        if getattr(settings, 'SMS_QUEUE_EAGER', False):
+            message.attempts = 1
+            transaction.on_commit(lambda: cls.process_batch([message]))
+        return message
+
+    @classmethod
+    def worker_id(cls):
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def claim_batch(cls, worker_id=None, size=None):
+        """
+        Claim up to ``size`` runnable messages
+
+        Returns:
+            list: The claimed SMSMessage instances
+        """
+        worker_id = worker_id or cls.worker_id()
+        now = timezone.now()
+        cls.release_stale_messages(now)
+        cls.expire_messages(now)
+        ids = list(
+            SMSMessage.objects.filter(status='queued', run_after__lte=now)
+            .order_by('run_after').values_list('pk', flat=True)[:size or cls.BATCH_SIZE]
+        )
+        if not ids:
+            return []
+        SMSMessage.objects.filter(pk__in=ids, status='queued').update(
+            status='sending', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        return list(SMSMessage.objects.filter(pk__in=ids, status='sending', locked_by=worker_id, locked_at=now))
+
+    @classmethod
+    def release_stale_messages(cls, now=None):
+        """Put back in the queue the messages of workers that died while sending them"""
+        now = now or timezone.now()
+        stale_before = now - datetime.timedelta(seconds=cls.LOCK_TIMEOUT)
+        return SMSMessage.objects.filter(status='sending', locked_at__lt=stale_before).update(
+            status='queued', locked_by='', locked_at=None,
+        )
+
+    @classmethod
+    def expire_messages(cls, now=None):
+        """Fail the queued messages whose expiry has passed, blanking OTP bodies"""
+        now = now or timezone.now()
+        return SMSMessage.objects.filter(status='queued', expires_at__lte=now).update(
+            status='failed', last_error='expired',
+            body=Case(
+                When(purpose__in=cls.REDACTED_PURPOSES, then=Value('')), default=F('body'), output_field=TextField(),
+            ),
+        )
+
+    @classmethod
+    def _sent_counts(cls, numbers, now):
+        since = now - datetime.timedelta(seconds=cls.PER_NUMBER_WINDOW)
+        return Counter(dict(
+            SMSMessage.objects.filter(phone_number__in=numbers, status='sent', sent_at__gte=since)
+            .order_by().values('phone_number').annotate(count=Count('pk')).values_list('phone_number', 'count')
+        ))
+
+    @classmethod
+    def process_batch(cls, messages):
+        """
+        Send claimed messages and record the results
+
+        Returns:
+            int: Number of messages sent
+        """
+        now = timezone.now()
+        sent_counts = cls._sent_counts({message.phone_number for message in messages}, now)
+        to_send = []
+        for message in messages:
+            message.locked_by, message.locked_at = '', None
+            if message.expires_at and message.expires_at <= now:
+                message.status, message.last_error = 'failed', 'expired'
+            elif sent_counts[message.phone_number] >= cls.PER_NUMBER_LIMIT:
+                # Throttled: not counted as an attempt
+                message.status, message.attempts = 'queued', max(message.attempts - 1, 0)
+                message.run_after = now + datetime.timedelta(seconds=cls.PER_NUMBER_WINDOW)
+            else:
+                sent_counts[message.phone_number] += 1
+                to_send.append(message)
+
+        provider = sms_service.provider
+        results = sms_service.deliver_batch([(message.phone_number, message.body) for message in to_send])
+        sent_at = timezone.now()
+        sent = 0
+        errors = []
+        for message, result in zip(to_send, results):
+            message.provider = provider
+            if isinstance(result, Exception):
+                errors.append(result)
+                message.last_error = str(result)[:2000]
+                if message.attempts >= cls.MAX_ATTEMPTS:
+                    message.status = 'failed'
+                else:
+                    delay = cls.RETRY_DELAY * 2 ** max(message.attempts - 1, 0)
+                    message.status = 'queued'
+                    message.run_after = sent_at + datetime.timedelta(seconds=delay)
+            else:
+                message.status, message.sent_at = 'sent', sent_at
+                message.provider_message_id, message.last_error = str(result or '')[:100], ''
+                sent += 1
+
+        if errors:
+            logger.warning(f"{len(errors)} of {len(to_send)} SMS failed, first error: {errors[0]}")
+
+        for message in messages:
+            if message.purpose in cls.REDACTED_PURPOSES and message.status in ('sent', 'failed'):
+                message.body = ''
+        SMSMessage.objects.bulk_update(messages, cls.RESULT_FIELDS)
+        return sent
+
+    @classmethod
+    def run_pending(cls, limit=None, worker_id=None, batch_size=None):
+        """
+        Send runnable messages in the current process until the queue is empty
+
+        Returns:
+            int: Number of messages sent
+        """
+        worker_id = worker_id or cls.worker_id()
+        sent = processed = 0
+        while limit is None or processed < limit:
+            size = batch_size or cls.BATCH_SIZE
+            batch = cls.claim_batch(worker_id, size if limit is None else min(size, limit - processed))
+            if not batch:
+                break
+            sent += cls.process_batch(batch)
+            processed += len(batch)
+        return sent
+
+    @classmethod
+    def get_metrics(cls, since=None):
+        """
+        Get delivery metrics
+
+        Args:
+            since: Start of the period of the delivery counters (default: last hour)
+
+        Returns:
+            dict: Queue depth per status, sent/failed/retried counts and average
+            delivery latency over the period, and age of the oldest queued message
+        """
+        now = timezone.now()
+        since = since or now - datetime.timedelta(hours=1)
+        by_status = dict(SMSMessage.objects.order_by().values('status').annotate(count=Count('pk')).values_list('status', 'count'))
+        period = SMSMessage.objects.filter(created_at__gte=since).aggregate(
+            sent=Count('pk', filter=Q(status='sent')),
+            failed=Count('pk', filter=Q(status='failed')),
+            retried=Count('pk', filter=Q(attempts__gt=1)),
+            latency=Avg(
+                ExpressionWrapper(F('sent_at') - F('created_at'), output_field=DurationField()),
+                filter=Q(status='sent'),
+            ),
+        )
+        oldest = SMSMessage.objects.filter(status='queued').aggregate(oldest=Min('created_at'))['oldest']
+        return {
+            'by_status': {status: by_status.get(status, 0) for status, _label in SMSMessage.STATUS_CHOICES},
+            'sent': period['sent'],
+            'failed': period['failed'],
+            'retried': period['retried'],
+            'average_latency': period['latency'].total_seconds() if period['latency'] is not None else None,
+            'oldest_queued_age': (now - oldest).total_seconds() if oldest else None,
+        }
@@ -3,46 +3,104 @@ SMS Service for sending OTP codes
 This is a placeholder implementation that can be extended with actual SMS providers
 """
 import logging
+import random
+from collections import deque
+import time
+import uuid
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+class SMSDeliveryError(Exception):
+    """Raised when a provider rejects or cannot send a message"""
+
+
 class SMSService:
     """
     SMS Service for sending OTP codes
     Supports multiple SMS providers (Twilio, AWS SNS, etc.)
+
+    Provider clients are created once per process and reused for every
+    message. Messages are normally queued in the SMS outbox
+    (``sms_outbox_service.py``) and delivered in batches by the
+    ``run_sms_worker`` command rather than sent from a request.
     """
-    
+
     def __init__(self):
-        self.provider = getattr(settings, 'SMS_PROVIDER', 'console')  # Default to console for development
-    
+        self._clients = {}
+        self.fake_outbox = deque(maxlen=10000)  # last messages "sent" by the fake provider
+
+    @property
+    def provider(self):
+        # Read on use so settings overrides apply to the global instance
+        return getattr(settings, 'SMS_PROVIDER', 'console')  # Default to console for development
+
     def send_sms(self, phone_number, message):
         """
         Send SMS message
-        
+
         Args:
             phone_number: Recipient's phone number
             message: SMS message content
-            
+
         Returns:
             bool: True if SMS sent successfully, False otherwise
         """
         try:
-            if self.provider == 'twilio':
-                return self._send_via_twilio(phone_number, message)
-            elif self.provider == 'aws_sns':
-                return self._send_via_aws_sns(phone_number, message)
-            elif self.provider == 'console':
-                return self._send_via_console(phone_number, message)
-            else:
-                logger.error(f"Unknown SMS provider: {self.provider}")
-                return False
-                
+            self.deliver(phone_number, message)
+            return True
         except Exception as e:
             logger.error(f"Failed to send SMS to {phone_number}: {str(e)}")
             return False
-    
+
+    def deliver(self, phone_number, message):
+        """
+        Send one SMS message through the configured provider
+
+        Returns:
+            str: Provider message id
+
+        Raises:
+            SMSDeliveryError: The provider is unknown, not configured or failed
+        """
+        if self.provider == 'twilio':
+            return self._send_via_twilio(phone_number, message)
+        elif self.provider == 'aws_sns':
+            return self._send_via_aws_sns(phone_number, message)
+        elif self.provider == 'console':
+            return self._send_via_console(phone_number, message)
+        elif self.provider == 'fake':
+            return self._send_via_fake([(phone_number, message)])[0]
+        raise SMSDeliveryError(f"Unknown SMS provider: {self.provider}")
+
+    def deliver_batch(self, messages):
+        """
+        Send several messages, in one provider call when the provider supports it
+
+        Twilio and SNS have no bulk endpoint for distinct messages to
+        individual numbers, so they send one request per message on the
+        reused client.
+
+        Args:
+            messages: List of (phone_number, message) tuples
+
+        Returns:
+            list: Provider message id or exception, per message
+        """
+        if self.provider == 'fake':
+            try:
+                return self._send_via_fake(messages)
+            except SMSDeliveryError as e:
+                return [e] * len(messages)
+        results = []
+        for phone_number, message in messages:
+            try:
+                results.append(self.deliver(phone_number, message))
+            except Exception as e:
+                results.append(e)
+        return results
+
     def _send_via_console(self, phone_number, message):
         """
         Send SMS via console (for development/testing)
@@ -52,85 +110,98 @@ class SMSService:
         print(f"SMS TO: {phone_number}")
         print(f"MESSAGE: {message}")
         print(f"{'='*50}\n")
-        return True
-    
+        return ''
+
+    def _send_via_fake(self, messages):
+        """
+        Send SMS via an in-memory fake provider (for offline throughput tests)
+
+        Optional settings:
+        - SMS_FAKE_LATENCY: Seconds each provider call takes
+        - SMS_FAKE_FAILURE_RATE: Fraction of calls that fail (0 to 1)
+        """
+        time.sleep(getattr(settings, 'SMS_FAKE_LATENCY', 0))
+        if random.random() < getattr(settings, 'SMS_FAKE_FAILURE_RATE', 0):
+            raise SMSDeliveryError("Fake provider failure")
+        ids = []
+        for phone_number, message in messages:
+            ids.append(uuid.uuid4().hex)
+            self.fake_outbox.append((phone_number, message))
+        return ids
+
+    def _get_twilio_client(self):
+        if 'twilio' not in self._clients:
+            try:
+                from twilio.rest import Client
+            except ImportError:
+                raise SMSDeliveryError("Twilio library not installed. Install with: pip install twilio")
+
+            account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
+            auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
+
+            if not all([account_sid, auth_token, getattr(settings, 'TWILIO_PHONE_NUMBER', None)]):
+                raise SMSDeliveryError("Twilio credentials not configured")
+
+            self._clients['twilio'] = Client(account_sid, auth_token)
+        return self._clients['twilio']
+
     def _send_via_twilio(self, phone_number, message):
         """
         Send SMS via Twilio
-        
+
         Required settings:
         - TWILIO_ACCOUNT_SID
         - TWILIO_AUTH_TOKEN
         - TWILIO_PHONE_NUMBER
         """
+        client = self._get_twilio_client()
         try:
-            from twilio.rest import Client
-            
-            account_sid = getattr(settings, 'TWILIO_ACCOUNT_SID', None)
-            auth_token = getattr(settings, 'TWILIO_AUTH_TOKEN', None)
-            from_number = getattr(settings, 'TWILIO_PHONE_NUMBER', None)
-            
-            if not all([account_sid, auth_token, from_number]):
-                logger.error("Twilio credentials not configured")
-                return False
-            
-            client = Client(account_sid, auth_token)
-            
             message = client.messages.create(
                 body=message,
-                from_=from_number,
+                from_=settings.TWILIO_PHONE_NUMBER,
                 to=phone_number
             )
-            
-            logger.info(f"Twilio SMS sent successfully. SID: {message.sid}")
-            return True
-            
-        except ImportError:
-            logger.error("Twilio library not installed. Install with: pip install twilio")
-            return False
         except Exception as e:
-            logger.error(f"Twilio SMS failed: {str(e)}")
-            return False
-    
+            raise SMSDeliveryError(f"Twilio SMS failed: {str(e)}") from e
+
+        logger.info(f"Twilio SMS sent successfully. SID: {message.sid}")
+        return message.sid
+
+    def _get_sns_client(self):
+        if 'aws_sns' not in self._clients:
+            try:
+                import boto3
+            except ImportError:
+                raise SMSDeliveryError("boto3 library not installed. Install with: pip install boto3")
+
+            self._clients['aws_sns'] = boto3.client(
+                'sns',
+                region_name=getattr(settings, 'AWS_SNS_REGION', 'us-east-1'),
+                aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
+                aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None)
+            )
+        return self._clients['aws_sns']
+
     def _send_via_aws_sns(self, phone_number, message):
         """
         Send SMS via AWS SNS
-        
+
         Required settings:
         - AWS_ACCESS_KEY_ID
         - AWS_SECRET_ACCESS_KEY
         - AWS_SNS_REGION
         """
+        sns_client = self._get_sns_client()
         try:
-            import boto3
-            from botocore.exceptions import ClientError
-            
-            region = getattr(settings, 'AWS_SNS_REGION', 'us-east-1')
-            
-            sns_client = boto3.client(
-                'sns',
-                region_name=region,
-                aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', None),
-                aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', None)
-            )
-            
             response = sns_client.publish(
                 PhoneNumber=phone_number,
                 Message=message
             )
-            
-            logger.info(f"AWS SNS SMS sent successfully. MessageId: {response['MessageId']}")
-            return True
-            
-        except ImportError:
-            logger.error("boto3 library not installed. Install with: pip install boto3")
-            return False
-        except ClientError as e:
-            logger.error(f"AWS SNS SMS failed: {str(e)}")
-            return False
         except Exception as e:
-            logger.error(f"AWS SNS SMS failed: {str(e)}")
-            return False
+            raise SMSDeliveryError(f"AWS SNS SMS failed: {str(e)}") from e
+
+        logger.info(f"AWS SNS SMS sent successfully. MessageId: {response['MessageId']}")
+        return response['MessageId']
 
 
 # Global SMS service instance
@@ -139,19 +210,24 @@ sms_service = SMSService()
 
 def send_otp_sms(phone_number, otp_code, language='ar'):
     """
-    Send OTP SMS message
-    
+    Queue an OTP SMS message in the outbox
+
     Args:
         phone_number: Recipient's phone number
         otp_code: OTP code to send
         language: Language for the message ('ar' or 'en')
-        
+
     Returns:
-        bool: True if SMS sent successfully, False otherwise
+        bool: True if the message was queued (or sent, with SMS_QUEUE_EAGER), False otherwise
     """
+    from .otp_service import OTPService
+    from .sms_outbox_service import SMSOutboxService
+
     if language == 'ar':
-        message = f"رمز التحقق الخاص بك هو: {otp_code}. صالح لمدة 5 دقائق."
+        message = f"رمز التحقق الخاص بك هو: {otp_code}. صالح لمدة {OTPService.OTP_EXPIRY_MINUTES} دقائق."
     else:
-        message = f"Your verification code is: {otp_code}. Valid for 5 minutes."
-    
-    return sms_service.send_sms(phone_number, message)
+        message = f"Your verification code is: {otp_code}. Valid for {OTPService.OTP_EXPIRY_MINUTES} minutes."
+
+    return SMSOutboxService.enqueue(
+        phone_number, message, purpose='otp', expires_in=OTPService.OTP_EXPIRY_MINUTES * 60,
+    ) is not None
@@ -0,0 +1,169 @@
+"""
+Snapshot Service for the cached statistics of the dashboard home page
+"""
+import time
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Lease
+from .occupancy_service import OccupancyService
+from .rollup_service import FinancialRollupService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSnapshotService:
+    """
+    Service class for the dashboard home statistics snapshot
+
+    The statistics shown to every staff user (lease stats cards, 12-month
+    trend, occupancy and expiring leases) are computed once and stored in
+    the cache for DASHBOARD_SNAPSHOT_TTL seconds. Saving or deleting a
+    lease, payment, expense or unit bumps a version number (see
+    ``signals.py``), and a snapshot of an older version or day is stale.
+
+    A request reads the snapshot and the version with one ``get_many``.
+    When the snapshot is stale, one request rebuilds it (under a cache lock)
+    while concurrent requests keep serving the stale copy, so writes never
+    cause a stampede of rebuilds. Hits, stale hits and misses are counted in
+    the cache (``get_counters``).
+    """
+
+    SNAPSHOT_KEY = 'dashboard_snapshot'
+    VERSION_KEY = 'dashboard_snapshot:version'
+    LOCK_KEY = 'dashboard_snapshot:lock'
+    COUNTER_KEYS = {
+        'hits': 'dashboard_snapshot:hits',
+        'stale_hits': 'dashboard_snapshot:stale_hits',
+        'misses': 'dashboard_snapshot:misses',
+    }
+    LOCK_TIMEOUT = 30
+
+    @classmethod
+    def invalidate(cls):
+        """Make the current snapshot stale (called when its source data changes)"""
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, None)
+
+    @classmethod
+    def _count(cls, counter):
+        key = cls.COUNTER_KEYS[counter]
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, None):
+                cache.incr(key)
+
+    @classmethod
+    def get_counters(cls):
+        """
+        Get the hit/miss counters
+
+        Returns:
+            dict: hits, stale_hits and misses
+        """
+        values = cache.get_many(list(cls.COUNTER_KEYS.values()))
+        return {counter: values.get(key, 0) for counter, key in cls.COUNTER_KEYS.items()}
+
+    @classmethod
+    def reset_counters(cls):
+        cache.delete_many(list(cls.COUNTER_KEYS.values()))
+
+    @classmethod
+    def build(cls, today=None):
+        """
+        Compute the statistics
+
+        Returns:
+            dict: stats, trend_chart, occupancy and expiring_leases
+        """
+        today = today or timezone.now()
+
+        # Monthly totals for the trend chart (last 12 months) from the rollup table
+        monthly_totals = FinancialRollupService.get_monthly_totals(today - relativedelta(months=11), today)
+
+        active = Lease.objects.filter(status__in=['active', 'expiring_soon']).aggregate(
+            count=Count('pk'), income=Sum('monthly_rent'),
+        )
+        monthly_expenses = monthly_totals.get((today.year, today.month), {}).get('expenses') or 0
+        expected_income = active['income'] or 0
+        stats = {
+            'active_count': active['count'],
+            'expected_monthly_income': expected_income,
+            'monthly_expenses': monthly_expenses,
+            'net_income': expected_income - monthly_expenses,
+        }
+
+        trend_chart = {'labels': [], 'income_data': [], 'expense_data': []}
+        for i in range(12, 0, -1):
+            date = today - relativedelta(months=i - 1)
+            trend_chart['labels'].append(date.strftime("%b"))
+            month_totals = monthly_totals.get((date.year, date.month), {})
+            trend_chart['income_data'].append(float(month_totals.get('income') or 0))
+            trend_chart['expense_data'].append(float(month_totals.get('expenses') or 0))
+
+        expiring_leases = list(
+            Lease.objects.filter(status='expiring_soon', end_date__gte=today.date())
+            .select_related('tenant').order_by('end_date')[:5]
+        )
+        return {
+            'stats': stats,
+            'trend_chart': trend_chart,
+            'occupancy': OccupancyService.get_totals(),
+            'expiring_leases': expiring_leases,
+        }
+
+    @classmethod
+    def refresh(cls, version=None):
+        """
+        Rebuild and store the snapshot
+
+        Returns:
+            dict: The snapshot
+        """
+        if version is None:
+            version = cache.get_or_set(cls.VERSION_KEY, 1, None)
+        started = time.monotonic()
+        today = timezone.now()
+        snapshot = {'version': version, 'date': today.date(), 'data': cls.build(today)}
+        cache.set(cls.SNAPSHOT_KEY, snapshot, getattr(settings, 'DASHBOARD_SNAPSHOT_TTL', 300))
+        logger.info(f"Dashboard snapshot v{version} built in {(time.monotonic() - started) * 1000:.0f}ms")
+        return snapshot
+
+    @classmethod
+    def get(cls):
+        """
+        Get the dashboard statistics, from the cache when possible
+
+        Returns:
+            dict: See ``build``
+        """
+        values = cache.get_many([cls.SNAPSHOT_KEY, cls.VERSION_KEY])
+        snapshot = values.get(cls.SNAPSHOT_KEY)
+        version = values.get(cls.VERSION_KEY)
+        if version is None:
+            version = cache.get_or_set(cls.VERSION_KEY, 1, None)
+
+        if snapshot and snapshot['version'] == version and snapshot['date'] == timezone.now().date():
+            cls._count('hits')
+            return snapshot['data']
+
+        if cache.add(cls.LOCK_KEY, 1, cls.LOCK_TIMEOUT):
+            try:
+                cls._count('misses')
+                return cls.refresh(version)['data']
+            finally:
+                cache.delete(cls.LOCK_KEY)
+        if snapshot:
+            # Another request is rebuilding it
+            cls._count('stale_hits')
+            return snapshot['data']
+        cls._count('misses')
+        return cls.build()
@@ -1,3 +1,1479 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from openpyxl import load_workbook
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .backup_service import BackupService
+from .calendar_service import CalendarService
+from .company_service import CompanyService
+from .batch_export_service import BatchPDFExportService
+from .document_job_service import DocumentJobService
+from .excel_utils import StreamingExcelExporter
+from .lease_lifecycle_service import lease_event
+from .lease_status_service import LeaseStatusService
+from .ledger_service import LedgerService
+from .occupancy_service import OccupancyService
+from .otp_service import OTPService
+from .pdf_cache_service import PDFCacheService
+from .pdf_renderer import PDFRenderer
+from .notification_service import NotificationService
+from .models import (
+    Building, Unit, Tenant, Lease, Payment, Expense, MonthlyFinancialRollup, MaintenanceRequest, Invoice, InvoiceItem,
+    Company, Document, DocumentJob, Notification, OTP, SMSMessage, TranslationCache, UserProfile,
+)
+from .query_budget import QueryBudgetTestMixin, QueryRecorder, query_signature
+from .restore_service import RestoreService, iter_json_array
+from .snapshot_service import DashboardSnapshotService
+from .sms_outbox_service import SMSOutboxService
+from .sms_service import sms_service
+from .rollup_service import FinancialRollupService
+from .translation_service import TranslationService
+
+
+def create_lease(years=1, monthly_rent=Decimal('100.00'), start_date=None, contract_number='C-1'):
+    """Create a lease without going through Lease.save() side effects (PDFs, translation)."""
+    start_date = start_date or datetime.date(2020, 1, 1)
+    building = Building.objects.bulk_create([Building(name='Tower', address='Muscat')])[0]
+    unit = Unit.objects.create(building=building, unit_number='101', unit_type='office', floor=1)
+    tenant = Tenant.objects.bulk_create([Tenant(name='Tenant', tenant_type='individual', phone='99999999')])[0]
+    return Lease.objects.bulk_create([Lease(
+        unit=unit, tenant=tenant, contract_number=contract_number, monthly_rent=monthly_rent,
+        start_date=start_date, end_date=start_date + relativedelta(years=years, days=-1),
+        registration_fee=Decimal('0'), status='active',
+    )])[0]
+
+
+def create_payment(lease, year, month, amount, payment_method='cash', payment_date=None):
+    return Payment.objects.bulk_create([Payment(
+        lease=lease, amount=Decimal(amount), payment_for_year=year, payment_for_month=month,
+        payment_date=payment_date or datetime.date(year, month, 1), payment_method=payment_method,
+    )])[0]
+
+
+class LedgerServiceTests(TestCase):
+
+    def test_payment_summary_rows(self):
+        lease = create_lease(years=1, start_date=datetime.date(2020, 1, 15))
+        create_payment(lease, 2020, 1, '100.00', payment_method='check', payment_date=datetime.date(2020, 1, 3))
+        create_payment(lease, 2020, 1, '5.00', payment_date=datetime.date(2020, 1, 20))
+        create_payment(lease, 2020, 2, '40.00')
+
+        summary = lease.get_payment_summary()
+
+        self.assertEqual(len(summary), 12)
+        january, february, march = summary[:3]
+        self.assertEqual((january['year'], january['month']), (2020, 1))
+        self.assertEqual(january['amount_paid'], Decimal('105.00'))
+        self.assertEqual(january['balance'], Decimal('-5.00'))
+        self.assertEqual(january['payment_date'], datetime.date(2020, 1, 3))
+        self.assertEqual(january['next_payment_date'], datetime.date(2020, 2, 1))
+        self.assertEqual(february['amount_paid'], Decimal('40.00'))
+        self.assertEqual(march['amount_paid'], 0)
+        self.assertEqual(march['status'], 'due')
+        self.assertIsNone(march['payment_method'])
+
+    def test_payment_summary_status(self):
+        next_month = datetime.date.today().replace(day=1) + relativedelta(months=1)
+        lease = create_lease(years=1, start_date=next_month)
+        create_payment(lease, next_month.year, next_month.month, '100.00')
+        following = next_month + relativedelta(months=1)
+        create_payment(lease, following.year, following.month, '30.00')
+
+        summary = lease.get_payment_summary()
+
+        self.assertEqual([row['status'] for row in summary[:3]], ['paid', 'partial', 'due'])
+
+    def test_payment_summary_query_count(self):
+        for years in range(1, 11):
+            with self.subTest(years=years):
+                lease = create_lease(years=years, contract_number=f'C-{years}')
+                Payment.objects.bulk_create([
+                    Payment(lease=lease, amount=Decimal('100.00'), payment_for_year=year, payment_for_month=month,
+                            payment_date=datetime.date(year, month, 1))
+                    for year in range(2020, 2020 + years) for month in range(1, 13)
+                ])
+                with self.assertNumQueries(1):
+                    summary = lease.get_payment_summary()
+                self.assertEqual(len(summary), years * 12)
+
+    def test_payment_summary_uses_prefetched_payments(self):
+        lease = create_lease(years=5)
+        create_payment(lease, 2021, 6, '100.00')
+        lease = Lease.objects.prefetch_related('payments').get(pk=lease.pk)
+
+        with self.assertNumQueries(0):
+            summary = lease.get_payment_summary()
+        self.assertEqual(summary[17]['amount_paid'], Decimal('100.00'))
+
+    def test_portfolio_arrears_query_count(self):
+        leases = [create_lease(years=2, contract_number=f'C-{i}') for i in range(5)]
+        create_payment(leases[0], 2020, 1, '100.00')
+        create_payment(leases[0], 2020, 2, '30.00')
+        create_payment(leases[3], 2021, 12, '100.00')
+
+        with self.assertNumQueries(2):
+            arrears = LedgerService.get_portfolio_arrears(Lease.objects.all())
+
+        self.assertEqual(set(arrears), {lease.pk for lease in leases})
+        first = arrears[leases[0].pk]
+        self.assertEqual([(m['year'], m['month']) for m in first['paid_months']], [(2020, 1)])
+        self.assertEqual([(m['year'], m['month']) for m in first['partial_months']], [(2020, 2)])
+        self.assertEqual(len(first['due_months']), 22)
+        self.assertEqual(first['overdue_balance'], Decimal('2270.00'))
+        for lease in leases:
+            expected = [(m['status'], m['amount_paid']) for m in lease.get_payment_summary()]
+            self.assertEqual([(m['status'], m['amount_paid']) for m in arrears[lease.pk]['months']], expected)
+
+
+class FinancialRollupTests(TestCase):
+
+    def test_rollup_follows_payment_and_expense_changes(self):
+        lease = create_lease()
+        building_id = lease.unit.building_id
+        payment = Payment.objects.create(
+            lease=lease, amount=Decimal('100.00'), payment_for_year=2024, payment_for_month=3,
+            payment_date=datetime.date(2024, 3, 5),
+        )
+        Payment.objects.create(
+            lease=lease, amount=Decimal('50.00'), payment_for_year=2024, payment_for_month=4,
+            payment_date=datetime.date(2024, 3, 20),
+        )
+        expense = Expense.objects.create(
+            building_id=building_id, category='maintenance', description='Pump', description_en='Pump',
+            amount=Decimal('30.00'), expense_date=datetime.date(2024, 3, 9),
+        )
+        self.assertEqual(FinancialRollupService.get_totals(2024, 3), (Decimal('150.00'), Decimal('30.00')))
+
+        payment.payment_date = datetime.date(2024, 4, 1)
+        payment.save()
+        expense.delete()
+
+        self.assertEqual(FinancialRollupService.get_totals(2024, 3), (Decimal('50.00'), 0))
+        self.assertEqual(FinancialRollupService.get_totals(2024, 4), (Decimal('100.00'), 0))
+        march = MonthlyFinancialRollup.objects.get(year=2024, month=3, building_id=building_id)
+        self.assertEqual((march.payment_count, march.expense_count), (1, 0))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        lease = create_lease()
+        for month, amount in [(1, '100.00'), (1, '20.00'), (2, '75.50')]:
+            Payment.objects.create(
+                lease=lease, amount=Decimal(amount), payment_for_year=2024, payment_for_month=month,
+                payment_date=datetime.date(2024, month, 10),
+            )
+        create_payment(lease, 2024, 5, '40.00')  # bulk_create bypasses the signals
+        incremental = FinancialRollupService.get_monthly_totals(datetime.date(2024, 1, 1), datetime.date(2024, 12, 1))
+        self.assertNotIn((2024, 5), incremental)
+
+        FinancialRollupService.rebuild()
+
+        rebuilt = FinancialRollupService.get_monthly_totals(datetime.date(2024, 1, 1), datetime.date(2024, 12, 1))
+        self.assertEqual(rebuilt[(2024, 1)]['income'], incremental[(2024, 1)]['income'])
+        self.assertEqual(rebuilt[(2024, 2)]['income'], Decimal('75.50'))
+        self.assertEqual(rebuilt[(2024, 5)]['income'], Decimal('40.00'))
+
+
+class QueryRecorderTests(TestCase):
+
+    def test_recorder_groups_repeated_queries(self):
+        create_lease()
+        with QueryRecorder() as recorder:
+            for pk in (1, 2, 3):
+                list(Lease.objects.filter(pk=pk))
+            list(Lease.objects.filter(pk__in=[1, 2]))
+            list(Lease.objects.filter(pk__in=[1, 2, 3]))
+
+        self.assertEqual(recorder.count, 5)
+        self.assertEqual([count for _signature, count in recorder.duplicates()], [3, 2])
+        self.assertGreaterEqual(recorder.total_time, 0)
+
+    def test_signature_collapses_placeholder_lists(self):
+        self.assertEqual(
+            query_signature('SELECT 1 FROM t WHERE id IN (%s, %s,\n %s)'),
+            query_signature('SELECT 1 FROM t WHERE id IN (%s)'),
+        )
+
+
+class QueryIndexTests(TestCase):
+
+    def test_key_queries_use_indexes(self):
+        out = io.StringIO()
+        call_command('explain_queries', '--fail', stdout=out)
+        self.assertNotIn('FULL SCAN', out.getvalue())
+
+    def test_full_scan_detection(self):
+        from .management.commands.explain_queries import full_scans
+
+        self.assertEqual(full_scans('2 0 0 SCAN dashboard_lease', 'sqlite'), ['dashboard_lease'])
+        self.assertEqual(full_scans('5 0 0 SCAN dashboard_payment USING INDEX idx', 'sqlite'), [])
+        self.assertEqual(full_scans('Seq Scan on dashboard_otp  (cost=0.00..1.01)', 'postgresql'), ['dashboard_otp'])
+        plan = json.dumps({'query_block': {'table': {'table_name': 'dashboard_expense', 'access_type': 'ALL'}}})
+        self.assertEqual(full_scans(plan, 'mysql'), ['dashboard_expense'])
+
+
+class ViewQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Lock in the number of queries of the dashboard views (budgets in settings.QUERY_BUDGETS)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        today = datetime.date.today()
+        buildings = Building.objects.bulk_create([Building(name=f'Tower {i}', address='Muscat') for i in range(3)])
+        units = Unit.objects.bulk_create([
+            Unit(building=building, unit_number=f'{n}', unit_type='office', floor=1)
+            for building in buildings for n in range(4)
+        ])
+        tenants = Tenant.objects.bulk_create([
+            Tenant(name=f'Tenant {i}', tenant_type='individual', phone=f'9900000{i}') for i in range(len(units))
+        ])
+        leases = Lease.objects.bulk_create([
+            Lease(
+                unit=unit, tenant=tenant, contract_number=f'C-{i}', monthly_rent=Decimal('100.00'),
+                start_date=today - relativedelta(months=6), end_date=today + relativedelta(months=6, days=-1),
+                registration_fee=Decimal('0'), status='active',
+            )
+            for i, (unit, tenant) in enumerate(zip(units, tenants))
+        ])
+        Payment.objects.bulk_create([
+            Payment(
+                lease=lease, amount=Decimal('100.00'), payment_for_year=today.year, payment_for_month=today.month,
+                payment_date=today, payment_method='check' if i % 2 else 'cash',
+            )
+            for i, lease in enumerate(leases)
+        ])
+        Expense.objects.bulk_create([
+            Expense(building=building, category='maintenance', description='Pump', amount=Decimal('20.00'),
+                    expense_date=today)
+            for building in buildings
+        ])
+        MaintenanceRequest.objects.bulk_create([
+            MaintenanceRequest(lease=lease, title='Leak', description='Kitchen leak') for lease in leases[:4]
+        ])
+        invoices = Invoice.objects.bulk_create([
+            Invoice(tenant=lease.tenant, lease=lease, invoice_number=f'INV-{i}', due_date=today)
+            for i, lease in enumerate(leases[:4])
+        ])
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=invoice, description='Rent', amount=Decimal('100.00')) for invoice in invoices
+        ])
+        cls.lease = leases[0]
+        cls.payment = Payment.objects.filter(lease=cls.lease).first()
+        cls.invoice = invoices[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_list_views(self):
+        for url_name in [
+            'dashboard_home', 'tenant_list', 'unit_list', 'building_list', 'lease_list', 'expense_list',
+            'payment_list', 'maintenance_admin_list', 'invoice_list', 'check_management', 'user_management',
+            'security_deposit_list', 'report_selection', 'report_leases', 'real_estate_office_list',
+            'building_owner_list', 'commission_agreement_list', 'rent_collection_list',
+            'commission_distribution_list',
+        ]:
+            with self.subTest(url_name=url_name):
+                response = self.assertQueryBudget(url_name)
+                self.assertEqual(response.status_code, 200)
+
+    def test_detail_and_form_views(self):
+        lease, unit, tenant = self.lease, self.lease.unit, self.lease.tenant
+        for url_name, pk in [
+            ('lease_detail', lease.pk), ('lease_update', lease.pk), ('lease_cancel', lease.pk),
+            ('unit_detail', unit.pk), ('unit_update', unit.pk), ('tenant_detail', tenant.pk),
+            ('tenant_update', tenant.pk), ('building_update', unit.building_id),
+            ('building_delete', unit.building_id), ('payment_update', self.payment.pk),
+            ('invoice_detail', self.invoice.pk),
+        ]:
+            with self.subTest(url_name=url_name):
+                response = self.assertQueryBudget(url_name, kwargs={'pk': pk})
+                self.assertEqual(response.status_code, 200)
+
+    def test_occupancy_exports(self):
+        for url_name in ['export_buildings_excel', 'export_units_excel', 'report_occupancy']:
+            with self.subTest(url_name=url_name):
+                response = self.assertQueryBudget(url_name)
+                self.assertEqual(response.status_code, 200)
+
+    def test_calendar_feed(self):
+        cache.clear()
+        today = datetime.date.today()
+        response = self.assertQueryBudget('calendar_events', data={
+            'start': today.isoformat(), 'end': (today + relativedelta(months=7)).isoformat(),
+        })
+        self.assertEqual(len(json.loads(response.content)), 12)
+
+    def test_notification_inbox(self):
+        requests = list(MaintenanceRequest.objects.all())
+        NotificationService.create_many(
+            [NotificationService.build(self.user.pk, 'Lease', related_object=lease) for lease in Lease.objects.all()]
+            + [NotificationService.build(self.user.pk, 'Request', related_object=request) for request in requests]
+        )
+        response = self.assertQueryBudget('notification_inbox', data={'limit': 50})
+        notifications = json.loads(response.content)['notifications']
+        self.assertEqual(len(notifications), 16)
+        self.assertEqual(
+            {n['related_object']['label'] for n in notifications if n['related_object']['type'] == 'dashboard.lease'},
+            {str(lease) for lease in Lease.objects.select_related('tenant')},
+        )
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGETS={'lease_list': 1}, QUERY_BUDGET_REPEAT_LIMIT=3)
+    def test_middleware_logs_budget_violations(self):
+        with self.assertLogs('dashboard.middleware', level='WARNING') as logs:
+            self.client.get(reverse('lease_list'))
+        self.assertIn('Query budget exceeded for lease_list', logs.output[0])
+
+    def test_form_views(self):
+        for url_name in ['lease_create', 'unit_create', 'tenant_create', 'building_create', 'payment_create',
+                         'expense_create', 'invoice_create']:
+            with self.subTest(url_name=url_name):
+                response = self.assertQueryBudget(url_name)
+                self.assertEqual(response.status_code, 200)
+
+
+class LeaseStatusServiceTests(TestCase):
+
+    def test_threshold_matches_update_status_rule(self):
+        start = datetime.date(2023, 12, 25)
+        for offset in range(120):
+            today = start + datetime.timedelta(days=offset)
+            threshold = LeaseStatusService.expiring_soon_threshold(today)
+            for end_offset in range(25, 40):
+                end_date = today + datetime.timedelta(days=end_offset)
+                self.assertEqual(
+                    end_date - relativedelta(months=1) <= today, end_date <= threshold, (today, end_date),
+                )
+
+    def test_transitions_match_update_status(self):
+        today = datetime.date(2024, 6, 15)
+        base = create_lease(contract_number='C-0')
+        tenant_user = User.objects.create_user('tenant', 'tenant@example.com', 'pass')
+        Tenant.objects.filter(pk=base.tenant_id).update(user=tenant_user)
+        units = Unit.objects.bulk_create([
+            Unit(building=base.unit.building, unit_number=f'U{i}', unit_type='office', floor=1, is_available=False)
+            for i in range(5)
+        ])
+        cases = [
+            ('active', datetime.date(2024, 6, 1)),  # expired
+            ('expiring_soon', datetime.date(2024, 6, 14)),  # expired
+            ('active', datetime.date(2024, 7, 10)),  # expiring soon
+            ('expiring_soon', datetime.date(2024, 9, 1)),  # active again (end date extended)
+            ('renewed', datetime.date(2024, 1, 1)),  # untouched
+        ]
+        leases = Lease.objects.bulk_create([
+            Lease(unit=unit, tenant=base.tenant, contract_number=f'C-{i + 1}', monthly_rent=Decimal('100.00'),
+                  start_date=datetime.date(2023, 1, 1), end_date=end_date, registration_fee=Decimal('0'),
+                  status=status)
+            for i, (unit, (status, end_date)) in enumerate(zip(units, cases))
+        ])
+        expected = {}
+        with mock.patch('django.utils.timezone.now', return_value=timezone.make_aware(datetime.datetime(2024, 6, 15))):
+            for lease in leases:
+                lease.update_status()
+                expected[lease.pk] = lease.status
+
+            with self.assertNumQueries(15):
+                changeset = LeaseStatusService.run(today=today)
+
+        self.assertEqual(dict(Lease.objects.filter(pk__in=expected).values_list('pk', 'status')), expected)
+        self.assertEqual(sorted(changeset['expired']), [base.pk, leases[0].pk, leases[1].pk])
+        self.assertEqual(changeset['expiring_soon'], [leases[2].pk])
+        self.assertEqual(changeset['active'], [leases[3].pk])
+        self.assertEqual(sorted(changeset['units_freed']), [units[0].pk, units[1].pk])
+        self.assertEqual(list(Unit.objects.filter(is_available=True, pk__in=[u.pk for u in units])), units[:2])
+        self.assertEqual(changeset['notifications'], 1)
+        notification = Notification.objects.get(user=tenant_user)
+        self.assertEqual(notification.related_object, leases[2])
+
+        # Already notified leases are not notified again
+        Lease.objects.filter(pk=leases[2].pk).update(status='active')
+        self.assertEqual(LeaseStatusService.run(today=today)['notifications'], 0)
+
+
+class LeaseLifecycleTests(TestCase):
+
+    def setUp(self):
+        lease = create_lease(start_date=timezone.now().date() - datetime.timedelta(days=30), years=2)
+        Unit.objects.filter(pk=lease.unit_id).update(is_available=False)
+        self.lease = Lease.objects.get(pk=lease.pk)
+        self.events = []
+        handler = lambda sender, lease, event, **kwargs: self.events.append((lease.pk, event))
+        lease_event.connect(handler, weak=False, dispatch_uid='lease-lifecycle-test')
+        self.addCleanup(lease_event.disconnect, dispatch_uid='lease-lifecycle-test')
+
+    def test_save_without_occupancy_change_only_updates_lease(self):
+        self.lease.monthly_rent = Decimal('120.00')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertNumQueries(1):
+                self.lease.save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.events, [])
+
+    def test_cancelling_frees_unit_and_dispatches_after_commit(self):
+        self.lease.status = 'cancelled'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.lease.save()
+            self.assertEqual(self.events, [])
+        self.assertTrue(Unit.objects.get(pk=self.lease.unit_id).is_available)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.events, [(self.lease.pk, 'cancelled')])
+
+    def test_moving_lease_frees_old_unit(self):
+        old_unit_id = self.lease.unit_id
+        new_unit = Unit.objects.create(building_id=self.lease.unit.building_id, unit_number='102', unit_type='shop', floor=1)
+        self.lease.unit = new_unit
+        self.lease.save()
+        self.assertEqual(
+            dict(Unit.objects.values_list('pk', 'is_available')), {old_unit_id: True, new_unit.pk: False},
+        )
+        self.assertFalse(new_unit.is_available)
+
+    def test_new_lease_occupies_unit_and_queues_invoice(self):
+        unit = Unit.objects.create(building_id=self.lease.unit.building_id, unit_number='103', unit_type='shop', floor=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            lease = Lease.objects.create(
+                unit=unit, tenant=self.lease.tenant, contract_number='C-2', monthly_rent=Decimal('100.00'),
+                start_date=self.lease.start_date, end_date=self.lease.end_date,
+            )
+        self.assertFalse(Unit.objects.get(pk=unit.pk).is_available)
+        self.assertEqual(self.events, [(lease.pk, 'created')])
+        self.assertEqual(DocumentJob.objects.get().kind, 'initial_invoice')
+
+
+class OccupancyServiceTests(TestCase):
+
+    def test_unit_and_building_index(self):
+        lease = create_lease()
+        Lease.objects.filter(pk=lease.pk).update(status='cancelled')
+        current = Lease.objects.bulk_create([Lease(
+            unit=lease.unit, tenant=lease.tenant, contract_number='C-2', monthly_rent=Decimal('150.00'),
+            start_date=datetime.date(2021, 1, 1), end_date=datetime.date(2021, 12, 31),
+            registration_fee=Decimal('0'), status='expiring_soon',
+        )])[0]
+        Unit.objects.filter(pk=lease.unit_id).update(is_available=False)
+        self.assertEqual(OccupancyService.reconcile(), 1)  # queryset updates bypass the counters
+        vacant = Unit.objects.create(building=lease.unit.building, unit_number='102', unit_type='shop', floor=1)
+
+        with self.assertNumQueries(2):
+            units = OccupancyService.get_unit_index()
+            self.assertEqual([unit.current_lease for unit in units], [current, None])
+            self.assertEqual(units[0].current_lease.tenant.name, 'Tenant')
+        self.assertEqual(units[1], vacant)
+
+        with self.assertNumQueries(1):
+            building, = OccupancyService.get_building_index()
+        self.assertEqual((building.total_units, building.occupied_units, building.available_units), (2, 1, 1))
+        self.assertEqual(building.occupancy_rate, 50)
+        self.assertEqual(OccupancyService.get_totals([building])['available_units'], 1)
+
+    def test_building_lease_counters(self):
+        lease = create_lease()
+        Lease.objects.bulk_create([
+            Lease(unit=lease.unit, tenant=lease.tenant, contract_number=f'C-{i}', monthly_rent=Decimal('100.00'),
+                  start_date=lease.start_date, end_date=lease.end_date, registration_fee=Decimal('0'), status=status)
+            for i, status in enumerate(['active', 'expired'], start=2)
+        ])
+        MaintenanceRequest.objects.bulk_create([
+            MaintenanceRequest(lease=lease, title='Leak', description='Kitchen leak') for _i in range(3)
+        ])
+        with self.assertNumQueries(1):
+            counters = OccupancyService.get_building_lease_counters(lease.unit.building)
+        self.assertEqual(counters, {'active_leases': 2, 'current_tenants': 1, 'maintenance_requests': 3})
+
+    def counters(self, *buildings):
+        return [
+            tuple(Building.objects.filter(pk=building.pk).values_list('total_units', 'occupied_units').get())
+            for building in buildings
+        ]
+
+    def test_unit_save_locks_previous_state(self):
+        tower = Building.objects.bulk_create([Building(name='Tower', address='Muscat')])[0]
+        unit = Unit.objects.create(building=tower, unit_number='101', unit_type='office', floor=1)
+        unit.is_available = False
+        select_for_update = QuerySet.select_for_update
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=select_for_update) as lock:
+            unit.save()
+        self.assertEqual(lock.call_count, 1)
+        self.assertEqual(self.counters(tower), [(1, 1)])
+
+    def test_counters_follow_units_and_leases(self):
+        tower, annex = Building.objects.bulk_create([Building(name='Tower', address='Muscat'), Building(name='Annex', address='Muscat')])
+        unit = Unit.objects.create(building=tower, unit_number='101', unit_type='office', floor=1)
+        Unit.objects.create(building=tower, unit_number='102', unit_type='office', floor=1, is_available=False)
+        self.assertEqual(self.counters(tower, annex), [(2, 1), (0, 0)])
+
+        unit.building = annex
+        unit.save()
+        self.assertEqual(self.counters(tower, annex), [(1, 1), (1, 0)])
+
+        tenant = Tenant.objects.bulk_create([Tenant(name='Tenant', tenant_type='individual', phone='99999999')])[0]
+        today = timezone.now().date()
+        lease = Lease.objects.create(
+            unit=unit, tenant=tenant, contract_number='C-1', monthly_rent=Decimal('100.00'),
+            start_date=today - relativedelta(months=6), end_date=today + relativedelta(months=6),
+        )
+        self.assertEqual(self.counters(annex), [(1, 1)])
+        Lease.objects.filter(pk=lease.pk).update(end_date=today - datetime.timedelta(days=1))
+        LeaseStatusService.apply_transitions(today)
+        self.assertEqual(self.counters(annex), [(1, 0)])
+
+        Unit.objects.get(pk=unit.pk).delete()
+        self.assertEqual(self.counters(tower, annex), [(1, 1), (0, 0)])
+
+    def test_reconcile_command_fixes_drift(self):
+        lease = create_lease()
+        Unit.objects.filter(pk=lease.unit_id).update(is_available=False)
+        Building.objects.update(total_units=5)
+        out = io.StringIO()
+        call_command('reconcile_occupancy_counters', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertEqual(self.counters(lease.unit.building), [(1, 1)])
+        self.assertEqual(OccupancyService.reconcile(), 0)
+
+
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.lease = create_lease(start_date=datetime.date(2024, 1, 1))  # ends 2024-12-31
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        self.client.force_login(self.user)
+        self.now = mock.patch(
+            'django.utils.timezone.now', return_value=timezone.make_aware(datetime.datetime(2024, 12, 1)),
+        )
+        self.now.start()
+        self.addCleanup(self.now.stop)
+
+    def get(self, start='2024-11-24T00:00:00+04:00', end='2025-01-05T00:00:00+04:00', etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse('calendar_events'), {'start': start, 'end': end}, headers=headers)
+
+    def test_events_in_window(self):
+        with self.assertNumQueries(1):
+            events = CalendarService.get_events(datetime.date(2024, 11, 24), datetime.date(2025, 1, 5))
+        event, = events
+        self.assertEqual(event['start'], '2024-12-31')
+        self.assertEqual(event['url'], reverse('lease_detail', kwargs={'pk': self.lease.pk}))
+        self.assertEqual(event['extendedProps'], {'contract_number': 'C-1', 'days_until_expiry': 30})
+        self.assertIn('Tenant', event['title'])
+        self.assertEqual(CalendarService.get_events(datetime.date(2024, 11, 24), datetime.date(2024, 12, 31)), [])
+
+    def test_etag_and_invalidation(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)), 1)
+        self.assertIn('max-age=60', response['Cache-Control'])
+        etag = response['ETag']
+
+        self.assertEqual(self.get(etag=etag).status_code, 304)
+        with self.assertNumQueries(2):  # session and user only, the feed comes from the cache
+            self.assertEqual(self.get().status_code, 200)
+
+        lease = Lease.objects.get(pk=self.lease.pk)
+        lease.contract_number = 'C-9'
+        lease.save(update_fields=['contract_number'])
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]['extendedProps']['contract_number'], 'C-9')
+
+    def test_invalid_window(self):
+        self.assertEqual(self.get(start='').status_code, 400)
+        self.assertEqual(self.get(start='2024-01-01', end='2026-01-01').status_code, 400)
+
+
+class DashboardSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        today = timezone.now().date()
+        self.lease = create_lease(start_date=today - relativedelta(months=6))
+
+    def test_snapshot_is_cached_until_data_changes(self):
+        stats = DashboardSnapshotService.get()['stats']
+        self.assertEqual((stats['active_count'], stats['expected_monthly_income']), (1, Decimal('100.00')))
+        with self.assertNumQueries(0):
+            self.assertEqual(DashboardSnapshotService.get()['stats'], stats)
+
+        Expense.objects.create(
+            building=self.lease.unit.building, category='maintenance', description='Pump',
+            amount=Decimal('30.00'), expense_date=timezone.now().date(),
+        )
+        stats = DashboardSnapshotService.get()['stats']
+        self.assertEqual((stats['monthly_expenses'], stats['net_income']), (Decimal('30.00'), Decimal('70.00')))
+        self.assertEqual(DashboardSnapshotService.get_counters(), {'hits': 1, 'stale_hits': 0, 'misses': 2})
+
+    def test_stale_snapshot_served_while_another_request_rebuilds(self):
+        DashboardSnapshotService.get()
+        DashboardSnapshotService.invalidate()
+        cache.add(DashboardSnapshotService.LOCK_KEY, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(DashboardSnapshotService.get()['stats']['active_count'], 1)
+        self.assertEqual(DashboardSnapshotService.get_counters()['stale_hits'], 1)
+
+    def test_warm_command(self):
+        call_command('warm_dashboard_snapshot', stdout=io.StringIO())
+        with self.assertNumQueries(0):
+            self.assertEqual(DashboardSnapshotService.get()['occupancy']['total_units'], 1)
+
+
+class CompanyServiceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_profile_cached_until_saved(self):
+        self.assertIsNone(CompanyService.get())
+        company = Company.objects.create(name='Acme')
+        with self.assertNumQueries(1):
+            self.assertEqual(CompanyService.get(), company)
+            self.assertEqual(CompanyService.get_name(), 'Acme')
+
+        company.name = 'Acme Properties'
+        company.save()
+        self.assertEqual(CompanyService.get_name(), 'Acme Properties')
+
+        # Another process changed it: only the shared version token moves
+        cache.delete(CompanyService.VERSION_KEY)
+        Company.objects.filter(pk=company.pk).update(name='Acme Holdings')
+        self.assertEqual(CompanyService.get_name(), 'Acme Holdings')
+
+    def test_profile_reloaded_after_ttl_without_shared_cache(self):
+        company = Company.objects.create(name='Acme')
+        self.assertEqual(CompanyService.get_name(), 'Acme')
+        # Saved in another process whose cache this one does not see
+        Company.objects.filter(pk=company.pk).update(name='Acme Holdings')
+        self.assertEqual(CompanyService.get_name(), 'Acme')
+        later = time.monotonic() + settings.COMPANY_PROFILE_TTL + 1
+        with mock.patch('dashboard.company_service.time.monotonic', return_value=later):
+            self.assertEqual(CompanyService.get_name(), 'Acme Holdings')
+
+    def test_request_scope_and_logo(self):
+        company = Company.objects.create(name='Acme')
+        company.logo.save('logo.png', ContentFile(b'\x89PNG logo'))
+        request = RequestFactory().get('/')
+        self.assertEqual(CompanyService.get(request), company)
+        with self.assertNumQueries(0), mock.patch.object(CompanyService, '_version') as version:
+            self.assertEqual(CompanyService.get_logo_url(request), company.logo.url)
+            version.assert_not_called()
+
+        self.assertEqual(CompanyService.get_logo_bytes(), b'\x89PNG logo')
+        self.assertEqual(CompanyService.get_logo_data_uri(), 'data:image/png;base64,iVBORyBsb2dv')
+        with mock.patch('builtins.open') as open_:
+            CompanyService.get_logo_data_uri()
+            open_.assert_not_called()
+
+
+@override_settings(OTP_STORE='cache')
+class OTPServiceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='otp-user')
+        UserProfile.objects.create(user=self.user, phone_number='+96891234567')
+
+    def test_cache_store_is_single_use_and_hashed(self):
+        with self.assertNumQueries(0):
+            otp = OTPService.generate_otp(self.user, '+96891234567')
+        self.assertIsNone(otp.pk)
+        self.assertNotIn(otp.code, str(cache.get(f'otp:login:{self.user.pk}')))
+        self.assertFalse(OTP.objects.exists())
+
+        self.assertIsNone(OTPService.validate_otp(self.user, otp.code, '+96890000000'))
+        with self.assertNumQueries(0):
+            self.assertTrue(OTPService.validate_otp(self.user, otp.code, '+96891234567'))
+        self.assertIsNone(OTPService.validate_otp(self.user, otp.code, '+96891234567'))
+
+    def test_cache_store_rate_limits(self):
+        for _i in range(OTPService.MAX_OTP_ATTEMPTS):
+            self.assertTrue(OTPService.generate_otp(self.user, '+96891234567'))
+        self.assertIsNone(OTPService.generate_otp(self.user, '+96891234567'))
+
+        cache.clear()
+        otp = OTPService.generate_otp(self.user, '+96891234567')
+        wrong = '000000' if otp.code != '000000' else '111111'
+        for _i in range(OTPService.MAX_VERIFY_ATTEMPTS):
+            self.assertIsNone(OTPService.validate_otp(self.user, wrong))
+        self.assertIsNone(OTPService.validate_otp(self.user, otp.code))  # burned
+
+    @override_settings(OTP_STORE='database')
+    def test_database_store(self):
+        otp = OTPService.generate_otp(self.user, '+96891234567')
+        self.assertEqual(OTPService.get_otp_for_user(self.user), otp)
+        self.assertIsNone(OTPService.validate_otp(self.user, 'x'))
+        self.assertEqual(OTPService.validate_otp(self.user, otp.code), otp)
+        self.assertIsNone(OTPService.validate_otp(self.user, otp.code))
+
+        OTP.objects.create(user=self.user, code='123456', phone_number='+96891234567',
+                           expires_at=timezone.now() - datetime.timedelta(minutes=1))
+        pending = OTPService.generate_otp(self.user, '+96891234567')
+        out = io.StringIO()
+        call_command('purge_expired_otps', '--batch-size', '1', stdout=out)
+        self.assertIn('2', out.getvalue())
+        self.assertEqual(list(OTP.objects.all()), [pending])
+
+    def test_cache_store_requires_shared_cache(self):
+        from .otp_store import check_otp_store
+        self.assertEqual([error.id for error in check_otp_store(None)], ['dashboard.E001'])
+        with override_settings(OTP_STORE='database'):
+            self.assertEqual(check_otp_store(None), [])
+
+    def test_authenticate_with_phone_and_code(self):
+        otp = OTPService.generate_otp(self.user, '+96891234567')
+        response = self.client.post(
+            reverse('api_verify_login_otp'), {'phone_number': '+96891234567', 'otp_code': otp.code},
+        )
+        self.assertTrue(response.json()['success'])
+
+
+@override_settings(SMS_PROVIDER='fake', SMS_FAKE_FAILURE_RATE=0)
+class SMSOutboxTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        sms_service.fake_outbox.clear()
+
+    def test_otp_sms_is_queued_and_sent_by_worker(self):
+        user = User.objects.create(username='sms-user')
+        otp = OTPService.generate_otp(user, '+96891234567')
+        self.assertTrue(OTPService.send_otp_sms(otp))
+        self.assertEqual(len(sms_service.fake_outbox), 0)
+        message = SMSMessage.objects.get()
+        self.assertEqual((message.status, message.purpose), ('queued', 'otp'))
+
+        self.assertEqual(SMSOutboxService.run_pending(), 1)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.provider), ('sent', 1, 'fake'))
+        self.assertEqual(message.body, '')  # OTP text is not kept
+        self.assertIn(otp.code, sms_service.fake_outbox[0][1])
+
+    def test_batches_use_constant_queries(self):
+        for i in range(3):
+            SMSOutboxService.enqueue(f'+9689000000{i}', 'hello')
+        # claim (5) + throttle counts + bulk update, then the empty-queue poll (3)
+        with self.assertNumQueries(10):
+            SMSOutboxService.run_pending(batch_size=10)
+        for i in range(20):
+            SMSOutboxService.enqueue(f'+968910000{i:02d}', 'hello')
+        with self.assertNumQueries(10):
+            SMSOutboxService.run_pending(batch_size=50)
+        self.assertEqual(SMSMessage.objects.filter(status='sent').count(), 23)
+
+    @override_settings(SMS_FAKE_FAILURE_RATE=1)
+    def test_failed_sends_are_retried_with_backoff(self):
+        message = SMSOutboxService.enqueue('+96891234567', 'hello')
+        self.assertEqual(SMSOutboxService.run_pending(), 0)
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('queued', 1))
+        self.assertGreater(message.run_after, timezone.now())
+        self.assertEqual(SMSOutboxService.run_pending(), 0)  # not runnable yet
+
+        SMSMessage.objects.update(run_after=timezone.now())
+        with mock.patch.object(SMSOutboxService, 'MAX_ATTEMPTS', 2):
+            SMSOutboxService.run_pending()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), ('failed', 2))
+        self.assertEqual(SMSOutboxService.get_metrics()['failed'], 1)
+
+    def test_per_number_throttle_and_expiry(self):
+        for _i in range(SMSOutboxService.PER_NUMBER_LIMIT + 2):
+            SMSOutboxService.enqueue('+96891234567', 'hello')
+        expired = SMSOutboxService.enqueue('+96897654321', 'code', purpose='otp', expires_in=60)
+        SMSMessage.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+
+        self.assertEqual(SMSOutboxService.run_pending(), SMSOutboxService.PER_NUMBER_LIMIT)
+        throttled = SMSMessage.objects.filter(status='queued')
+        self.assertEqual(throttled.count(), 2)
+        self.assertFalse(throttled.filter(attempts__gt=0).exists())
+        self.assertEqual(SMSMessage.objects.get(pk=expired.pk).last_error, 'expired')
+
+        metrics = SMSOutboxService.get_metrics()
+        self.assertEqual(metrics['sent'], SMSOutboxService.PER_NUMBER_LIMIT)
+        self.assertEqual(metrics['by_status']['queued'], 2)
+        self.assertIsNotNone(metrics['average_latency'])
+
+    def test_expired_otp_bodies_are_blanked_while_waiting(self):
+        throttled = SMSOutboxService.enqueue('+96891234567', 'code 123456', purpose='otp', expires_in=60)
+        notice = SMSOutboxService.enqueue('+96891234567', 'notice', expires_in=60)
+        SMSMessage.objects.update(
+            run_after=timezone.now() + datetime.timedelta(minutes=5),
+            expires_at=timezone.now() - datetime.timedelta(seconds=1),
+        )
+        self.assertEqual(SMSOutboxService.run_pending(), 0)
+        self.assertEqual(
+            dict(SMSMessage.objects.values_list('pk', 'body')), {throttled.pk: '', notice.pk: 'notice'},
+        )
+        self.assertFalse(SMSMessage.objects.exclude(status='failed').exists())
+
+    def test_worker_survives_database_errors(self):
+        from django.db import OperationalError
+        with mock.patch.object(
+            SMSOutboxService, 'run_pending', side_effect=[OperationalError('gone away'), 2, KeyboardInterrupt],
+        ) as run_pending, mock.patch('time.sleep'), \
+                mock.patch('dashboard.management.commands.run_sms_worker.close_old_connections') as close:
+            out = io.StringIO()
+            with self.assertLogs('dashboard.management.commands.run_sms_worker', level='ERROR'):
+                call_command('run_sms_worker', stdout=out)
+        self.assertEqual((run_pending.call_count, close.call_count), (3, 3))
+        self.assertIn('2', out.getvalue())
+
+@override_settings(TRANSLATION_BACKEND='google', TRANSLATION_ASYNC=False)
+class TranslationServiceTests(TestCase):
+
+    def test_save_does_not_wait_for_remote_backend(self):
+        with mock.patch.object(TranslationService, '_translate_via_google', return_value=['Tower', 'Muscat']) as google:
+            with self.captureOnCommitCallbacks() as callbacks:
+                building = Building.objects.create(name_ar='برج', address_ar='مسقط')
+            google.assert_not_called()
+            self.assertEqual(building.name_en, None)
+
+            for callback in callbacks:
+                callback()
+            google.assert_called_once_with(['برج', 'مسقط'])
+        building.refresh_from_db()
+        self.assertEqual((building.name_en, building.address_en), ('Tower', 'Muscat'))
+
+        # Same text again: served by the phrase cache
+        with mock.patch.object(TranslationService, '_translate_via_google') as google:
+            with self.captureOnCommitCallbacks(execute=True):
+                other = Building.objects.create(name_ar='برج', address_ar='مسقط', name_en='', address_en='')
+            google.assert_not_called()
+        other.refresh_from_db()
+        self.assertEqual(other.name_en, 'Tower')
+
+    def test_failed_translation_leaves_field_empty(self):
+        with mock.patch.object(TranslationService, '_translate_via_google', side_effect=OSError('offline')):
+            with self.captureOnCommitCallbacks(execute=True):
+                building = Building.objects.create(name_ar='مبنى', address_ar='صحار')
+        building.refresh_from_db()
+        self.assertFalse(building.name_en)
+        self.assertFalse(TranslationCache.objects.exists())
+
+    @override_settings(TRANSLATION_BACKEND='dictionary', TRANSLATION_DICTIONARY={'مبنى الريم': 'Al Reem Building'})
+    def test_dictionary_backend_fills_while_saving(self):
+        building = Building(name_ar='مبنى الريم', address_ar='عنوان غير معروف')
+        with self.assertNumQueries(1):
+            building.save()
+        self.assertEqual(building.name_en, 'Al Reem Building')
+        self.assertFalse(building.address_en)
+
+    def test_backfill_translates_distinct_texts_in_batches(self):
+        Building.objects.bulk_create([
+            Building(name_ar='برج', address_ar='مسقط'),
+            Building(name_ar='برج', address_ar='مسقط'),
+            Building(name_ar='برج', address_ar='صحار', address_en='Sohar (manual)'),
+        ])
+        with mock.patch.object(
+            TranslationService, '_translate_via_google', side_effect=lambda texts: [f'EN {t}' for t in texts],
+        ) as google:
+            out = io.StringIO()
+            call_command('backfill_translations', '--model', 'Building', '--batch-size', '1', stdout=out)
+        self.assertEqual(google.call_count, 2)  # 'برج' and 'مسقط', once each
+        self.assertEqual(
+            sorted(Building.objects.values_list('name_en', 'address_en')),
+            [('EN برج', 'EN مسقط'), ('EN برج', 'EN مسقط'), ('EN برج', 'Sohar (manual)')],
+        )
+        self.assertEqual(TranslationCache.objects.count(), 2)
+
+
+class NotificationServiceTests(TestCase):
+
+    def setUp(self):
+        self.lease = create_lease()
+        self.tenant_user = User.objects.create_user('tenant', 'tenant@example.com', 'pass')
+        Tenant.objects.filter(pk=self.lease.tenant_id).update(user=self.tenant_user)
+        self.lease.tenant.user = self.tenant_user
+        User.objects.bulk_create([User(username=f'staff{i}', is_staff=True) for i in range(30)])
+
+    def test_fan_out_is_constant_queries_and_deduplicated(self):
+        staff_ids = NotificationService.staff_user_ids()
+        NotificationService.build(staff_ids[0], 'warm up', related_object=self.lease)  # content type cache
+        with self.assertNumQueries(2):
+            created = NotificationService.fan_out(staff_ids, 'Message', kind='test', related_object=self.lease)
+        self.assertEqual(created, 30)
+
+        with self.assertNumQueries(2):
+            created = NotificationService.fan_out(staff_ids + [self.tenant_user.pk], 'Reworded', kind='test', related_object=self.lease)
+        self.assertEqual(created, 1)
+        self.assertEqual(NotificationService.fan_out(staff_ids, 'Next month', kind='test', related_object=self.lease, period='2'), 30)
+
+        # Notifications without a kind are always sent
+        NotificationService.fan_out([self.tenant_user.pk], 'Hello')
+        NotificationService.fan_out([self.tenant_user.pk], 'Hello')
+        self.assertEqual(Notification.objects.filter(message='Hello').count(), 2)
+
+    def test_payment_reminders_run_twice_create_no_duplicates(self):
+        today = timezone.make_aware(datetime.datetime(2020, 6, 1))
+        with mock.patch('django.utils.timezone.now', return_value=today):
+            call_command('send_payment_reminders', stdout=io.StringIO())
+            count = Notification.objects.count()
+            call_command('send_payment_reminders', stdout=io.StringIO())
+        self.assertEqual(Notification.objects.count(), count)
+        # January to May overdue, for the tenant and each staff user
+        self.assertEqual(count, 5 * 31)
+        message = Notification.objects.filter(user=self.tenant_user, kind='rent_overdue').first().message
+        self.assertIn('C-1', message)
+        self.assertEqual(Notification.objects.filter(user=self.tenant_user).first().related_object, self.lease)
+
+    def test_maintenance_request_notifies_staff_then_tenant(self):
+        request = MaintenanceRequest.objects.create(lease=self.lease, title='Leak', description='Water')
+        self.assertEqual(Notification.objects.filter(kind='maintenance_created').count(), 30)
+
+        request.title = 'Leak in kitchen'
+        request.save()
+        self.assertFalse(Notification.objects.filter(user=self.tenant_user).exists())
+
+        request.status = 'in_progress'
+        request.save()
+        notification = Notification.objects.get(user=self.tenant_user)
+        self.assertEqual((notification.kind, notification.related_object), ('maintenance_status', request))
+
+        # Going back to an earlier status is notified again
+        for status in ['submitted', 'in_progress']:
+            request.status = status
+            request.save()
+        self.assertEqual(Notification.objects.filter(user=self.tenant_user, kind='maintenance_status').count(), 3)
+
+    def test_inbox_cursor_pages(self):
+        now = timezone.now()
+        NotificationService.create_many([
+            NotificationService.build(self.tenant_user.pk, f'Message {i}', related_object=self.lease) for i in range(25)
+        ])
+        # Equal timestamps are ordered by id
+        Notification.objects.filter(user=self.tenant_user, pk__lte=Notification.objects.order_by('pk')[12].pk).update(timestamp=now)
+        self.client.force_login(self.tenant_user)
+
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(reverse('notification_inbox'), {'limit': 10, **({'cursor': cursor} if cursor else {})})
+            data = json.loads(response.content)
+            pages.append([n['id'] for n in data['notifications']])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(
+            sum(pages, []), list(Notification.objects.filter(user=self.tenant_user).order_by('-timestamp', '-pk').values_list('pk', flat=True)),
+        )
+        self.assertEqual(data['notifications'][0]['related_object']['label'], str(self.lease))
+        self.assertEqual(self.client.get(reverse('notification_inbox'), {'cursor': 'bad'}).status_code, 400)
+
+    def test_unread_count_is_cached_and_updated(self):
+        cache.clear()
+        user_id = self.tenant_user.pk
+        self.assertEqual(NotificationService.unread_count(user_id), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.fan_out([user_id], 'One')
+            NotificationService.fan_out([user_id], 'Two')
+            notification = Notification.objects.create(user=self.tenant_user, message='Three')
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.unread_count(user_id), 3)
+
+        self.client.force_login(self.tenant_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notification_mark_read', kwargs={'pk': notification.pk}))
+        self.assertEqual(json.loads(response.content)['success'], True)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.unread_count(user_id), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('notification_mark_all_read'))
+        self.assertEqual(json.loads(response.content)['updated'], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationService.unread_count(user_id), 0)
+        self.assertFalse(Notification.objects.filter(user_id=user_id, read=False).exists())
+
+
+class SharedStateTranslator:
+    """Stub with deep_translator's shared per-call state: the text is stored on the instance"""
+
+    barrier = None
+
+    def __init__(self, source, target):
+        self._texts = None
+
+    def translate_batch(self, texts):
+        self._texts = texts
+        self.barrier.wait(timeout=5)  # both threads have stored their text
+        return [f'EN {text}' for text in self._texts]
+
+
+@override_settings(TRANSLATION_BACKEND='google')
+class TranslationThreadTests(TransactionTestCase):
+
+    def test_concurrent_fills_keep_their_own_text(self):
+        buildings = Building.objects.bulk_create([Building(name_ar='برج', address='Muscat'), Building(name_ar='مبنى', address='Muscat')])
+        SharedStateTranslator.barrier = threading.Barrier(2)
+        errors = []
+
+        def fill(building):
+            try:
+                TranslationService.fill(Building, building.pk, [('name_en', building.name_ar)])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        with mock.patch('deep_translator.GoogleTranslator', SharedStateTranslator):
+            threads = [threading.Thread(target=fill, args=(building,)) for building in buildings]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(Building.objects.values_list('name_ar', 'name_en')), [('برج', 'EN برج'), ('مبنى', 'EN مبنى')],
+        )
+        self.assertEqual(
+            sorted(TranslationCache.objects.values_list('source_text', 'translated_text')),
+            [('برج', 'EN برج'), ('مبنى', 'EN مبنى')],
+        )
+
+
+class DocumentJobTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.lease = create_lease()
+
+    def test_cancelling_lease_queues_a_single_notice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lease.status = 'cancelled'
+            self.lease.save()
+            DocumentJobService.enqueue(self.lease, 'cancellation_notice')
+
+        job = DocumentJob.objects.get()
+        self.assertEqual((job.kind, job.status), ('cancellation_notice', 'queued'))
+        self.assertEqual(job.document.status, 'pending')
+        self.assertEqual(Document.objects.count(), 1)
+
+    def test_worker_generates_document(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentJobService.enqueue(self.lease, 'cancellation_notice')
+
+        with mock.patch('dashboard.document_job_service.generate_pdf_bytes', return_value=b'%PDF-1.4 test'):
+            self.assertEqual(DocumentJobService.run_pending(worker_id='test'), 1)
+
+        job = DocumentJob.objects.select_related('document').get()
+        self.assertEqual((job.status, job.attempts), ('done', 1))
+        self.assertEqual(job.document.status, 'ready')
+        self.assertTrue(job.document.file.name.endswith('.pdf'))
+        self.assertIsNone(DocumentJobService.claim('test'))
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentJobService.enqueue(self.lease, 'renewal_notice')
+
+        with mock.patch('dashboard.document_job_service.generate_pdf_bytes', side_effect=RuntimeError('boom')):
+            for attempt in range(1, DocumentJobService.MAX_ATTEMPTS + 1):
+                DocumentJob.objects.update(run_after=timezone.now())
+                job = DocumentJobService.claim('test')
+                self.assertEqual(job.attempts, attempt)
+                self.assertFalse(DocumentJobService.process(job))
+
+        job = DocumentJob.objects.select_related('document').get()
+        self.assertEqual((job.status, job.last_error), ('failed', 'boom'))
+        self.assertEqual(job.document.status, 'failed')
+
+    def test_claim_skips_jobs_taken_by_another_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentJobService.enqueue(self.lease, 'initial_invoice')
+        self.assertIsNotNone(DocumentJobService.claim('worker-1'))
+        self.assertIsNone(DocumentJobService.claim('worker-2'))
+
+
+class PDFCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        override = override_settings(PDF_CACHE_DIR=self.cache_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        render = mock.patch('dashboard.pdf_cache_service.generate_pdf_bytes', return_value=b'%PDF-1.4 receipt')
+        self.render = render.start()
+        self.addCleanup(render.stop)
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True))
+        self.lease = create_lease()
+        self.payment = create_payment(self.lease, 2024, 1, '100.00')
+
+    def get_receipt(self, **headers):
+        return self.client.get(reverse('report_payment_receipt', kwargs={'pk': self.payment.pk}), headers=headers)
+
+    def test_repeat_download_is_served_from_cache(self):
+        first = self.get_receipt()
+        second = self.get_receipt()
+
+        self.assertEqual(b''.join(second.streaming_content), b'%PDF-1.4 receipt')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.get_receipt()['ETag']
+
+        response = self.get_receipt(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_payment_change_invalidates_cached_pdf(self):
+        etag = self.get_receipt()['ETag']
+        self.payment.amount = Decimal('90.00')
+        self.payment.save()
+
+        response = self.get_receipt(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_least_recently_used_files_are_evicted(self):
+        keys = [f'{i:064x}' for i in range(3)]
+        with override_settings(PDF_CACHE_MAX_BYTES=len(b'%PDF-1.4 receipt') * 2):
+            for key in keys:
+                PDFCacheService.get_or_render('lease_1', key, 'dashboard/reports/payment_receipt.html', {})
+        cached = sorted(name[:-4] for name in os.listdir(os.path.join(self.cache_dir, 'lease_1')))
+        self.assertNotIn(keys[0], cached)
+        self.assertIn(keys[2], cached)
+
+
+class PDFRendererTests(TestCase):
+
+    def test_static_resources_are_read_from_disk_once(self):
+        renderer = PDFRenderer()
+        fallback = mock.Mock(side_effect=AssertionError('static files must not be fetched remotely'))
+
+        for _i in range(2):
+            url, body, mime_type = renderer._fetch('file:///static/fonts/Amiri-Regular.ttf', fallback)
+
+        self.assertTrue(body)
+        self.assertEqual(renderer._resources_size, len(body))
+        self.assertEqual(len(renderer._resources), 1)
+
+    def test_remote_resources_are_cached(self):
+        renderer = PDFRenderer()
+        fallback = mock.Mock(return_value=('https://fonts.example/font.woff2', b'font', 'font/woff2'))
+
+        for _i in range(3):
+            renderer._fetch('https://fonts.example/font.woff2', fallback)
+
+        fallback.assert_called_once()
+
+
+def fake_render_item(kind, pk, extra):
+    """Stand-in for batch_export_service._render_item in worker processes (must be picklable)"""
+    return f'{kind}_{pk}.pdf', f'pdf {pk}'.encode(), None
+
+
+class BatchPDFExportTests(TestCase):
+
+    def setUp(self):
+        self.lease = create_lease(start_date=datetime.date(2024, 1, 1))
+        other = create_lease(start_date=datetime.date(2024, 1, 1), contract_number='C-2')
+        self.payments = [
+            create_payment(self.lease, 2024, 1, '100.00', payment_date=datetime.date(2024, 2, 3)),
+            create_payment(self.lease, 2024, 2, '100.00', payment_date=datetime.date(2024, 2, 20)),
+            create_payment(other, 2024, 2, '100.00', payment_date=datetime.date(2024, 2, 5)),
+            create_payment(self.lease, 2024, 3, '100.00', payment_date=datetime.date(2024, 3, 2)),
+        ]
+        render = mock.patch('dashboard.utils.generate_pdf_bytes', return_value=b'%PDF-1.4 batch')
+        self.render = render.start()
+        self.addCleanup(render.stop)
+
+    def test_items_are_filtered_by_building_and_month(self):
+        items = BatchPDFExportService.get_items(
+            'receipts', building_id=self.lease.unit.building_id, month='2024-02',
+        )
+        self.assertEqual([pk for _kind, pk, _extra in items], [self.payments[0].pk, self.payments[1].pk])
+
+    def test_zip_is_streamed_member_by_member(self):
+        items = BatchPDFExportService.get_items('statements')
+        chunks = list(BatchPDFExportService.stream_zip(items, processes=1))
+
+        self.assertEqual(len(chunks), len(items) + 1)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(archive.namelist(), ['statement_C-1.pdf', 'statement_C-2.pdf'])
+        self.assertEqual(archive.read('statement_C-1.pdf'), b'%PDF-1.4 batch')
+
+    def test_failed_renders_are_listed_in_errors_file(self):
+        self.render.side_effect = [b'%PDF-1.4 batch', RuntimeError('boom')]
+        items = BatchPDFExportService.get_items('statements')
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(BatchPDFExportService.stream_zip(items, processes=1))))
+
+        self.assertEqual(archive.namelist(), ['statement_C-1.pdf', 'errors.txt'])
+        self.assertIn('statement_C-2.pdf: boom', archive.read('errors.txt').decode())
+
+    def test_export_view_streams_zip_in_process(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True))
+
+        with mock.patch('dashboard.batch_export_service.ProcessPoolExecutor') as pool:
+            response = self.client.get(reverse('export_pdf_batch'), {'kind': 'receipts', 'month': '2024-03'})
+            archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        pool.assert_not_called()
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(archive.namelist(), [f'receipt_C-1_{self.payments[3].pk}.pdf'])
+
+    @override_settings(BATCH_EXPORT_REQUEST_MAX_ITEMS=3)
+    def test_export_view_refuses_large_batches(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True))
+        response = self.client.get(reverse('export_pdf_batch'), {'kind': 'receipts'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_worker_pool_keeps_order(self):
+        items = [('statements', pk, None) for pk in range(7)]
+        with mock.patch('dashboard.batch_export_service._render_item', fake_render_item):
+            results = list(BatchPDFExportService.render(items, processes=2))
+        self.assertEqual(results, [(f'statements_{pk}.pdf', f'pdf {pk}'.encode(), None) for pk in range(7)])
+
+
+class StreamingExcelExportTests(TestCase):
+
+    def setUp(self):
+        lease = create_lease()
+        create_payment(lease, 2020, 1, '100.00', payment_date=datetime.date(2020, 1, 3))
+        create_payment(lease, 2020, 2, '60.00', payment_method='check', payment_date=datetime.date(2020, 2, 3))
+        create_payment(lease, 2020, 3, '40.00', payment_method='bank_transfer', payment_date=datetime.date(2020, 3, 3))
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True))
+
+    def get_workbook(self, response):
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return load_workbook(io.BytesIO(content)).active
+
+    def test_streaming_export_matches_in_memory_export(self):
+        legacy = self.client.get(reverse('export_payments_excel'), {'stream': '0'})
+        streaming = self.client.get(reverse('export_payments_excel'), {'stream': '1'})
+
+        self.assertFalse(legacy.streaming)
+        self.assertTrue(streaming.streaming)
+        legacy_sheet, streaming_sheet = self.get_workbook(legacy), self.get_workbook(streaming)
+        self.assertEqual(list(streaming_sheet.iter_rows(values_only=True)), list(legacy_sheet.iter_rows(values_only=True)))
+        self.assertEqual(
+            sorted(str(cells) for cells in streaming_sheet.merged_cells.ranges),
+            sorted(str(cells) for cells in legacy_sheet.merged_cells.ranges),
+        )
+        self.assertEqual(streaming_sheet['D4'].number_format, legacy_sheet['D4'].number_format)
+
+    @override_settings(EXCEL_STREAMING_THRESHOLD=2)
+    def test_large_exports_stream_by_default(self):
+        response = self.client.get(reverse('export_payments_excel'))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.get_workbook(response)['B4'].value, 'C-1')
+
+    def test_rows_share_named_styles(self):
+        exporter = StreamingExcelExporter("test")
+        exporter.add_title("test", num_columns=3).create_header(["a", "b", "c"])
+        exporter.add_rows(([i, Decimal(i), 'x'] for i in range(500)), number_formats=[None, 'currency', None])
+
+        self.assertEqual(len(exporter.wb.named_styles), len(exporter._styles) + 1)  # + openpyxl's "Normal"
+        self.assertEqual(len(exporter._styles), 4)
+        self.assertEqual(exporter.current_row, 503)
+        exporter.save(io.BytesIO())
+
+
+class BackupServiceTests(TestCase):
+
+    def setUp(self):
+        self.backup_dir = tempfile.mkdtemp()
+        self.media_root = tempfile.mkdtemp()
+        for directory in (self.backup_dir, self.media_root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(BACKUP_DIR=self.backup_dir, MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media_root, 'docs'))
+        for name, content in [('docs/a.pdf', b'same'), ('docs/b.pdf', b'same'), ('logo.png', b'logo')]:
+            with open(os.path.join(self.media_root, name), 'wb') as f:
+                f.write(content)
+        self.lease = create_lease()
+
+    def count_objects(self):
+        return sum(
+            len(files) for root, _dirs, files in os.walk(BackupService.objects_dir())
+            if root != BackupService.objects_dir()
+        )
+
+    def test_backup_contains_database_and_media_manifest(self):
+        path = BackupService.create_backup()
+
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(sorted(archive.namelist()), ['db.json', 'manifest.json'])
+            objects = json.loads(archive.read('db.json'))
+            manifest = json.loads(archive.read('manifest.json'))
+        self.assertIn(
+            ('dashboard.lease', self.lease.contract_number),
+            {(obj['model'], obj['fields'].get('contract_number')) for obj in objects},
+        )
+        self.assertEqual(sorted(manifest['media']), ['docs/a.pdf', 'docs/b.pdf', 'logo.png'])
+        self.assertEqual(manifest['media']['docs/a.pdf'], manifest['media']['docs/b.pdf'])
+
+    def test_unchanged_media_is_stored_once(self):
+        BackupService.create_backup()
+        self.assertEqual(self.count_objects(), 2)
+        with mock.patch.object(BackupService, 'hash_file', wraps=BackupService.hash_file) as hash_file:
+            BackupService.create_backup()
+        hash_file.assert_not_called()
+        self.assertEqual(self.count_objects(), 2)
+
+    def test_portable_backup_embeds_media(self):
+        path = BackupService.create_backup(portable=True)
+
+        with zipfile.ZipFile(path) as archive:
+            self.assertEqual(archive.read('media/logo.png'), b'logo')
+
+    def test_prune_applies_retention_and_sweeps_objects(self):
+        for day in range(1, 5):
+            with mock.patch('dashboard.backup_service.datetime') as fake_datetime:
+                fake_datetime.now.return_value = datetime.datetime(2024, 1, day, 12, 0)
+                BackupService.create_backup()
+            if day == 1:
+                os.remove(os.path.join(self.media_root, 'logo.png'))
+
+        deleted, removed_objects = BackupService.prune(keep_last=1, keep_daily=2)
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(
+            [os.path.basename(path) for path in BackupService.list_backups()],
+            ['backup_20240104_120000.zip', 'backup_20240103_120000.zip'],
+        )
+        self.assertEqual(removed_objects, 1)  # logo.png is only in the deleted backups
+        self.assertEqual(self.count_objects(), 1)
+
+    def test_logout_does_not_wait_for_backup(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True))
+        with mock.patch.object(BackupService, 'schedule') as schedule, \
+                mock.patch.object(BackupService, 'create_backup') as create_backup:
+            response = self.client.post(reverse('dashboard_custom_logout'))
+
+        self.assertEqual(response.status_code, 302)
+        schedule.assert_called_once_with()
+        create_backup.assert_not_called()
+
+    def test_concurrent_backup_is_skipped(self):
+        self.assertTrue(BackupService._acquire_lock())
+        self.addCleanup(BackupService._release_lock)
+
+        self.assertIsNone(BackupService.run())
+        self.assertEqual(BackupService.list_backups(), [])
+
+    def test_prune_only_waits_for_running_backup(self):
+        part = os.path.join(self.backup_dir, 'backup_20240101_120000.zip.part')
+        with open(part, 'wb') as f:
+            f.write(b'in progress')
+        self.assertTrue(BackupService._acquire_lock())
+        out = io.StringIO()
+        call_command('create_backup', '--prune-only', stdout=out)
+        self.assertIn('Another backup is running', out.getvalue())
+        self.assertTrue(os.path.exists(part))
+
+        BackupService._release_lock()
+        call_command('create_backup', '--prune-only', stdout=io.StringIO())
+        self.assertFalse(os.path.exists(part))
+        self.assertTrue(BackupService._acquire_lock())  # released again
+        BackupService._release_lock()
+
+
+class RestoreServiceTests(TestCase):
+
+    def setUp(self):
+        self.backup_dir = tempfile.mkdtemp()
+        self.media_root = tempfile.mkdtemp()
+        for directory in (self.backup_dir, self.media_root):
+            self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(BACKUP_DIR=self.backup_dir, MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media_root, 'docs'))
+        with open(os.path.join(self.media_root, 'docs', 'lease.pdf'), 'wb') as f:
+            f.write(b'%PDF-1.4 lease')
+        self.lease = create_lease()
+        for month in range(1, 6):
+            create_payment(self.lease, 2020, month, '100.00')
+        self.user = User.objects.create_user('staff', 'staff@example.com', 'pass', is_staff=True)
+        Notification.objects.create(user=self.user, message='Payment received')
+
+    def test_json_array_is_read_in_chunks(self):
+        data = json.dumps([{'n': i, 'text': 'x' * 50} for i in range(20)]).encode()
+
+        self.assertEqual([item['n'] for item in iter_json_array(io.BytesIO(data), chunk_size=16)], list(range(20)))
+        self.assertEqual(list(iter_json_array(io.BytesIO(b' [ ] '))), [])
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.BytesIO(b'[{"n": 1}, '), chunk_size=4))
+
+    def test_backup_round_trip(self):
+        path = BackupService.create_backup()
+        Payment.objects.all().delete()
+        Notification.objects.all().delete()
+        os.remove(os.path.join(self.media_root, 'docs', 'lease.pdf'))
+        MonthlyFinancialRollup.objects.all().delete()
+        progress = []
+
+        result = RestoreService(progress=lambda *args: progress.append(args), batch_size=2).restore(path)
+
+        self.assertEqual(Payment.objects.filter(lease=self.lease).count(), 5)
+        self.assertEqual(Notification.objects.get().user, self.user)
+        with open(os.path.join(self.media_root, 'docs', 'lease.pdf'), 'rb') as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 lease')
+        self.assertEqual(result['media_files'], 1)
+        self.assertEqual(MonthlyFinancialRollup.objects.get(year=2020, month=1).income, Decimal('100.00'))
+        self.assertIn(('media', 1, 1), progress)
+        self.assertEqual(progress[-2][0], 'database')
+
+    def test_restore_updates_existing_rows(self):
+        path = BackupService.create_backup()
+        Lease.objects.filter(pk=self.lease.pk).update(monthly_rent=Decimal('999.00'))
+
+        RestoreService().restore(path)
+
+        self.assertEqual(Lease.objects.get(pk=self.lease.pk).monthly_rent, Decimal('100.00'))
+
+    def test_legacy_archive_with_media_members(self):
+        path = os.path.join(self.backup_dir, 'backup_legacy.zip')
+        fixture = [{'model': 'dashboard.building', 'pk': 900, 'fields': {'name': 'Old', 'address': 'Sur'}}]
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('db.json', json.dumps(fixture, indent=2))
+            archive.writestr('media/logo.png', b'logo')
+
+        result = RestoreService(io_threads=2).restore(path)
+
+        self.assertEqual(result['objects'], 1)
+        self.assertEqual(Building.objects.get(pk=900).name, 'Old')
+        with open(os.path.join(self.media_root, 'logo.png'), 'rb') as f:
+            self.assertEqual(f.read(), b'logo')
+
+    def test_media_paths_cannot_escape_media_root(self):
+        path = os.path.join(self.backup_dir, 'backup_evil.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('media/../../evil.txt', b'x')
+
+        with self.assertRaises(ValueError):
+            RestoreService().restore_media(path)
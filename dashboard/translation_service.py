@@ -0,0 +1,262 @@
+"""
+Translation Service for the automatic English translation of Arabic fields
+"""
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Building, Expense, Tenant, TranslationCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationService:
+    """
+    Service class for filling the ``*_en`` fields from their ``*_ar`` value
+
+    Translations go through a phrase cache (``TranslationCache``) keyed by a
+    hash of the source text, so each distinct text reaches the backend once.
+    The backend is selected by TRANSLATION_BACKEND:
+
+    - 'google': deep-translator's GoogleTranslator (network). Saves never
+      wait for it: missing translations are filled after the transaction
+      commits, in a background thread (or inline with TRANSLATION_ASYNC =
+      False), with an UPDATE that leaves values typed in meanwhile alone.
+    - 'dictionary': exact phrases from TRANSLATION_DICTIONARY, applied
+      in-process while saving.
+    - 'none': no automatic translation.
+
+    A failed translation leaves the English field empty (pages fall back to
+    Arabic); ``backfill_translations`` fills the gaps in bulk.
+    """
+
+    SOURCE_LANGUAGE = 'ar'
+    TARGET_LANGUAGE = 'en'
+    LOCAL_BACKENDS = ('dictionary', 'none')
+
+    # model -> (Arabic field, English field) pairs
+    FIELDS = {
+        Building: [('name_ar', 'name_en'), ('address_ar', 'address_en')],
+        Tenant: [('name_ar', 'name_en'), ('authorized_signatory_ar', 'authorized_signatory_en')],
+        Expense: [('description_ar', 'description_en')],
+    }
+
+    _clients = threading.local()  # deep_translator keeps per-call state on the translator
+    _executor = None
+
+    @classmethod
+    def get_backend(cls):
+        return getattr(settings, 'TRANSLATION_BACKEND', 'google')
+
+    @classmethod
+    def source_hash(cls, text):
+        key = f"{cls.SOURCE_LANGUAGE}>{cls.TARGET_LANGUAGE}\n{text}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    # ---- backends -------------------------------------------------------
+
+    @classmethod
+    def _translate_via_google(cls, texts):
+        translator = getattr(cls._clients, 'google', None)
+        if translator is None:
+            from deep_translator import GoogleTranslator
+            translator = cls._clients.google = GoogleTranslator(source=cls.SOURCE_LANGUAGE, target=cls.TARGET_LANGUAGE)
+        return translator.translate_batch(texts)
+
+    @classmethod
+    def _translate_via_dictionary(cls, texts):
+        dictionary = getattr(settings, 'TRANSLATION_DICTIONARY', {})
+        return [dictionary.get(text) for text in texts]
+
+    @classmethod
+    def _translate_batch(cls, texts):
+        """
+        Translate texts with the configured backend
+
+        Returns:
+            list: Translation or None, per text
+        """
+        backend = cls.get_backend()
+        try:
+            if backend == 'google':
+                return cls._translate_via_google(texts)
+            elif backend == 'dictionary':
+                return cls._translate_via_dictionary(texts)
+            elif backend != 'none':
+                logger.error(f"Unknown translation backend: {backend}")
+        except Exception as e:
+            logger.error(f"Translation error ({backend}, {len(texts)} texts): {str(e)}")
+        return [None] * len(texts)
+
+    # ---- phrase cache ---------------------------------------------------
+
+    @classmethod
+    def translate(cls, texts, batch_size=None):
+        """
+        Translate texts through the phrase cache
+
+        Args:
+            texts: Iterable of Arabic texts (duplicates are translated once)
+            batch_size: Texts per backend call (TRANSLATION_BATCH_SIZE)
+
+        Returns:
+            dict: text -> translation, for the texts that could be translated
+        """
+        texts = {text.strip() for text in texts if text and text.strip()}
+        if not texts:
+            return {}
+        hashes = {cls.source_hash(text): text for text in texts}
+        translations = {
+            hashes[source_hash]: translated
+            for source_hash, translated in TranslationCache.objects.filter(
+                source_hash__in=list(hashes)
+            ).values_list('source_hash', 'translated_text')
+        }
+
+        missing = sorted(texts - translations.keys())
+        batch_size = batch_size or getattr(settings, 'TRANSLATION_BATCH_SIZE', 50)
+        backend = cls.get_backend()
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            new_entries = []
+            for text, translated in zip(batch, cls._translate_batch(batch)):
+                if translated and translated.strip():
+                    translations[text] = translated.strip()
+                    new_entries.append(TranslationCache(
+                        source_hash=cls.source_hash(text), source_language=cls.SOURCE_LANGUAGE,
+                        target_language=cls.TARGET_LANGUAGE, source_text=text,
+                        translated_text=translated.strip(), backend=backend,
+                    ))
+            TranslationCache.objects.bulk_create(new_entries, ignore_conflicts=True)
+        return translations
+
+    # ---- model fields ---------------------------------------------------
+
+    @classmethod
+    def missing_fields(cls, instance):
+        """
+        Get the fields of an instance that have Arabic text but no English text
+
+        Returns:
+            list: (English field, Arabic text) tuples
+        """
+        missing = []
+        for ar_field, en_field in cls.FIELDS.get(type(instance), []):
+            text = getattr(instance, ar_field, None)
+            if text and text.strip() and not getattr(instance, en_field, None):
+                missing.append((en_field, text.strip()))
+        return missing
+
+    @classmethod
+    def prepare(cls, instance):
+        """
+        Fill what can be filled without waiting before ``instance`` is saved
+
+        Local backends fill the English fields right away; otherwise the
+        missing fields are remembered for ``schedule``.
+        """
+        missing = cls.missing_fields(instance)
+        instance._translation_pending = None
+        if not missing:
+            return
+        if cls.get_backend() in cls.LOCAL_BACKENDS:
+            # No phrase cache lookup: the backend is as fast as the cache
+            texts = [text for _field, text in missing]
+            for (en_field, _text), translated in zip(missing, cls._translate_batch(texts)):
+                if translated:
+                    setattr(instance, en_field, translated)
+        else:
+            instance._translation_pending = missing
+
+    @classmethod
+    def schedule(cls, instance):
+        """Translate the fields remembered by ``prepare`` once the transaction commits"""
+        missing = instance.__dict__.pop('_translation_pending', None)
+        if not missing:
+            return
+        model, pk = type(instance), instance.pk
+        transaction.on_commit(lambda: cls.submit(model, pk, missing))
+
+    @classmethod
+    def submit(cls, model, pk, missing):
+        if not getattr(settings, 'TRANSLATION_ASYNC', True):
+            cls.fill(model, pk, missing)
+            return
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TRANSLATION_WORKERS', 2), thread_name_prefix='translation',
+            )
+        cls._executor.submit(cls._fill_in_thread, model, pk, missing)
+
+    @classmethod
+    def _fill_in_thread(cls, model, pk, missing):
+        try:
+            cls.fill(model, pk, missing)
+        except Exception:
+            logger.exception(f"Background translation of {model.__name__} {pk} failed")
+        finally:
+            connection.close()
+
+    @classmethod
+    def fill(cls, model, pk, missing):
+        """
+        Translate and store the English fields of one row
+
+        Args:
+            model: Model class
+            pk: Primary key of the row
+            missing: (English field, Arabic text) tuples
+
+        Returns:
+            int: Number of fields filled
+        """
+        translations = cls.translate(text for _field, text in missing)
+        filled = 0
+        for en_field, text in missing:
+            if text in translations:
+                filled += model._default_manager.filter(
+                    Q(**{en_field: ''}) | Q(**{f'{en_field}__isnull': True}), pk=pk,
+                ).update(**{en_field: translations[text]})
+        return filled
+
+    @classmethod
+    def backfill(cls, models=None, batch_size=None, dry_run=False):
+        """
+        Fill every empty English field, translating each distinct text once
+
+        Args:
+            models: Model classes to process (default: all of FIELDS)
+            batch_size: Texts per backend call
+            dry_run: Only count the texts to translate
+
+        Returns:
+            dict: texts (distinct texts needed), translated, and rows updated
+        """
+        pending = []
+        for model in models or cls.FIELDS:
+            for ar_field, en_field in cls.FIELDS[model]:
+                empty = Q(**{en_field: ''}) | Q(**{f'{en_field}__isnull': True})
+                texts = (
+                    model._default_manager.filter(empty).exclude(**{ar_field: ''})
+                    .exclude(**{f'{ar_field}__isnull': True}).order_by()
+                    .values_list(ar_field, flat=True).distinct()
+                )
+                pending.extend((model, ar_field, en_field, text) for text in texts if text.strip())
+
+        texts = {text.strip() for _model, _ar, _en, text in pending}
+        result = {'texts': len(texts), 'translated': 0, 'rows': 0}
+        if dry_run or not texts:
+            return result
+        translations = cls.translate(texts, batch_size)
+        result['translated'] = len(translations)
+        for model, ar_field, en_field, text in pending:
+            if text.strip() in translations:
+                result['rows'] += model._default_manager.filter(
+                    Q(**{en_field: ''}) | Q(**{f'{en_field}__isnull': True}), **{ar_field: text},
+                ).update(**{en_field: translations[text.strip()]})
+        return result
@@ -1,6 +1,6 @@
 from django.urls import path
 from .views import (
-    DashboardHomeView,
+    DashboardHomeView, calendar_events,
     TenantListView, TenantDetailView, TenantCreateView, TenantUpdateView, TenantDeleteView,
     UnitListView, UnitDetailView, UnitCreateView, UnitUpdateView, UnitDeleteView,
     BuildingListView, BuildingCreateView, BuildingUpdateView, BuildingDeleteView,
@@ -32,6 +32,9 @@ from .auth_views import (
 from .otp_views import (
     send_otp_view, verify_otp_view, setup_phone_number, verify_phone_number, send_phone_verification_otp
 )
+from .notification_views import (
+    notification_inbox, notification_unread_count, notification_mark_read, notification_mark_all_read,
+)
 from .export_views import (
     export_tenants_excel,
     export_leases_excel,
@@ -40,10 +43,12 @@ from .export_views import (
     export_buildings_excel,
     export_units_excel,
     export_maintenance_excel,
+    export_pdf_batch,
 )
 
 urlpatterns = [
     path('', DashboardHomeView.as_view(), name='dashboard_home'),
+    path('calendar/events/', calendar_events, name='calendar_events'),
     # Backup & Custom Logout
     path('backup/', backup_now, name='dashboard_backup_now'),
     path('backup/restore/', backup_restore_page, name='dashboard_backup_restore_page'),
@@ -145,6 +150,7 @@ urlpatterns = [
     path('export/buildings/', export_buildings_excel, name='export_buildings_excel'),
     path('export/units/', export_units_excel, name='export_units_excel'),
     path('export/maintenance/', export_maintenance_excel, name='export_maintenance_excel'),
+    path('export/pdf-batch/', export_pdf_batch, name='export_pdf_batch'),
 
     # Invoices
     path('invoices/', InvoiceListView.as_view(), name='invoice_list'),
@@ -153,6 +159,12 @@ urlpatterns = [
     path('invoices/<int:pk>/edit/', InvoiceUpdateView.as_view(), name='invoice_update'),
     path('invoices/<int:pk>/delete/', InvoiceDeleteView.as_view(), name='invoice_delete'),
     
+    # Notifications
+    path('notifications/', notification_inbox, name='notification_inbox'),
+    path('notifications/unread-count/', notification_unread_count, name='notification_unread_count'),
+    path('notifications/<int:pk>/read/', notification_mark_read, name='notification_mark_read'),
+    path('notifications/read-all/', notification_mark_all_read, name='notification_mark_all_read'),
+
     # Authentication & Profile
     path('profile/', user_profile, name='profile'),
     path('setup-phone/', setup_phone_number, name='setup_phone'),
@@ -41,15 +41,12 @@ def generate_pdf_receipt(template_path: str, context: dict) -> HttpResponse:
 # باستخدام WeasyPrint (موصى به للعربية)
 def render_to_pdf_weasyprint(template_path: str, context: dict) -> HttpResponse:
     try:
-        from weasyprint import HTML
-        import tempfile
+        from .pdf_renderer import get_renderer
 
-        template = get_template(template_path)
-        html = template.render(context)
-
-        # إنشاء ملف PDF
-        pdf_file = HTML(string=html, base_url=settings.BASE_DIR).write_pdf()
+        # إنشاء ملف PDF باستخدام المحرك المُهيأ مسبقاً (الخطوط والأنماط محملة مرة واحدة)
+        pdf_file = get_renderer().render(template_path, context)
 
+        filename = _build_pdf_filename(context)
         response = HttpResponse(pdf_file, content_type='application/pdf')
         response['Content-Disposition'] = f'inline; filename="{filename}"'
         return response
@@ -72,6 +69,7 @@ def render_to_pdf(template_path: str, context: dict) -> HttpResponse:
         pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
 
         if not pdf.err:
+            filename = _build_pdf_filename(context)
             response = HttpResponse(result.getvalue(), content_type='application/pdf')
             response['Content-Disposition'] = f'inline; filename="{filename}"'
             return response
@@ -118,13 +116,8 @@ def render_to_pdf_weasyprint_bytes(template_path: str, context: dict) -> bytes:
     Generate PDF bytes using WeasyPrint.
     """
     try:
-        from weasyprint import HTML
-
-        template = get_template(template_path)
-        html = template.render(context)
-
-        pdf_bytes = HTML(string=html, base_url=settings.BASE_DIR).write_pdf()
-        return pdf_bytes
+        from .pdf_renderer import get_renderer
+        return get_renderer().render(template_path, context)
 
     except Exception as e:
         logger.error(f"WeasyPrint PDF generation failed: {e}")
@@ -232,16 +225,10 @@ def render_to_pdf_arabic(template_path: str, context: dict) -> bytes:
 
 def auto_translate_to_english(arabic_text):
     """
-    ترجمة تلقائية من العربية إلى الإنجليزية
+    ترجمة تلقائية من العربية إلى الإنجليزية (عبر ذاكرة الترجمة المحفوظة)
     """
     if not arabic_text or not arabic_text.strip():
         return ""
     
-    try:
-        from deep_translator import GoogleTranslator
-        translator = GoogleTranslator(source='ar', target='en')
-        translation = translator.translate(arabic_text)
-        return translation
-    except Exception as e:
-        logger.error(f"Translation error: {str(e)}")
-        return arabic_text
\ No newline at end of file
+    from .translation_service import TranslationService
+    return TranslationService.translate([arabic_text]).get(arabic_text.strip(), arabic_text)
@@ -1,11 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
 import os
-import io
-import zipfile
-import shutil
-import tempfile
 from datetime import datetime
-from django.core.management import call_command
 
 def login_redirect(request):
     if request.user.is_staff:
@@ -25,10 +20,8 @@ from django.utils import timezone
 from django.db.models import Sum, Count, Q
 from django.db import transaction
 from dateutil.relativedelta import relativedelta
-from io import BytesIO
-from django.core.files.base import ContentFile
-from django.http import HttpResponse
-from django.template.loader import get_template
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.conf import settings
 from django import forms
 import json
@@ -48,38 +41,23 @@ from .forms import (
     RealEstateOfficeForm, BuildingOwnerForm, CommissionAgreementForm, 
     RentCollectionForm, CommissionDistributionForm, SecurityDepositForm
 )
-from .utils import render_to_pdf, generate_pdf_bytes
+from .utils import render_to_pdf
+from .rollup_service import FinancialRollupService
+from .document_job_service import DocumentJobService
+from .pdf_cache_service import PDFCacheService
+from .occupancy_service import OccupancyService
+from .calendar_service import CalendarService
+from .company_service import CompanyService
+from .snapshot_service import DashboardSnapshotService
+from .backup_service import BackupService
+from .restore_service import RestoreService
 
 # --- Backup Utilities ---
 def perform_backup() -> str:
-    """Create a timestamped zip backup containing DB JSON dump and media files.
-    Returns the absolute path to the created backup file.
+    """Create a backup now (see BackupService).
+    Returns the absolute path to the created backup file, or None if another backup is running.
     """
-    backups_dir = os.path.join(str(settings.BASE_DIR), 'backups')
-    os.makedirs(backups_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_zip_path = os.path.join(backups_dir, f'backup_{timestamp}.zip')
-
-    # Create in-memory DB dump
-    db_io = io.StringIO()
-    call_command('dumpdata', '--natural-foreign', '--natural-primary', '--indent', '2', stdout=db_io)
-    db_data = db_io.getvalue().encode('utf-8')
-
-    with zipfile.ZipFile(backup_zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
-        # Add DB dump
-        zf.writestr('db.json', db_data)
-
-        # Add media directory if exists
-        media_root = getattr(settings, 'MEDIA_ROOT', None)
-        if media_root and os.path.isdir(media_root):
-            for root, dirs, files in os.walk(media_root):
-                for file in files:
-                    abs_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(abs_path, media_root)
-                    zf.write(abs_path, arcname=os.path.join('media', rel_path))
-
-    return backup_zip_path
+    return BackupService.run()
 
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -87,7 +65,10 @@ def perform_backup() -> str:
 def backup_now(request):
     try:
         path = perform_backup()
-        messages.success(request, _("تم إنشاء نسخة احتياطية بنجاح: ") + os.path.basename(path))
+        if path:
+            messages.success(request, _("تم إنشاء نسخة احتياطية بنجاح: ") + os.path.basename(path))
+        else:
+            messages.info(request, _("يوجد نسخ احتياطي قيد التنفيذ حالياً."))
     except Exception as e:
         logger.exception("Backup failed")
         messages.error(request, _("فشل إنشاء النسخة الاحتياطية."))
@@ -100,11 +81,11 @@ from django.contrib.auth import logout as auth_logout
 @user_passes_test(lambda u: u.is_staff)
 @require_POST
 def custom_logout(request):
-    """Trigger a backup, then log the user out and redirect to login page."""
+    """Start a background backup, then log the user out and redirect to login page."""
     try:
-        perform_backup()
+        BackupService.schedule()
     except Exception:
-        logger.exception("Backup during logout failed")
+        logger.exception("Scheduling the logout backup failed")
         # Proceed with logout even if backup fails
     auth_logout(request)
     messages.info(request, _("تم تسجيل الخروج."))
@@ -115,13 +96,9 @@ def custom_logout(request):
 @user_passes_test(lambda u: u.is_staff)
 def backup_restore_page(request):
     """Simple page to upload or select an existing backup to restore."""
-    backups_dir = os.path.join(str(settings.BASE_DIR), 'backups')
-    os.makedirs(backups_dir, exist_ok=True)
     available = []
     try:
-        for name in sorted(os.listdir(backups_dir), reverse=True):
-            if name.endswith('.zip'):
-                available.append(name)
+        available = [os.path.basename(path) for path in BackupService.list_backups()]
     except Exception:
         logger.exception("Failed listing backups")
     return render(request, 'dashboard/backup_restore.html', {
@@ -135,7 +112,7 @@ def restore_backup(request):
     """Restore database and media from a provided backup zip (upload or existing file name).
     WARNING: Restoring may overwrite existing data and media files.
     """
-    backups_dir = os.path.join(str(settings.BASE_DIR), 'backups')
+    backups_dir = BackupService.backup_dir()
     os.makedirs(backups_dir, exist_ok=True)
 
     uploaded = request.FILES.get('backup_file')
@@ -143,13 +120,13 @@ def restore_backup(request):
 
     if uploaded:
         # Save uploaded file to backups dir
-        target_path = os.path.join(backups_dir, uploaded.name)
+        target_path = os.path.join(backups_dir, os.path.basename(uploaded.name))
         with open(target_path, 'wb+') as dst:
             for chunk in uploaded.chunks():
                 dst.write(chunk)
         backup_zip_path = target_path
     elif chosen_name:
-        backup_zip_path = os.path.join(backups_dir, chosen_name)
+        backup_zip_path = os.path.join(backups_dir, os.path.basename(chosen_name))
         if not os.path.isfile(backup_zip_path):
             messages.error(request, _("الملف المحدد غير موجود."))
             return redirect('dashboard_backup_restore_page')
@@ -158,38 +135,12 @@ def restore_backup(request):
         return redirect('dashboard_backup_restore_page')
 
     try:
-        temp_dir = tempfile.mkdtemp(prefix='restore_', dir=backups_dir)
-        with zipfile.ZipFile(backup_zip_path, 'r') as zf:
-            zf.extractall(temp_dir)
-
-        # Restore DB if db.json present
-        db_json_path = os.path.join(temp_dir, 'db.json')
-        if os.path.isfile(db_json_path):
-            # Consider flushing? We avoid destructive flush by default.
-            call_command('loaddata', db_json_path)
-
-        # Restore media if present
-        extracted_media = os.path.join(temp_dir, 'media')
-        media_root = getattr(settings, 'MEDIA_ROOT', None)
-        if media_root and os.path.isdir(extracted_media):
-            for root, dirs, files in os.walk(extracted_media):
-                rel = os.path.relpath(root, extracted_media)
-                dest_dir = os.path.join(media_root, rel) if rel != '.' else media_root
-                os.makedirs(dest_dir, exist_ok=True)
-                for f in files:
-                    src = os.path.join(root, f)
-                    dst = os.path.join(dest_dir, f)
-                    shutil.copy2(src, dst)
-
+        result = RestoreService().restore(backup_zip_path)
+        logger.info(f"Restore of {os.path.basename(backup_zip_path)} by {request.user}: {result}")
         messages.success(request, _("تمت عملية الاسترجاع بنجاح."))
     except Exception:
         logger.exception("Restore failed")
         messages.error(request, _("فشلت عملية الاسترجاع. الرجاء التحقق من الملف والصلاحيات."))
-    finally:
-        try:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        except Exception:
-            pass
 
     return redirect('dashboard_backup_restore_page')
 
@@ -205,31 +156,10 @@ class DashboardHomeView(StaffRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        today = timezone.now()
-
-        # Stats Cards
-        active_leases = Lease.objects.filter(status__in=['active', 'expiring_soon'])
-        monthly_expenses = Expense.objects.filter(expense_date__year=today.year, expense_date__month=today.month).aggregate(total=Sum('amount'))['total'] or 0
-        expected_income = active_leases.aggregate(total=Sum('monthly_rent'))['total'] or 0
-
-        context['stats'] = {
-            'active_count': active_leases.count(),
-            'expected_monthly_income': expected_income,
-            'monthly_expenses': monthly_expenses,
-            'net_income': expected_income - monthly_expenses
-        }
-
-        # Financial Trend Chart (Last 12 months)
-        trend_chart = {'labels': [], 'income_data': [], 'expense_data': []}
-        for i in range(12, 0, -1):
-            date = today - relativedelta(months=i-1)
-            month_name_en = date.strftime("%b")
-            trend_chart['labels'].append(month_name_en)
-            monthly_income = Payment.objects.filter(payment_date__year=date.year, payment_date__month=date.month).aggregate(total=Sum('amount'))['total'] or 0
-            trend_chart['income_data'].append(float(monthly_income))
-            monthly_expenses_trend = Expense.objects.filter(expense_date__year=date.year, expense_date__month=date.month).aggregate(total=Sum('amount'))['total'] or 0
-            trend_chart['expense_data'].append(float(monthly_expenses_trend))
-        context['trend_chart'] = trend_chart
+        # Stats cards, trend chart, occupancy and expiring leases (shared cached snapshot)
+        snapshot = DashboardSnapshotService.get()
+        context['stats'] = snapshot['stats']
+        context['trend_chart'] = snapshot['trend_chart']
 
         # Recent financial movements (locked behind password)
         finance_unlocked = self.request.session.get('finance_unlocked', False)
@@ -250,37 +180,37 @@ class DashboardHomeView(StaffRequiredMixin, ListView):
 
         context['recent_requests'] = MaintenanceRequest.objects.order_by('-reported_date')[:5]
 
-        total_units = Unit.objects.count()
-        occupied_units = Unit.objects.filter(is_available=False).count()
-        available_units = total_units - occupied_units
+        occupancy = snapshot['occupancy']
         context['occupancy_chart'] = {
             'labels': [_("مشغولة"), _("متاحة")],
-            'data': [occupied_units, available_units],
+            'data': [occupancy['occupied_units'], occupancy['available_units']],
         }
-        # ADDED: Calendar data for renewals
-        renewals = Lease.objects.filter(end_date__gte=today.date())
-        calendar_events = []
-        for renewal in renewals:
-            calendar_events.append({
-                'title': f"{_('تجديد')}: {renewal.tenant.name} - {_('وحدة')} {renewal.unit.unit_number}",
-                'start': renewal.end_date.isoformat(),
-                'allDay': True,
-                'url': reverse('lease_detail', kwargs={'pk': renewal.pk}),
-                'extendedProps': {
-                    'contract_number': renewal.contract_number,
-                    'days_until_expiry': renewal.days_until_expiry()
-                }
-            })
-        context['calendar_events'] = json.dumps(calendar_events)
         # Alerts for expiring leases
-        expiring_soon = Lease.objects.filter(
-            status='expiring_soon',
-            end_date__gte=today.date()
-        ).order_by('end_date')[:5]
-        context['expiring_leases'] = expiring_soon
+        context['expiring_leases'] = snapshot['expiring_leases']
 
         return context
 
+# --- Calendar feed ---
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def calendar_events(request):
+    """Lease renewal events between the ``start`` and ``end`` dates sent by FullCalendar."""
+    try:
+        start = datetime.fromisoformat(request.GET['start'][:10]).date()
+        end = datetime.fromisoformat(request.GET['end'][:10]).date()
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest(_("يرجى تحديد بداية ونهاية الفترة."))
+    if end <= start or (end - start).days > 366:
+        return HttpResponseBadRequest(_("الفترة المطلوبة غير صالحة."))
+
+    body, etag = CalendarService.get_feed(start, end)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=settings.CALENDAR_FEED_CACHE_TIMEOUT)
+    return response
+
 # --- Finance Lock/Unlock ---
 @login_required
 @user_passes_test(lambda u: u.is_staff)
@@ -334,11 +264,12 @@ class UnitListView(StaffRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['buildings'] = Building.objects.all()
+        context['buildings'] = list(Building.objects.all())
         context['unit_type_choices'] = Unit.UNIT_TYPE_CHOICES
-        context['total_units'] = Unit.objects.count()
-        context['available_units'] = Unit.objects.filter(is_available=True).count()
-        context['occupied_units'] = Unit.objects.filter(is_available=False).count()
+        occupancy = OccupancyService.get_totals(context['buildings'])
+        context['total_units'] = occupancy['total_units']
+        context['available_units'] = occupancy['available_units']
+        context['occupied_units'] = occupancy['occupied_units']
         return context
 
 class UnitDetailView(StaffRequiredMixin, DetailView):
@@ -484,10 +415,7 @@ class BuildingListView(StaffRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        for building in context['buildings']:
-            building.total_units = building.unit_set.count()
-            building.occupied_units = building.unit_set.filter(is_available=False).count()
-            building.occupancy_rate = (building.occupied_units / building.total_units * 100) if building.total_units > 0 else 0
+        OccupancyService.set_building_rates(context['buildings'])
         return context
 
 class BuildingCreateView(StaffRequiredMixin, CreateView):
@@ -525,6 +453,11 @@ class BuildingDeleteView(StaffRequiredMixin, DeleteView):
     template_name = 'dashboard/building_confirm_delete.html'
     success_url = reverse_lazy('building_list')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['lease_counters'] = OccupancyService.get_building_lease_counters(self.object)
+        return context
+
     def form_valid(self, form):
         messages.success(self.request, _("تم حذف المبنى بنجاح."))
         return super().form_valid(form)
@@ -545,7 +478,7 @@ class LeaseListView(StaffRequiredMixin, ListView):
             queryset = Lease.objects.filter(status=status)
         else:
             queryset = Lease.objects.filter(status__in=['active', 'expiring_soon'])
-        queryset = queryset.order_by('-start_date')
+        queryset = queryset.select_related('tenant', 'unit__building').order_by('-start_date')
         search_query = self.request.GET.get('q', '')
         if search_query:
             queryset = queryset.filter(Q(contract_number__icontains=search_query) | Q(tenant__name__icontains=search_query) | Q(unit__unit_number__icontains=search_query))
@@ -561,12 +494,13 @@ class LeaseListView(StaffRequiredMixin, ListView):
         today = timezone.now()
         monthly_expenses = Expense.objects.filter(expense_date__year=today.year, expense_date__month=today.month).aggregate(total=Sum('amount'))['total'] or 0
         gross_income = active_leases.aggregate(total=Sum('monthly_rent'))['total'] or 0
+        occupancy = OccupancyService.get_totals()
         context['stats'] = {
             'active_count': active_leases.count(),
             'expiring_count': Lease.objects.filter(status='expiring_soon').count(),
             'expired_count': Lease.objects.filter(status='expired').count(),
-            'total_units': Unit.objects.count(),
-            'available_units': Unit.objects.filter(is_available=True).count(),
+            'total_units': occupancy['total_units'],
+            'available_units': occupancy['available_units'],
             'expected_monthly_income': gross_income,
             'monthly_expenses': monthly_expenses,
             'net_income': gross_income - monthly_expenses
@@ -639,25 +573,9 @@ class LeaseCancelView(StaffRequiredMixin, UpdateView):
         lease = form.save(commit=False)
         lease.status = 'cancelled'
         lease.cancellation_date = timezone.now().date()
-        lease.unit.is_available = True
-        lease.unit.save()
-        lease.save()
-        # Generate and attach cancellation PDF to Documents
-        try:
-            context = {
-                'lease': lease,
-                'today': timezone.now().date(),
-                'company': Company.objects.first(),
-            }
-            pdf_bytes = generate_pdf_bytes('dashboard/reports/lease_cancellation_notice.html', context)
-
-            filename = f"lease_cancellation_{lease.contract_number}.pdf"
-            doc = Document(lease=lease, title=_('استمارة إلغاء عقد') + f" - {lease.contract_number}")
-            doc.file.save(filename, ContentFile(pdf_bytes))
-            doc.save()
-        except Exception as e:
-            logger.exception("Failed to generate/save cancellation PDF for lease %s", lease.id)
-            messages.warning(self.request, _("تم إلغاء العقد، لكن تعذر إرفاق استمارة الإلغاء تلقائياً."))
+        lease.save()  # frees the unit
+        # Cancellation notice is generated by the document worker (same job as the one queued by the lease_event handler)
+        DocumentJobService.enqueue(lease, 'cancellation_notice')
         messages.success(self.request, _("تم إلغاء العقد بنجاح."))
         return super().form_valid(form)
 
@@ -691,26 +609,8 @@ def renew_lease(request, pk):
         # Then create the new lease (this will set unit as occupied again)
         new_lease = Lease.objects.create(unit=original_lease.unit, tenant=original_lease.tenant, contract_number=new_contract_number, monthly_rent=original_lease.monthly_rent, start_date=new_start_date, end_date=new_end_date, electricity_meter=original_lease.electricity_meter, water_meter=original_lease.water_meter)
 
-        # Ensure unit remains occupied after renewal
-        new_lease.unit.is_available = False; new_lease.unit.save()
-
-        # Attach renewal PDF notice to new lease documents
-        try:
-            context = {
-                'old_lease': original_lease,
-                'lease': new_lease,
-                'today': timezone.now().date(),
-                'company': Company.objects.first(),
-            }
-            pdf_bytes = generate_pdf_bytes('dashboard/reports/lease_renewal_notice.html', context)
-
-            filename = f"lease_renewal_{new_lease.contract_number}.pdf"
-            doc = Document(lease=new_lease, title=_('استمارة تجديد عقد') + f" - {new_lease.contract_number}")
-            doc.file.save(filename, ContentFile(pdf_bytes))
-            doc.save()
-        except Exception as e:
-            logger.exception("Failed to generate/save renewal PDF for new lease %s (from old %s)", new_lease.id, original_lease.id)
-            messages.warning(request, _("تم التجديد، لكن تعذر إرفاق استمارة التجديد تلقائياً."))
+        # Attach renewal PDF notice to new lease documents (generated by the document worker)
+        DocumentJobService.enqueue(new_lease, 'renewal_notice', params={'old_lease_id': original_lease.pk})
         messages.success(request, _("تم تجديد العقد بنجاح!")); return redirect('lease_detail', pk=new_lease.pk)
     return render(request, 'dashboard/lease_renew.html', {'lease': original_lease})
 
@@ -898,7 +798,7 @@ class SecurityDepositDeleteView(StaffRequiredMixin, DeleteView):
 class PaymentReceiptPDFView(View):
     def get(self, request, pk):
         try:
-            payment = Payment.objects.get(pk=pk)
+            payment = Payment.objects.select_related('lease__tenant', 'lease__unit__building').get(pk=pk)
             lease = payment.lease
 
             context = {
@@ -911,61 +811,15 @@ class PaymentReceiptPDFView(View):
                 'today': timezone.now().date(),
             }
 
-            # استخدام الدالة المباشرة بدلاً من generate_pdf_receipt
-            return self.render_pdf_receipt('dashboard/reports/payment_receipt.html', context)
+            return PDFCacheService.serve(
+                request, PDFCacheService.lease_scope(lease.pk), 'dashboard/reports/payment_receipt.html', context,
+                objects=[payment, lease, lease.tenant, lease.unit, lease.unit.building, context['today']],
+                filename=f"receipt_{payment.id}.pdf", company=context['company'],
+            )
 
         except Payment.DoesNotExist:
             return HttpResponse("Payment not found", status=404)
 
-    def render_pdf_receipt(self, template_path, context):
-        """دالة مساعدة لتوليد PDF"""
-        try:
-            # حاول استخدام WeasyPrint أولاً
-            from weasyprint import HTML
-
-            template = get_template(template_path)
-            html = template.render(context)
-
-            pdf_file = HTML(string=html, base_url=settings.BASE_DIR).write_pdf()
-
-            response = HttpResponse(pdf_file, content_type='application/pdf')
-            filename = f"receipt_{context['payment'].id}.pdf"
-            response['Content-Disposition'] = f'inline; filename="{filename}"'
-            return response
-
-        except ImportError:
-            # إذا لم يكن WeasyPrint مثبتاً، استخدم xhtml2pdf
-            return self.render_pdf_with_xhtml2pdf(template_path, context)
-        except Exception as e:
-            # في حالة الخطأ، ارجع HTML للتصحيح
-            template = get_template(template_path)
-            html = template.render(context)
-            return HttpResponse(f"Error: {str(e)}<hr>{html}")
-
-    def render_pdf_with_xhtml2pdf(self, template_path, context):
-        """استخدام xhtml2pdf كبديل"""
-        try:
-            from xhtml2pdf import pisa
-
-            template = get_template(template_path)
-            html = template.render(context)
-
-            result = BytesIO()
-            pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-
-            if not pdf.err:
-                response = HttpResponse(result.getvalue(), content_type='application/pdf')
-                filename = f"receipt_{context['payment'].id}.pdf"
-                response['Content-Disposition'] = f'inline; filename="{filename}"'
-                return response
-            else:
-                return HttpResponse("PDF generation failed")
-
-        except Exception as e:
-            template = get_template(template_path)
-            html = template.render(context)
-            return HttpResponse(f"PDF Error: {str(e)}<hr>{html}")
-
 # --- Check Management ---
 class CheckManagementView(StaffRequiredMixin, ListView):
     model = Payment
@@ -1226,7 +1080,11 @@ class InvoiceDeleteView(StaffRequiredMixin, DeleteView):
 # --- Reports ---
 class ReportSelectionView(StaffRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        return render(request, 'dashboard/report_selection.html')
+        context = {
+            'buildings': Building.objects.order_by('name'),
+            'lease_statuses': Lease.STATUS_CHOICES,
+        }
+        return render(request, 'dashboard/report_selection.html', context)
 
 # ADDED: Lease contracts report view
 class LeaseReportView(StaffRequiredMixin, ListView):
@@ -1273,25 +1131,35 @@ class LeaseReportView(StaffRequiredMixin, ListView):
 
 class GenerateTenantStatementPDF(StaffRequiredMixin, View):
     def get(self, request, lease_pk, *args, **kwargs):
-        lease = get_object_or_404(Lease, pk=lease_pk)
+        lease = get_object_or_404(Lease.objects.select_related('tenant', 'unit__building'), pk=lease_pk)
+        payments = list(lease.payments.all())
         context = {
             'lease': lease, 
-            'payments': lease.payments.all(), 
+            'payments': payments, 
             'today': timezone.now(),
-            'company': Company.objects.first() # ADDED
+            'company': CompanyService.get(request) # ADDED
         }
-        return render_to_pdf('dashboard/reports/tenant_statement.html', context)
+        return PDFCacheService.serve(
+            request, PDFCacheService.lease_scope(lease.pk), 'dashboard/reports/tenant_statement.html', context,
+            objects=[lease, lease.tenant, lease.unit, lease.unit.building, context['today'].date()] + payments,
+            filename=f"tenant_statement_{lease.contract_number}.pdf", company=context['company'],
+        )
 
 # ADDED
 class GeneratePaymentReceiptPDF(StaffRequiredMixin, View):
     def get(self, request, pk, *args, **kwargs):
-        payment = get_object_or_404(Payment, pk=pk)
+        payment = get_object_or_404(Payment.objects.select_related('lease__tenant', 'lease__unit__building'), pk=pk)
+        lease = payment.lease
         context = {
             'payment': payment,
-            'lease': payment.lease,
-            'company': Company.objects.first()
+            'lease': lease,
+            'company': CompanyService.get(request)
         }
-        return render_to_pdf('dashboard/reports/payment_receipt.html', context)
+        return PDFCacheService.serve(
+            request, PDFCacheService.lease_scope(lease.pk), 'dashboard/reports/payment_receipt.html', context,
+            objects=[payment, lease, lease.tenant, lease.unit, lease.unit.building],
+            filename=f"receipt_{payment.id}.pdf", company=context['company'],
+        )
 
 class GenerateMonthlyPLReportPDF(StaffRequiredMixin, View):
     def get(self, request, *args, **kwargs):
@@ -1301,12 +1169,11 @@ class GenerateMonthlyPLReportPDF(StaffRequiredMixin, View):
         year, month = int(year), int(month)
         income = Payment.objects.filter(payment_date__year=year, payment_date__month=month)
         expenses = Expense.objects.filter(expense_date__year=year, expense_date__month=month)
-        total_income = income.aggregate(total=Sum('amount'))['total'] or 0
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or 0
+        total_income, total_expenses = FinancialRollupService.get_totals(year, month)
         context = {
             'income_list': income, 'expenses_list': expenses, 'total_income': total_income,
             'total_expenses': total_expenses, 'net_profit': total_income - total_expenses,
-            'report_month': month, 'report_year': year, 'company': Company.objects.first() # ADDED
+            'report_month': month, 'report_year': year, 'company': CompanyService.get(request) # ADDED
         }
         return render_to_pdf('dashboard/reports/monthly_pl_report.html', context)
 
@@ -1319,30 +1186,28 @@ class GenerateAnnualPLReportPDF(StaffRequiredMixin, View):
         year = int(year)
         income = Payment.objects.filter(payment_date__year=year)
         expenses = Expense.objects.filter(expense_date__year=year)
-        total_income = income.aggregate(total=Sum('amount'))['total'] or 0
-        total_expenses = expenses.aggregate(total=Sum('amount'))['total'] or 0
+        total_income, total_expenses = FinancialRollupService.get_totals(year)
         context = {
             'income_list': income, 'expenses_list': expenses, 'total_income': total_income,
             'total_expenses': total_expenses, 'net_profit': total_income - total_expenses,
-            'report_year': year, 'company': Company.objects.first()
+            'report_year': year, 'company': CompanyService.get(request)
         }
         return render_to_pdf('dashboard/reports/annual_pl_report.html', context)
 
 # ADDED
 class GenerateOccupancyReportPDF(StaffRequiredMixin, View):
     def get(self, request, *args, **kwargs):
-        buildings = Building.objects.all().prefetch_related('unit_set')
-        total_units = Unit.objects.count()
-        occupied_units = Unit.objects.filter(is_available=False).count()
-        occupancy_rate = (occupied_units / total_units * 100) if total_units > 0 else 0
+        buildings = OccupancyService.get_building_index(Building.objects.all())
+        units_by_building = {}
+        for unit in OccupancyService.get_unit_index(Unit.objects.order_by('pk')):
+            units_by_building.setdefault(unit.building_id, []).append(unit)
+        for building in buildings:
+            building.units = units_by_building.get(building.pk, [])
         context = {
             'buildings': buildings,
-            'total_units': total_units,
-            'occupied_units': occupied_units,
-            'available_units': total_units - occupied_units,
-            'occupancy_rate': occupancy_rate,
+            **OccupancyService.get_totals(buildings),
             'today': timezone.now().date(),
-            'company': Company.objects.first()
+            'company': CompanyService.get(request)
         }
         return render_to_pdf('dashboard/reports/occupancy_report.html', context)
 
@@ -18,7 +18,7 @@ class PortalDashboardView(LoginRequiredMixin, TemplateView):
             context['lease'] = lease
             if lease:
                 context['payment_summary'] = lease.get_payment_summary()
-                context['documents'] = lease.documents.all()
+                context['documents'] = lease.documents.filter(status='ready')
                 context['maintenance_requests'] = MaintenanceRequest.objects.filter(lease=lease).order_by('-reported_date')[:5]
         except Tenant.DoesNotExist:
             context['error'] = _("لا يوجد ملف مستأجر مرتبط بحسابك.")
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'dashboard.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -223,8 +224,109 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Query budget monitoring (dashboard.middleware.QueryBudgetMiddleware)
+# Logs requests running more SQL queries than their budget and queries repeated
+# more than QUERY_BUDGET_REPEAT_LIMIT times (N+1 patterns). Budgets are keyed by URL name.
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', str(DEBUG)) == 'True'
+QUERY_BUDGET_DEFAULT = 12
+QUERY_BUDGET_REPEAT_LIMIT = 5
+QUERY_BUDGETS = {
+    'dashboard_home': 36,
+    'lease_list': 12,
+    'building_list': 5,
+    'tenant_detail': 15,
+    'maintenance_admin_list': 15,
+    'lease_create': 19,
+    'lease_update': 21,
+    'payment_create': 18,
+    'payment_update': 19,
+    'invoice_create': 19,
+    'calendar_events': 3,
+    'notification_inbox': 6,
+}
+
+# Lease document queue (python manage.py run_document_worker)
+# Set DOCUMENT_QUEUE_EAGER=True to generate documents right after the request instead of in a worker
+DOCUMENT_QUEUE_EAGER = os.environ.get('DOCUMENT_QUEUE_EAGER', 'False') == 'True'
+DOCUMENT_WORKER_PROCESSES = int(os.environ.get('DOCUMENT_WORKER_PROCESSES', '2'))
+DOCUMENT_JOB_MAX_ATTEMPTS = 3
+DOCUMENT_JOB_RETRY_DELAY = 30  # seconds, doubled after each failed attempt
+DOCUMENT_JOB_LOCK_TIMEOUT = 600  # seconds before a running job of a dead worker is retried
+
+# Rendered receipt/statement PDF cache (dashboard.pdf_cache_service)
+PDF_CACHE_DIR = os.path.join(str(BASE_DIR), 'cache', 'pdf')
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+# Worker processes used to render batch PDF exports with the export_pdf_batch command
+BATCH_EXPORT_PROCESSES = int(os.environ.get('BATCH_EXPORT_PROCESSES', '2'))
+# The export/pdf-batch/ page renders in the request process and must finish within gunicorn's
+# --timeout; larger batches are refused (use the export_pdf_batch command)
+BATCH_EXPORT_REQUEST_MAX_ITEMS = int(os.environ.get('BATCH_EXPORT_REQUEST_MAX_ITEMS', '200'))
+
+# Excel exports with more rows than this use the streaming (write-only) exporter
+EXCEL_STREAMING_THRESHOLD = int(os.environ.get('EXCEL_STREAMING_THRESHOLD', '5000'))
+EXCEL_EXPORT_CHUNK_SIZE = 2000
+
+# Backups (python manage.py create_backup; a background backup also runs on staff logout)
+BACKUP_DIR = BASE_DIR / 'backups'
+BACKUP_KEEP_LAST = 10  # newest backups always kept
+BACKUP_KEEP_DAILY = 14  # plus the newest backup of each of the last N days
+BACKUP_MIN_INTERVAL = 300  # seconds between logout backups
+RESTORE_BATCH_SIZE = 2000  # rows per bulk insert when restoring
+RESTORE_IO_THREADS = 8  # threads copying media files when restoring
+
+# Cache (set CACHE_BACKEND/CACHE_LOCATION to share it between processes, e.g. Redis or Memcached)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'rent-management'),
+    }
+}
+
+# Seconds the dashboard calendar feed (calendar/events/) is cached, on the server and in the browser
+CALENDAR_FEED_CACHE_TIMEOUT = int(os.environ.get('CALENDAR_FEED_CACHE_TIMEOUT', '60'))
+
+# Seconds the dashboard home statistics snapshot is kept
+# (python manage.py warm_dashboard_snapshot rebuilds it; needs a cache shared between processes)
+DASHBOARD_SNAPSHOT_TTL = int(os.environ.get('DASHBOARD_SNAPSHOT_TTL', '300'))
+
+# Seconds a process reuses the company profile (name, logo) before reading it again; edits
+# show up at once only in processes sharing the cache with the one that saved them
+COMPANY_PROFILE_TTL = int(os.environ.get('COMPANY_PROFILE_TTL', '30'))
+
+# Seconds a user's cached unread notification count is kept (it is adjusted on create/read;
+# the timeout bounds drift from concurrent updates)
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = int(os.environ.get('NOTIFICATION_UNREAD_CACHE_TIMEOUT', '300'))
+
+# Automatic English translation of Arabic names/addresses (dashboard.translation_service)
+# 'google' (network, filled in the background after saving), 'dictionary' (TRANSLATION_DICTIONARY
+# phrases, filled while saving) or 'none'; python manage.py backfill_translations fills the gaps
+TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'google')
+TRANSLATION_ASYNC = True  # False: translate right after the transaction commits, in the request
+TRANSLATION_WORKERS = 2  # background translation threads per process
+TRANSLATION_BATCH_SIZE = 50  # texts per backend call
+TRANSLATION_DICTIONARY = {}  # Arabic phrase -> English
+
+# Where OTP codes and rate limits are kept: 'cache' (OTP_CACHE_ALIAS, must be shared between
+# processes in production) or 'database' (the OTP table; run purge_expired_otps periodically).
+# Defaults to 'cache' only when CACHE_BACKEND is a shared cache: each gunicorn worker has its own
+# LocMemCache, so a code sent by one worker would be unknown to the others.
+_SHARED_CACHE = 'locmem' not in CACHES['default']['BACKEND'].lower()
+OTP_STORE = os.environ.get('OTP_STORE', 'cache' if _SHARED_CACHE else 'database')
+OTP_CACHE_ALIAS = 'default'
+
 # SMS Configuration
-SMS_PROVIDER = 'console'  # Options: 'console', 'twilio', 'aws_sns'
+SMS_PROVIDER = 'console'  # Options: 'console', 'twilio', 'aws_sns', 'fake' (offline tests and benchmarks)
+
+# SMS outbox (python manage.py run_sms_worker)
+# Set SMS_QUEUE_EAGER=True to send messages right after the request instead of in a worker
+SMS_QUEUE_EAGER = os.environ.get('SMS_QUEUE_EAGER', 'False') == 'True'
+SMS_BATCH_SIZE = 50  # messages claimed and sent per batch
+SMS_MAX_ATTEMPTS = 5
+SMS_RETRY_DELAY = 5  # seconds, doubled after each failed attempt
+SMS_LOCK_TIMEOUT = 120  # seconds before a message claimed by a dead worker is retried
+SMS_PER_NUMBER_LIMIT = 5  # messages per number...
+SMS_PER_NUMBER_WINDOW = 300  # ...per this many seconds
 
 # Twilio Configuration (if using Twilio)
 # TWILIO_ACCOUNT_SID = 'your_twilio_account_sid'